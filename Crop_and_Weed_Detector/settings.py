@@ -119,6 +119,9 @@ CSRF_TRUSTED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True  # If you ever want to send cookies automatically
 
+# Lets browser clients read the /api/history pagination headers
+CORS_EXPOSE_HEADERS = ["X-Next-Cursor", "Link"]
+
 # -----------------------------------------
 # INTERNATIONALIZATION
 # -----------------------------------------
@@ -135,3 +138,102 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# -----------------------------------------
+# INFERENCE
+# -----------------------------------------
+# RAM budget for resident models; least recently used models are evicted beyond it (None = unlimited)
+MODEL_MEMORY_BUDGET_MB = int(os.environ.get("MODEL_MEMORY_BUDGET_MB", "0")) or None
+
+# Micro-batching: concurrent requests per model are grouped into one forward pass of up to
+# INFERENCE_MAX_BATCH items, waiting at most INFERENCE_MAX_WAIT_MS for the batch to fill (1 = disabled)
+INFERENCE_MAX_BATCH = int(os.environ.get("INFERENCE_MAX_BATCH", "8"))
+INFERENCE_MAX_WAIT_MS = float(os.environ.get("INFERENCE_MAX_WAIT_MS", "10"))
+
+# Background detection jobs (/api/jobs): worker threads, and how many may run a forward pass at once
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+JOB_MAX_CONCURRENT_INFERENCE = int(os.environ.get("JOB_MAX_CONCURRENT_INFERENCE", "1"))
+# Running jobs refresh a heartbeat; after JOB_STALE_SECONDS without one they are re-queued
+JOB_HEARTBEAT_SECONDS = float(os.environ.get("JOB_HEARTBEAT_SECONDS", "30"))
+JOB_STALE_SECONDS = float(os.environ.get("JOB_STALE_SECONDS", "120"))
+
+# Wikipedia summaries are cached in memory and in the DB; older entries are served while refreshing
+WIKI_CACHE_TTL_SECONDS = int(os.environ.get("WIKI_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+WIKI_CACHE_MAX_ENTRIES = 512
+
+# Classify responds immediately; Wikipedia enrichment of ImageRecord.summary runs in the background
+WIKI_TIMEOUT_SECONDS = 5
+WIKI_ENRICH_WORKERS = 2
+WIKI_ENRICH_RETRIES = 2
+WIKI_ENRICH_BACKOFF_SECONDS = 1.0
+
+# Classifier backend: 'auto' prefers an exported .onnx (CPU) / .ts next to the .pth, see
+# `manage.py export_classifiers`; 'onnx', 'torchscript' or 'eager' force one
+CLASSIFICATION_BACKEND = os.environ.get("CLASSIFICATION_BACKEND", "auto")
+
+# Annotated detection images: 'jpeg', 'webp' or 'png' (fast compression); quality applies to jpeg/webp.
+# Compare codecs with `manage.py benchmark_encoding <image>`
+ANNOTATED_IMAGE_FORMAT = os.environ.get("ANNOTATED_IMAGE_FORMAT", "jpeg")
+ANNOTATED_IMAGE_QUALITY = int(os.environ.get("ANNOTATED_IMAGE_QUALITY", "90"))
+
+# Sliced detection for large orthomosaics (tiled=true on /api/upload): tile edge and overlap in pixels,
+# tiles inferred per batch, and the share of the smaller part each of two neighbouring tiles saw of
+# the other's box that their intersection must cover for them to merge (see tiling.merge_tile_detections)
+TILE_SIZE = 640
+TILE_OVERLAP = 128
+TILE_BATCH_SIZE = 8
+TILE_MERGE_THRESHOLD = 0.5
+
+# Content-hash result cache for /api/upload (entries kept in memory; all are persisted in the DB).
+# Entries expire after RESULT_CACHE_TTL_SECONDS; expired rows are pruned as new results are stored
+# or with `manage.py prune_result_cache`.
+RESULT_CACHE_MAX_ENTRIES = 1024
+RESULT_CACHE_TTL_SECONDS = 30 * 24 * 3600
+
+# History export (/api/history/export, manage.py export_history): rows fetched per database round trip
+EXPORT_CHUNK_SIZE = 2000
+
+# Analytics rollups (/api/stats): update the daily aggregates on every write. When False,
+# run `manage.py rebuild_rollups` periodically (e.g. from cron) instead.
+STATS_ROLLUP_ON_WRITE = True
+
+# Public content (/api/tips, /api/diseases, /api/news): seconds clients may reuse a response
+# before revalidating with ETag / If-Modified-Since, and the smallest body worth compressing
+CONTENT_MAX_AGE_SECONDS = 300
+CONTENT_COMPRESS_MIN_BYTES = 512
+
+# Classification input tensors kept preallocated for reuse (see detector/preprocessing.py)
+INPUT_TENSOR_POOL_SIZE = 32
+
+# Upload limits, checked from the byte size and image header before anything is decoded
+UPLOAD_MAX_BYTES = 50 * 1024 * 1024
+UPLOAD_MAX_PIXELS = 150_000_000  # Also rejects decompression bombs (tiny files, huge dimensions)
+# Uploads above this size are streamed to a temporary file instead of being held in memory
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2_621_440  # Django's default, 2.5 MB
+# Files per multipart request (Django's default is 100). /api/upload/batch and /api/detect/video
+# take repeated 'images' / 'frames' up to this count; larger surveys go in a zip 'archive'.
+DATA_UPLOAD_MAX_NUMBER_FILES = int(os.environ.get("UPLOAD_MAX_FILES", "1000"))
+
+# Composite classification (model='cascade' / 'ensemble' on /api/upload): the cascade runs the
+# first model and escalates to the second below the confidence threshold; the ensemble
+# averages the softmax outputs of all listed models
+CLASSIFY_CASCADE_MODELS = ("mobilenet", "resnet")
+CLASSIFY_CASCADE_THRESHOLD = 0.8
+CLASSIFY_ENSEMBLE_MODELS = ("mobilenet", "resnet", "efficientnet")
+
+# Detection model='auto': the most accurate of AUTO_DETECT_MODELS whose estimated latency
+# (per-image ms x images in flight + decode ms per megapixel) fits AUTO_DETECT_SLO_MS.
+# Per-image ms starts from AUTO_DETECT_PRIOR_MS and then tracks measured forward passes.
+AUTO_DETECT_MODELS = ["yolov8_x", "yolov8_l", "yolov8_m"]
+AUTO_DETECT_SLO_MS = 2000
+AUTO_DETECT_PRIOR_MS = {"yolov8_x": 900, "yolov8_l": 600, "yolov8_m": 300}
+AUTO_DETECT_DECODE_MS_PER_MP = 5
+
+# YOLO inference parameters (imgsz, conf, iou, max_det, classes), later entries winning:
+# DETECTION_DEFAULTS for every model, DETECTION_MODEL_PARAMS per model key, then the request's
+# profile and its own overrides. Built-in profiles are 'default' and 'fast' (imgsz 480, conf 0.4,
+# max_det 100: roughly half the pixels per forward pass, at the cost of small or faint weeds);
+# DETECTION_PROFILES can redefine them or add more, e.g. {"survey": {"imgsz": 1024}}.
+DETECTION_DEFAULTS = {}
+DETECTION_MODEL_PARAMS = {}
+DETECTION_PROFILES = {}
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Crop_and_Weed_Detector.settings')
 
 application = get_wsgi_application()
+
+# Resume background detection jobs left queued or orphaned by a previous process
+from detector.jobs import start_job_runner  # noqa: E402
+
+start_job_runner()
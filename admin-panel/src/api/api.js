@@ -59,6 +59,9 @@ export const addTipAPI = async (data) => API.post("/admin_dashboard/add_tip", da
 export const deleteTipAPI = async (cropName) =>
   API.delete("/admin_dashboard/delete_tip", { data: { crop_name: cropName } });
 
-export const fetchHistoryAPI = async () => API.get("/api/history");
+// 🔹 GET one page of history, newest first. Pass the previous response's
+// X-Next-Cursor header as `cursor` to get the next page (absent on the last page).
+export const fetchHistoryAPI = async (cursor, limit = 100) =>
+  API.get("/api/history", { params: { limit, ...(cursor ? { cursor } : {}) } });
 
 export default API;
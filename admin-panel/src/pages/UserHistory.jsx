@@ -1,7 +1,7 @@
 // src/pages/UserHistory.jsx
 
 import React, { useEffect, useState } from "react";
-import { Table, message, Spin } from "antd";
+import { Button, Table, message, Spin } from "antd";
 import styled, { keyframes } from "styled-components";
 import { motion, AnimatePresence } from "framer-motion";
 import { fetchHistoryAPI } from "../api/api";
@@ -38,24 +38,28 @@ const StyledTable = styled(Table)`
 const UserHistory = () => {
   const [history, setHistory] = useState([]);
   const [loading, setLoading] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [nextCursor, setNextCursor] = useState(null);
 
   useEffect(() => {
     fetchHistory();
   }, []);
 
-  const fetchHistory = async () => {
-    setLoading(true);
+  // /api/history is paginated: each call returns one page and the cursor of the next
+  const fetchHistory = async (cursor = null) => {
+    const setBusy = cursor ? setLoadingMore : setLoading;
+    setBusy(true);
     try {
-      const response = await fetchHistoryAPI(); // from api.js
-      // The data is presumably an array of records, per your Django view
-      setHistory(response.data);
+      const response = await fetchHistoryAPI(cursor); // from api.js
+      setHistory((previous) => (cursor ? [...previous, ...response.data] : response.data));
+      setNextCursor(response.headers["x-next-cursor"] || null);
     } catch (error) {
       message.error({
         content: "Failed to fetch user history",
         style: { marginTop: "20vh" },
       });
     } finally {
-      setLoading(false);
+      setBusy(false);
     }
   };
 
@@ -209,6 +213,13 @@ const UserHistory = () => {
               rowKey="image_id"
               style={{ marginTop: 20 }}
             />
+            {nextCursor && (
+              <div style={{ textAlign: "center", marginTop: 16 }}>
+                <Button loading={loadingMore} onClick={() => fetchHistory(nextCursor)}>
+                  Load more
+                </Button>
+              </div>
+            )}
           </motion.div>
         )}
       </AnimatePresence>
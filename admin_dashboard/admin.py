@@ -1,7 +1,41 @@
 from django.contrib import admin
 from .models import Tip, Disease, News
+from . import content_cache
+
+
+# Edits made through Django Admin invalidate the cached public payloads too
+class ContentAdmin(admin.ModelAdmin):
+    content_kind = None
+    key_field = None
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        content_cache.invalidate(self.content_kind)
+
+    def delete_model(self, request, obj):
+        key = getattr(obj, self.key_field)
+        super().delete_model(request, obj)
+        content_cache.invalidate(self.content_kind, deleted_keys=[key])
+
+    def delete_queryset(self, request, queryset):
+        keys = list(queryset.values_list(self.key_field, flat=True))
+        super().delete_queryset(request, queryset)
+        content_cache.invalidate(self.content_kind, deleted_keys=keys)
+
+
+class TipAdmin(ContentAdmin):
+    content_kind, key_field = "tips", "crop_name"
+
+
+class DiseaseAdmin(ContentAdmin):
+    content_kind, key_field = "diseases", "disease_name"
+
+
+class NewsAdmin(ContentAdmin):
+    content_kind, key_field = "news", "title"
+
 
 # Register models to Django Admin
-admin.site.register(Tip)
-admin.site.register(Disease)
-admin.site.register(News)
+admin.site.register(Tip, TipAdmin)
+admin.site.register(Disease, DiseaseAdmin)
+admin.site.register(News, NewsAdmin)
@@ -0,0 +1,171 @@
+import gzip
+import json
+import threading
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+
+from .models import ContentTombstone, ContentVersion, Disease, News, Tip
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip is used when brotli is not installed
+    brotli = None
+
+# Public content lists: model, identifying field, serialized fields, ordering
+CONTENT = {
+    "tips": (Tip, "crop_name", ("crop_name", "crop_tips"), ("crop_name",)),
+    "diseases": (Disease, "disease_name", ("disease_name", "crop_name", "cure", "commonness"), ("disease_name",)),
+    "news": (News, "title", ("title", "subtitle", "content", "author_name", "timestamp"), ("-timestamp", "-id")),
+}
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body)
+    if encoding == "gzip":
+        return gzip.compress(body)
+    return body
+
+
+class Payload:
+    """One serialized content list at a given version, with its compressed bodies built on demand."""
+
+    def __init__(self, kind: str, version: int, body: bytes):
+        self.version = version
+        # Weak: the gzip/brotli bodies carry the same tag as the identity body they decode to
+        self.etag = f'W/"{kind}-{version}"'
+        self._bodies = {"identity": body}
+        self._lock = threading.Lock()
+
+    def body(self, encoding: str) -> bytes:
+        with self._lock:
+            if encoding not in self._bodies:
+                self._bodies[encoding] = _compress(self._bodies["identity"], encoding)
+            return self._bodies[encoding]
+
+
+_payloads = {}
+_payloads_lock = threading.Lock()
+
+
+def _stamp(kind: str) -> ContentVersion:
+    stamp, _ = ContentVersion.objects.get_or_create(kind=kind, defaults={"changed_at": timezone.now()})
+    return stamp
+
+
+def invalidate(kind: str, deleted_keys=()) -> None:
+    """
+    Bumps the version of a content list after it changed (every process rebuilds its payload
+    on the next request) and records tombstones for deleted items.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ContentTombstone.objects.bulk_create([ContentTombstone(kind=kind, key=key) for key in deleted_keys])
+        _stamp(kind)
+        ContentVersion.objects.filter(kind=kind).update(version=F("version") + 1, changed_at=now)
+    with _payloads_lock:
+        for blank_nulls in (False, True):
+            _payloads.pop((kind, blank_nulls), None)
+
+
+def _serialize(data) -> bytes:
+    return json.dumps(data, cls=DjangoJSONEncoder, separators=(",", ":")).encode()
+
+
+def _items(queryset, fields, blank_nulls: bool) -> list:
+    items = list(queryset.values(*fields))
+    if blank_nulls:
+        items = [{field: "" if value is None else value for field, value in item.items()} for item in items]
+    return items
+
+
+def _payload(kind: str, stamp: ContentVersion, blank_nulls: bool = False) -> Payload:
+    """Returns the cached payload for the stamped version, serializing the table only when it changed."""
+    with _payloads_lock:
+        payload = _payloads.get((kind, blank_nulls))
+    if payload is not None and payload.version == stamp.version:
+        return payload
+
+    model, _, fields, ordering = CONTENT[kind]
+    payload = Payload(kind, stamp.version, _serialize({
+        kind: _items(model.objects.order_by(*ordering), fields, blank_nulls),
+        "changed_at": stamp.changed_at,
+    }))
+    with _payloads_lock:
+        _payloads[(kind, blank_nulls)] = payload
+    return payload
+
+
+def _delta(kind: str, stamp: ContentVersion, since, blank_nulls: bool = False) -> bytes:
+    """Items added or changed after `since`, and the keys of items deleted since then."""
+    items, deleted = [], []
+    if since < stamp.changed_at:
+        model, key_field, fields, ordering = CONTENT[kind]
+        items = _items(model.objects.filter(updated_at__gt=since).order_by(*ordering), fields, blank_nulls)
+        current = {item[key_field] for item in items}
+        deleted = sorted(set(
+            ContentTombstone.objects.filter(kind=kind, deleted_at__gt=since).values_list("key", flat=True)
+        ) - current)
+    return _serialize({kind: items, "deleted": deleted, "since": since, "changed_at": stamp.changed_at})
+
+
+def _accepted_encoding(request, size: int) -> str:
+    if size < getattr(settings, "CONTENT_COMPRESS_MIN_BYTES", 512):
+        return "identity"
+    accepted = {
+        token.split(";")[0].strip().lower()
+        for token in request.META.get("HTTP_ACCEPT_ENCODING", "").split(",")
+    }
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return "identity"
+
+
+def serve(request, kind: str, blank_nulls: bool = False) -> HttpResponse:
+    """
+    GET handler shared by the public tips/diseases/news endpoints.
+      - Full list: {kind: [...], "changed_at": ...} served from the version-stamped cache with
+        a weak ETag and Last-Modified; a matching If-None-Match or If-Modified-Since gets an empty 304.
+      - ?since=<ISO datetime>: only items changed after that instant plus "deleted" keys.
+    Bodies are brotli/gzip compressed when the client accepts it. Clients pass the
+    returned "changed_at" as the next ?since=. With `blank_nulls`, empty optional fields
+    are "" instead of null (the shape the admin_dashboard get_* views always returned).
+    """
+    stamp = _stamp(kind)
+
+    if request.GET.get("since"):
+        since = parse_datetime(request.GET["since"])
+        if since is None:
+            return JsonResponse({"error": "Invalid since (use an ISO datetime)"}, status=400)
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        body = _delta(kind, stamp, since, blank_nulls)
+        encoding = _accepted_encoding(request, len(body))
+        response = HttpResponse(_compress(body, encoding), content_type="application/json")
+    else:
+        payload = _payload(kind, stamp, blank_nulls)
+        last_modified = int(stamp.changed_at.timestamp())
+        response = get_conditional_response(request, etag=payload.etag, last_modified=last_modified)
+        if response is None:
+            encoding = _accepted_encoding(request, len(payload.body("identity")))
+            response = HttpResponse(payload.body(encoding), content_type="application/json")
+        else:
+            encoding = "identity"
+        response["ETag"] = payload.etag
+        response["Last-Modified"] = http_date(last_modified)
+
+    if encoding != "identity":
+        response["Content-Encoding"] = encoding
+    patch_vary_headers(response, ("Accept-Encoding",))
+    patch_cache_control(response, public=True, max_age=getattr(settings, "CONTENT_MAX_AGE_SECONDS", 300))
+    return response
@@ -4,6 +4,7 @@ from django.db import models
 class Tip(models.Model):
     crop_name = models.CharField(max_length=255, unique=True)  # Unique crop name
     crop_tips = models.TextField()  # Tips for that crop
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # For ?since= delta queries
 
     def __str__(self):
         return self.crop_name
@@ -17,6 +18,7 @@ class Disease(models.Model):
     
     # NEW FIELD for associating Disease with a Crop
     crop_name = models.CharField(max_length=255, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.disease_name
@@ -29,6 +31,32 @@ class News(models.Model):
     content = models.TextField()
     author_name = models.CharField(max_length=255)
     timestamp = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.title
+
+
+# Version stamp of one public content list (tips, diseases or news), bumped on every change
+class ContentVersion(models.Model):
+    kind = models.CharField(max_length=20, primary_key=True)
+    version = models.PositiveIntegerField(default=0)
+    changed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.kind} v{self.version}"
+
+
+# Deleted content item, so ?since= delta queries can tell clients what to drop
+class ContentTombstone(models.Model):
+    kind = models.CharField(max_length=20)
+    key = models.CharField(max_length=255)  # crop_name / disease_name / title of the deleted item
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["kind", "deleted_at"], name="contenttombstone_kind_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}: {self.key} (deleted)"
@@ -1,3 +1,123 @@
-from django.test import TestCase
+import gzip
+import json
+from datetime import timedelta
 
-# Create your tests here.
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from authentication.models import CustomUser
+
+from . import content_cache, views
+from .models import ContentVersion, Disease, News
+
+
+class ContentCacheTests(TestCase):
+    """Public content lists: version-stamped payloads, conditional GET and ?since= deltas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user(username="admin", password="secret", is_admin=True)
+        Disease.objects.create(disease_name="Rust", cure="Fungicide", crop_name="maize")
+        Disease.objects.create(disease_name="Blight", cure="Crop rotation", crop_name="potato", commonness="High")
+        News.objects.create(title="Rain ahead", content="Plan spraying early.", author_name="Agronomist")
+        content_cache.invalidate("diseases")
+        content_cache.invalidate("news")
+
+        # Everything above happened an hour ago, so deltas after `cls.since` are empty
+        an_hour_ago = timezone.now() - timedelta(hours=1)
+        for model in (Disease, News):
+            model.objects.update(updated_at=an_hour_ago)
+        ContentVersion.objects.update(changed_at=an_hour_ago)
+        cls.since = (an_hour_ago + timedelta(minutes=30)).isoformat()
+
+    def setUp(self):
+        # Payloads are cached per process and keyed by version, which restarts with every test
+        content_cache._payloads.clear()
+
+    def get(self, path="/api/diseases", data=None, **extra):
+        return self.client.get(path, data, **extra)
+
+    def admin_request(self, method, path, body):
+        self.client.force_login(self.admin)
+        response = getattr(self.client, method)(path, json.dumps(body), content_type="application/json")
+        self.client.logout()
+        return response
+
+    def test_full_list_carries_a_weak_etag(self):
+        response = self.get()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["ETag"], 'W/"diseases-1"')
+        self.assertEqual([item["disease_name"] for item in response.json()["diseases"]], ["Blight", "Rust"])
+        self.assertIn("changed_at", response.json())
+
+    def test_matching_if_none_match_gets_an_empty_304(self):
+        etag = self.get()["ETag"]
+
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["ETag"], etag)
+
+    def test_compressed_body_shares_the_etag(self):
+        with override_settings(CONTENT_COMPRESS_MIN_BYTES=0):
+            plain = self.get()
+            compressed = self.get(HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertEqual(compressed["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+        self.assertEqual(compressed["ETag"], plain["ETag"])
+        self.assertIn("Accept-Encoding", compressed["Vary"])
+
+    def test_adding_an_item_bumps_the_version(self):
+        etag = self.get()["ETag"]
+        response = self.admin_request("post", "/admin_dashboard/add_disease",
+                                      {"disease_name": "Smut", "cure": "Resistant seed"})
+        self.assertEqual(response.status_code, 200)
+
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["ETag"], 'W/"diseases-2"')
+        self.assertIn("Smut", [item["disease_name"] for item in response.json()["diseases"]])
+
+    def test_deleting_an_item_bumps_the_version_and_leaves_a_tombstone(self):
+        etag = self.get()["ETag"]
+        response = self.admin_request("delete", "/admin_dashboard/delete_disease", {"disease_name": "Rust"})
+        self.assertEqual(response.status_code, 200)
+
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item["disease_name"] for item in response.json()["diseases"]], ["Blight"])
+
+        delta = self.get(data={"since": self.since}).json()
+        self.assertEqual((delta["diseases"], delta["deleted"]), ([], ["Rust"]))
+
+    def test_since_returns_only_changed_items(self):
+        self.assertEqual(self.get(data={"since": self.since}).json()["diseases"], [])
+
+        self.admin_request("post", "/admin_dashboard/add_disease",
+                           {"disease_name": "Blight", "cure": "Copper spray", "crop_name": "potato"})
+        delta = self.get(data={"since": self.since}).json()
+
+        self.assertEqual([(item["disease_name"], item["cure"]) for item in delta["diseases"]],
+                         [("Blight", "Copper spray")])
+        self.assertEqual(delta["deleted"], [])
+
+    def test_invalid_since_is_rejected(self):
+        self.assertEqual(self.get(data={"since": "yesterday"}).status_code, 400)
+
+    def test_api_returns_null_for_empty_optional_fields(self):
+        rust = next(item for item in self.get().json()["diseases"] if item["disease_name"] == "Rust")
+        self.assertIsNone(rust["commonness"])
+
+        news = self.get("/api/news").json()["news"][0]
+        self.assertIsNone(news["subtitle"])
+
+    def test_admin_dashboard_views_keep_empty_strings(self):
+        factory = RequestFactory()
+        diseases = json.loads(views.get_diseases(factory.get("/")).content)["diseases"]
+        rust = next(item for item in diseases if item["disease_name"] == "Rust")
+        self.assertEqual(rust["commonness"], "")
+
+        news = json.loads(views.get_news(factory.get("/")).content)["news"][0]
+        self.assertEqual(news["subtitle"], "")
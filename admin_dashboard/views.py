@@ -4,6 +4,7 @@ import json
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from .models import Tip, Disease, News
+from . import content_cache
 
 # ✅ Check if User is Admin
 def is_admin(user):
@@ -16,16 +17,7 @@ def is_admin(user):
 def get_diseases(request):
     """ GET /api/diseases """
     if request.method == 'GET':
-        diseases = Disease.objects.all()
-        data = []
-        for d in diseases:
-            data.append({
-                "disease_name": d.disease_name,
-                "crop_name": d.crop_name if d.crop_name else "",
-                "cure": d.cure,
-                "commonness": d.commonness if d.commonness else ""
-            })
-        return JsonResponse({"diseases": data}, status=200)
+        return content_cache.serve(request, "diseases", blank_nulls=True)
     return JsonResponse({"error": "Method not allowed"}, status=405)
 
 # -------------------------------------
@@ -35,14 +27,7 @@ def get_diseases(request):
 def get_tips(request):
     """ GET /api/tips """
     if request.method == 'GET':
-        tips = Tip.objects.all()
-        data = []
-        for t in tips:
-            data.append({
-                "crop_name": t.crop_name,
-                "crop_tips": t.crop_tips
-            })
-        return JsonResponse({"tips": data}, status=200)
+        return content_cache.serve(request, "tips")
     return JsonResponse({"error": "Method not allowed"}, status=405)
 
 # -------------------------------------
@@ -52,17 +37,7 @@ def get_tips(request):
 def get_news(request):
     """ GET /api/news """
     if request.method == 'GET':
-        news_items = News.objects.all().order_by('-timestamp')
-        data = []
-        for n in news_items:
-            data.append({
-                "title": n.title,
-                "subtitle": n.subtitle if n.subtitle else "",
-                "content": n.content,
-                "author_name": n.author_name,
-                "timestamp": n.timestamp.isoformat()
-            })
-        return JsonResponse({"news": data}, status=200)
+        return content_cache.serve(request, "news", blank_nulls=True)
     return JsonResponse({"error": "Method not allowed"}, status=405)
 
 # -------------------------------------
@@ -83,6 +58,7 @@ def add_or_update_tip(request):
                 crop_name=crop_name,
                 defaults={"crop_tips": crop_tips}
             )
+            content_cache.invalidate("tips")
             return JsonResponse({"message": "Tip added/updated successfully"}, status=200)
         except json.JSONDecodeError:
             return JsonResponse({"error": "Invalid JSON format"}, status=400)
@@ -102,6 +78,7 @@ def delete_tip(request):
             try:
                 tip = Tip.objects.get(crop_name=crop_name)
                 tip.delete()
+                content_cache.invalidate("tips", deleted_keys=[crop_name])
                 return JsonResponse({"message": f"Tip for {crop_name} deleted successfully"}, status=200)
             except Tip.DoesNotExist:
                 return JsonResponse({"error": "Tip not found"}, status=404)
@@ -134,6 +111,7 @@ def add_or_update_disease(request):
                     "commonness": commonness
                 }
             )
+            content_cache.invalidate("diseases")
             return JsonResponse({"message": "Disease added/updated successfully"}, status=200)
         except json.JSONDecodeError:
             return JsonResponse({"error": "Invalid JSON format"}, status=400)
@@ -153,6 +131,7 @@ def delete_disease(request):
             try:
                 disease = Disease.objects.get(disease_name=disease_name)
                 disease.delete()
+                content_cache.invalidate("diseases", deleted_keys=[disease_name])
                 return JsonResponse({"message": f"Disease {disease_name} deleted successfully"}, status=200)
             except Disease.DoesNotExist:
                 return JsonResponse({"error": "Disease not found"}, status=404)
@@ -185,6 +164,7 @@ def add_or_update_news(request):
                     "author_name": author_name
                 }
             )
+            content_cache.invalidate("news")
             return JsonResponse({"message": "News added/updated successfully"}, status=201)
         except json.JSONDecodeError:
             return JsonResponse({"error": "Invalid JSON format"}, status=400)
@@ -204,6 +184,7 @@ def delete_news(request):
             try:
                 news = News.objects.get(title=title)
                 news.delete()
+                content_cache.invalidate("news", deleted_keys=[title])
                 return JsonResponse({"message": f"News '{title}' deleted successfully"}, status=200)
             except News.DoesNotExist:
                 return JsonResponse({"error": "News not found"}, status=404)
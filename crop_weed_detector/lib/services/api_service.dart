@@ -253,24 +253,34 @@ class ApiService {
         if (cookieHeader.isNotEmpty) "Cookie": cookieHeader,
       };
 
-      final response = await http.get(
-        Uri.parse("$baseUrl/api/history"),
-        headers: headers,
-      );
+      // /api/history is paginated (newest first): follow X-Next-Cursor until
+      // the last page so callers still get the full list.
+      final List<dynamic> history = [];
+      String? cursor;
+      do {
+        final response = await http.get(
+          Uri.parse("$baseUrl/api/history").replace(queryParameters: {
+            "limit": "500",
+            if (cursor != null) "cursor": cursor,
+          }),
+          headers: headers,
+        );
 
-      // Save new cookies if any
-      await _saveCookies(response);
+        // Save new cookies if any
+        await _saveCookies(response);
 
-      if (response.statusCode == 200) {
-        // /api/history typically returns a list of objects:
+        if (response.statusCode != 200) {
+          throw Exception("Failed to load history: ${response.statusCode}");
+        }
+        // Each page is a list of objects:
         // [
         //   {"image_id":..., "username":..., ...},
         //   ...
         // ]
-        return jsonDecode(response.body) as List<dynamic>;
-      } else {
-        throw Exception("Failed to load history: ${response.statusCode}");
-      }
+        history.addAll(jsonDecode(response.body) as List<dynamic>);
+        cursor = response.headers["x-next-cursor"];
+      } while (cursor != null);
+      return history;
     } on SocketException {
       throw Exception("No Internet connection");
     } catch (e) {
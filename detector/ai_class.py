@@ -1,16 +1,31 @@
 import os
 import json
+import hashlib
 import random
+import threading
+import time
 import cv2
 import torch
 import wikipediaapi
 import numpy as np
-from io import BytesIO
-from PIL import Image
+from django.conf import settings
 from django.core.files.base import ContentFile
-from torchvision import models, transforms
+from torchvision import models
 from ultralytics import YOLO
-from typing import Dict, Tuple, Optional
+from functools import partial
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional
+
+from .backends import OnnxClassifier, artifact_path, load_exported
+from .batching import BatchScheduler
+from .encoding import encode_image, extension_for, resolve_format
+from .ingest import image_pixels
+from .model_registry import LoadedModel, ModelRegistry
+from .preprocessing import ClassifierPreprocessor
+from .quantization import INT8_SUFFIX, load_static_int8, quantize_dynamic_int8, static_artifact_path
+from .routing import DetectorRouter
+from .tiling import iter_tile_batches, merge_tile_detections, tile_windows
+from .wiki_cache import WikiCache
+from .yolo_params import YOLO_DEFAULTS, resolve_detection_params
 
 
 class AIClass:
@@ -47,30 +62,66 @@ class AIClass:
         "yolov8_x": "yolo_v8_x.pt",
     }
 
+    # Composite classification modes, selectable as `model` values alongside CLASSIFICATION_MODELS
+    CASCADE_MODEL = "cascade"
+    ENSEMBLE_MODEL = "ensemble"
+
+    # Detection `model` value that lets the DetectorRouter pick from DETECTION_MODELS per request
+    AUTO_DETECTOR = "auto"
+
+    # Network input sizes; uploads are decoded no larger than needed for them (see input_size)
+    CLASSIFIER_INPUT_SIZE = 224
+    DETECTOR_INPUT_SIZE = YOLO_DEFAULTS["imgsz"]
+
     def __init__(self):
         # Check device availability
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
-        self.classification_models = {}
-        self.class_to_idx = {}
-        self.idx_to_class = {}
+        # Models are loaded lazily on first use and kept in an LRU bounded by the RAM budget
+        self.registry = ModelRegistry(
+            self._load_model,
+            self.classifier_keys() + list(self.DETECTION_MODELS),
+            memory_budget_mb=getattr(settings, "MODEL_MEMORY_BUDGET_MB", None)
+        )
+
+        # Concurrent requests for the same model are grouped into one batched forward pass
+        self.scheduler = BatchScheduler(
+            max_batch=getattr(settings, "INFERENCE_MAX_BATCH", 8),
+            max_wait_ms=getattr(settings, "INFERENCE_MAX_WAIT_MS", 10)
+        )
 
-        # Load classification and detection models
-        self._load_classification_models()
-        self._load_detection_models()
+        # model='auto': most accurate detector that fits the latency SLO under the current load
+        self.router = DetectorRouter(
+            getattr(settings, "AUTO_DETECT_MODELS", ["yolov8_x", "yolov8_l", "yolov8_m"]),
+            slo_ms=getattr(settings, "AUTO_DETECT_SLO_MS", 2000),
+            prior_ms=getattr(settings, "AUTO_DETECT_PRIOR_MS", {}),
+            decode_ms_per_mp=getattr(settings, "AUTO_DETECT_DECODE_MS_PER_MP", 5)
+        )
 
         # Initialize Wikipedia API
         self.wiki_api = wikipediaapi.Wikipedia(
             language="en",
-            user_agent="CropDetectionAI/1.0 (https://github.com/username/cropdetection)"
+            user_agent="CropDetectionAI/1.0 (https://github.com/username/cropdetection)",
+            timeout=getattr(settings, "WIKI_TIMEOUT_SECONDS", 5)
+        )
+        self.wiki_cache = WikiCache(
+            self._fetch_wikipedia,
+            ttl_seconds=getattr(settings, "WIKI_CACHE_TTL_SECONDS", 7 * 24 * 3600),
+            max_entries=getattr(settings, "WIKI_CACHE_MAX_ENTRIES", 512)
         )
 
-        # Image transform pipeline for classification
-        self.transform = transforms.Compose([
-            transforms.Resize((224, 224)),
-            transforms.ToTensor(),
-            transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225]),
-        ])
+        # Per label-map lookup tables (label, is_weed, colour) used when post-processing detections
+        self._label_tables = {}
+
+        # A YOLO instance keeps its predictor arguments between calls, so calls on one model are
+        # serialised (only contended when batching is disabled and callers run inline)
+        self._predict_locks: Dict[str, threading.Lock] = {}
+
+        # Classification preprocessing: area resize + fused normalisation into pooled input tensors
+        self.preprocess = ClassifierPreprocessor(
+            self.CLASSIFIER_INPUT_SIZE,
+            pool_size=getattr(settings, "INPUT_TENSOR_POOL_SIZE", 32)
+        )
 
     def close(self):
         """
@@ -90,34 +141,80 @@ class AIClass:
         """
         self.close()
 
-    def _load_classification_models(self) -> None:
-        """Loads classification models from fine-tuned weights or defaults to pretrained models."""
-        for model_name, model_info in self.CLASSIFICATION_MODELS.items():
-            model_path = os.path.join(self.CLASSIFICATION_PATH, model_info["filename"])
-            class_idx_path = os.path.join(self.CLASSIFICATION_PATH, model_info["json"])
+    @classmethod
+    def classifier_keys(cls) -> List[str]:
+        """Every selectable classification model key, including the INT8 variants (e.g. 'mobilenet_int8')."""
+        return list(cls.CLASSIFICATION_MODELS) + [key + INT8_SUFFIX for key in cls.CLASSIFICATION_MODELS]
 
-            if os.path.exists(model_path) and os.path.exists(class_idx_path):
-                self._load_finetuned_model(
-                    model_name,
-                    model_info["model"],
-                    model_path,
-                    class_idx_path
-                )
-            else:
-                print(f"Warning: {model_name} fine-tuned model missing. "
-                      f"Loading default pretrained model.")
-                self._load_pretrained_model(
-                    model_name,
-                    model_info["model"],
-                    model_info["weights"]
-                )
-
-    def _load_finetuned_model(self, model_name: str, model_fn, model_path: str, class_idx_path: str) -> None:
+    def _load_model(self, model_name: str) -> LoadedModel:
+        """Registry loader: builds the classification or detection model registered under `model_name`."""
+        if model_name in self.CLASSIFICATION_MODELS:
+            return self._load_classification_model(model_name)
+        if model_name.endswith(INT8_SUFFIX):
+            return self._load_int8_model(model_name)
+        return LoadedModel(model_name, self._load_detection_model(model_name))
+
+    def _load_int8_model(self, model_name: str) -> LoadedModel:
+        """
+        Loads the INT8 variant of a classifier: the calibrated static artifact from
+        `manage.py calibrate_int8` if present, else dynamic quantization of the fp32 model.
+        Quantized kernels run on CPU only.
+        """
+        base_name = model_name[:-len(INT8_SUFFIX)]
+        base = self._load_classification_model(base_name, backend="eager")
+        model_path = os.path.join(self.CLASSIFICATION_PATH, self.CLASSIFICATION_MODELS[base_name]["filename"])
+
+        quantized = load_static_int8(model_path)
+        scheme = "static"
+        if quantized is None:
+            quantized = quantize_dynamic_int8(base.model)
+            scheme = "dynamic"
+
+        return LoadedModel(model_name, quantized, {
+            **base.meta,
+            "backend": f"int8-{scheme}",
+            "device": torch.device("cpu"),
+        })
+
+    def _load_classification_model(self, model_name: str, backend: Optional[str] = None) -> LoadedModel:
+        """
+        Loads a classification model: an exported ONNX/TorchScript artifact if present and allowed
+        by `backend` (CLASSIFICATION_BACKEND by default), else the fine-tuned weights, else the
+        pretrained model.
+        """
+        model_info = self.CLASSIFICATION_MODELS[model_name]
+        model_path = os.path.join(self.CLASSIFICATION_PATH, model_info["filename"])
+        class_idx_path = os.path.join(self.CLASSIFICATION_PATH, model_info["json"])
+        backend = backend or getattr(settings, "CLASSIFICATION_BACKEND", "auto")
+
+        if os.path.exists(class_idx_path):
+            exported = load_exported(model_path, backend, self.device)
+            if exported is not None:
+                return LoadedModel(model_name, exported, {
+                    "idx_to_class": self._read_class_index(class_idx_path),
+                    "backend": "onnx" if isinstance(exported, OnnxClassifier) else "torchscript",
+                })
+
+        if os.path.exists(model_path) and os.path.exists(class_idx_path):
+            return self._load_finetuned_model(
+                model_name,
+                model_info["model"],
+                model_path,
+                class_idx_path
+            )
+
+        print(f"Warning: {model_name} fine-tuned model missing. "
+              f"Loading default pretrained model.")
+        return self._load_pretrained_model(
+            model_name,
+            model_info["model"],
+            model_info["weights"]
+        )
+
+    def _load_finetuned_model(self, model_name: str, model_fn, model_path: str, class_idx_path: str) -> LoadedModel:
         """Loads a fine-tuned classification model with its class index mappings."""
-        with open(class_idx_path, "r") as f:
-            class_to_idx = json.load(f)
-            self.class_to_idx[model_name] = class_to_idx
-            self.idx_to_class[model_name] = {v: k for k, v in class_to_idx.items()}
+        idx_to_class = self._read_class_index(class_idx_path)
+        class_to_idx = {v: k for k, v in idx_to_class.items()}
 
         # Instantiate the base model
         model = model_fn(weights=None)
@@ -134,116 +231,549 @@ class AIClass:
         model.load_state_dict(torch.load(model_path, map_location=self.device))
         model.to(self.device).eval()
 
-        self.classification_models[model_name] = model
+        return LoadedModel(model_name, model, {"idx_to_class": idx_to_class})
+
+    @staticmethod
+    def _read_class_index(class_idx_path: str) -> Dict[int, str]:
+        """Reads a class index json ({class_name: idx}) and returns {idx: class_name}."""
+        with open(class_idx_path, "r") as f:
+            class_to_idx = json.load(f)
+        return {v: k for k, v in class_to_idx.items()}
 
-    def _load_pretrained_model(self, model_name: str, model_fn, model_weights) -> None:
+    def _load_pretrained_model(self, model_name: str, model_fn, model_weights) -> LoadedModel:
         """
         Loads a default pretrained model when the fine-tuned model files are not available.
         This fallback ensures the code runs even if fine-tuned weights are missing.
         """
         model = model_fn(weights=model_weights).to(self.device).eval()
-        self.classification_models[model_name] = model
+        return LoadedModel(model_name, model)
 
-    def _load_detection_models(self) -> None:
-        """Loads YOLO detection models."""
-        self.detection_models = {
-            key: YOLO(os.path.join(self.DETECTION_PATH, filename))
-            for key, filename in self.DETECTION_MODELS.items()
-        }
+    def _load_detection_model(self, model_name: str) -> YOLO:
+        """Loads a YOLO detection model."""
+        return YOLO(os.path.join(self.DETECTION_PATH, self.DETECTION_MODELS[model_name]))
 
-    def classify(self, image: Image.Image, model_name: str) -> Dict[str, str]:
-        """Classifies an image using the selected model."""
+    def model_fingerprint(self, model_name: str) -> str:
+        """
+        Short hash of everything outside the request that changes a model's results: its weight
+        and exported artifact files (size and mtime), the backend and detection settings, and
+        for cascade/ensemble/auto the member models. Part of the result cache key, so new weights,
+        exports or settings are never answered with stale results.
+        """
+        parts = [model_name, self.device.type]
+        files = []
+        if model_name == self.CASCADE_MODEL:
+            members = getattr(settings, "CLASSIFY_CASCADE_MODELS", ("mobilenet", "resnet"))
+            parts.append(getattr(settings, "CLASSIFY_CASCADE_THRESHOLD", None))
+        elif model_name == self.ENSEMBLE_MODEL:
+            members = getattr(settings, "CLASSIFY_ENSEMBLE_MODELS", ("mobilenet", "resnet", "efficientnet"))
+        elif model_name == self.AUTO_DETECTOR:
+            members = getattr(settings, "AUTO_DETECT_MODELS", ["yolov8_x", "yolov8_l", "yolov8_m"])
+        else:
+            members = []
+
+        if members:
+            parts += [self.model_fingerprint(member) for member in members]
+        elif model_name in self.DETECTION_MODELS:
+            files.append(os.path.join(self.DETECTION_PATH, self.DETECTION_MODELS[model_name]))
+            parts += [
+                getattr(settings, "DETECTION_DEFAULTS", {}),
+                getattr(settings, "DETECTION_MODEL_PARAMS", {}).get(model_name, {}),
+                getattr(settings, "DETECTION_PROFILES", {}),
+            ]
+        else:
+            base_name = model_name[:-len(INT8_SUFFIX)] if model_name.endswith(INT8_SUFFIX) else model_name
+            model_info = self.CLASSIFICATION_MODELS.get(base_name)
+            if model_info:
+                model_path = os.path.join(self.CLASSIFICATION_PATH, model_info["filename"])
+                files += [
+                    model_path,
+                    os.path.join(self.CLASSIFICATION_PATH, model_info["json"]),
+                    artifact_path(model_path, "onnx"),
+                    artifact_path(model_path, "torchscript"),
+                    static_artifact_path(model_path),
+                ]
+                parts.append(getattr(settings, "CLASSIFICATION_BACKEND", "auto"))
+
+        for path in files:
+            try:
+                stat = os.stat(path)
+                parts.append((path, stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                parts.append((path, None))  # Not exported (yet)
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+    def input_size(self, model_name: str) -> int:
+        """Smallest decode size (shorter side) that loses nothing for the given model."""
+        if model_name in self.DETECTION_MODELS or model_name == self.AUTO_DETECTOR:
+            return self.DETECTOR_INPUT_SIZE
+        return self.CLASSIFIER_INPUT_SIZE
+
+    def classify(self, image, model_name: str) -> Dict[str, str]:
+        """Classifies an image (RGB array from decode_image, or PIL image) using the selected model."""
+        return self.classify_many([image], model_name)[0]
+
+    def classify_many(self, images: list, model_name: str) -> List[Dict[str, str]]:
+        """
+        Classifies several images with the selected model, sharing batched forward passes.
+        `model_name` may also be 'cascade' or 'ensemble' (see _classify_cascade / _classify_ensemble).
+        """
         model_name = model_name.lower()
-        if model_name not in self.classification_models:
-            return {"error": f"Model '{model_name}' not found."}
+        if not images:
+            return []
+        if model_name == self.CASCADE_MODEL:
+            return self._classify_cascade(images)
+        if model_name == self.ENSEMBLE_MODEL:
+            return self._classify_ensemble(images)
+        if model_name not in self.classifier_keys():
+            return [{"error": f"Model '{model_name}' not found."} for _ in images]
+
+        input_tensors = [self.preprocess(image) for image in images]
+        outputs = [future.result() for future in self._classifier_futures(model_name, input_tensors)]
+        # Only on success: after a failure other batches may still be reading their inputs
+        self.preprocess.pool.release(input_tensors)
+
+        return [self._top1(probabilities, idx_to_class)[1] for probabilities, idx_to_class in outputs]
+
+    def _classify_cascade(self, images: list) -> List[Dict]:
+        """
+        Runs the cheap model (CLASSIFY_CASCADE_MODELS[0]) on every image and re-runs only the
+        images it is unsure about (confidence below CLASSIFY_CASCADE_THRESHOLD) on the strong
+        model, reusing the same preprocessed tensors. Each result reports its stages and timings.
+        """
+        cheap, strong = getattr(settings, "CLASSIFY_CASCADE_MODELS", ("mobilenet", "resnet"))
+        threshold = getattr(settings, "CLASSIFY_CASCADE_THRESHOLD", 0.8)
+
+        start = time.perf_counter()
+        input_tensors = [self.preprocess(image) for image in images]
+        preprocess_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        first = [future.result() for future in self._classifier_futures(cheap, input_tensors)]
+        cheap_ms = (time.perf_counter() - start) * 1000
+
+        escalate = [i for i, (probabilities, _) in enumerate(first) if probabilities.max().item() < threshold]
+        second, strong_ms = {}, 0.0
+        if escalate:
+            start = time.perf_counter()
+            futures = self._classifier_futures(strong, [input_tensors[i] for i in escalate])
+            second = dict(zip(escalate, [future.result() for future in futures]))
+            strong_ms = (time.perf_counter() - start) * 1000
+        self.preprocess.pool.release(input_tensors)
+
+        results = []
+        for i, output in enumerate(first):
+            _, result = self._top1(*output)
+            stages = [{"model": cheap, "confidence": result["confidence"], "ms": round(cheap_ms, 1)}]
+            if i in second:
+                _, result = self._top1(*second[i])
+                stages.append({"model": strong, "confidence": result["confidence"], "ms": round(strong_ms, 1)})
+            result.update({
+                "model_used": stages[-1]["model"],
+                "escalated": i in second,
+                "preprocess_ms": round(preprocess_ms, 1),
+                "stages": stages,
+            })
+            results.append(result)
+        return results
+
+    def _classify_ensemble(self, images: list) -> List[Dict]:
+        """
+        Queues one shared preprocessed tensor per image on every CLASSIFY_ENSEMBLE_MODELS member
+        before waiting, so the members run concurrently on their own batch workers, then
+        averages their softmax outputs. Each result reports the members' own top-1 and timings.
+        """
+        members = getattr(settings, "CLASSIFY_ENSEMBLE_MODELS", ("mobilenet", "resnet", "efficientnet"))
+
+        start = time.perf_counter()
+        input_tensors = [self.preprocess(image) for image in images]
+        preprocess_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        futures = {member: self._classifier_futures(member, input_tensors) for member in members}
+        outputs, member_ms = {}, {}
+        for member in members:
+            outputs[member] = [future.result() for future in futures[member]]
+            member_ms[member] = (time.perf_counter() - start) * 1000  # Finished by then
+        self.preprocess.pool.release(input_tensors)
+
+        if len({outputs[member][0][0].shape for member in members}) > 1:
+            error = "Ensemble members predict different class sets; use fine-tuned weights for all of them."
+            return [{"error": error} for _ in images]
+
+        results = []
+        for i in range(len(images)):
+            idx_to_class = outputs[members[0]][i][1]
+            averaged = torch.stack([outputs[member][i][0] for member in members]).mean(dim=0)
+            _, result = self._top1(averaged, idx_to_class)
+            result.update({
+                "preprocess_ms": round(preprocess_ms, 1),
+                "stages": [
+                    {
+                        "model": member,
+                        "confidence": self._top1(*outputs[member][i])[1]["confidence"],
+                        "ms": round(member_ms[member], 1),
+                    }
+                    for member in members
+                ],
+            })
+            results.append(result)
+        return results
+
+    def _classifier_futures(self, model_name: str, tensors: List[torch.Tensor]) -> list:
+        """Queues preprocessed tensors on the model's batcher and returns their Futures."""
+        return self.scheduler.submit_futures(model_name, tensors, partial(self._classify_batch, model_name))
+
+    @staticmethod
+    def _top1(probabilities: torch.Tensor, idx_to_class: Optional[dict]) -> Tuple[float, Dict[str, str]]:
+        """Returns (confidence, {"class_name", "confidence"}) for one softmax vector."""
+        confidence, predicted_idx = (value.item() for value in torch.max(probabilities, dim=0))
+        if idx_to_class:
+            predicted_class = idx_to_class.get(predicted_idx, str(predicted_idx))
+        else:
+            predicted_class = str(predicted_idx)
+        return confidence, {"class_name": predicted_class, "confidence": f"{confidence * 100:.2f}%"}
 
-        model = self.classification_models[model_name]
-        input_tensor = self.transform(image).unsqueeze(0).to(self.device)
+    def _classify_batch(self, model_name: str, tensors: List[torch.Tensor]) -> List[Tuple[torch.Tensor, Optional[dict]]]:
+        """Runs one forward pass over a batch of preprocessed tensors; returns (softmax vector, idx_to_class) per item."""
+        entry = self.registry.get(model_name)
+        idx_to_class = entry.meta.get("idx_to_class")
+        input_batch = torch.stack(tensors).to(entry.meta.get("device", self.device))
 
         with torch.no_grad():
-            outputs = model(input_tensor)
-            probabilities = torch.nn.functional.softmax(outputs[0], dim=0)
-            confidence, predicted_idx = torch.max(probabilities, dim=0)
+            outputs = entry.model(input_batch)
+            probabilities = torch.nn.functional.softmax(outputs, dim=1).cpu()
 
-        if model_name in self.idx_to_class:
-            predicted_class = self.idx_to_class[model_name].get(predicted_idx.item(), str(predicted_idx.item()))
-        else:
-            predicted_class = str(predicted_idx.item())
+        return [(row, idx_to_class) for row in probabilities]
+
+    def run_detection(self, image_files: list, model_choice: str, image_ids: List[int],
+                      output: str = "image", image_format: Optional[str] = None,
+                      quality: Optional[int] = None, params: Optional[Dict] = None) -> List[Optional[Dict]]:
+        """
+        Runs detection and returns one dict per image (None for every image if the model is unknown):
+          - {"weed_count", "crop_count", "detections"} (see detections_to_json); nothing is rendered
+          - output='image' adds "annotated_file", rendered and encoded as `image_format`
+        `params` comes from yolo_params.parse_detection_params (profile, imgsz, conf, iou, max_det,
+        classes); raises ValueError for class names the model does not know.
+        """
+        if model_choice == self.AUTO_DETECTOR:
+            megapixels = sum(getattr(image_file, "megapixels", 0.0) for image_file in image_files)
+            model_choice = self.router.choose(len(image_files), megapixels)
+        if model_choice not in self.DETECTION_MODELS:
+            return [None for _ in image_files]
+
+        yolo_kwargs = self._yolo_kwargs(model_choice, params)
+
+        # YOLO letterboxes to imgsz anyway, so JPEGs are decoded at a reduced scale
+        decoded = [image_pixels(image_file, yolo_kwargs["imgsz"]) for image_file in image_files]
+        images_cv = [image_cv for image_cv, _ in decoded]
+
+        # Run detection (batched with concurrent requests for the same model and parameters)
+        results = self._submit_detection(model_choice, images_cv, yolo_kwargs)
+
+        outputs = []
+        for result, (image_cv, scale), image_id in zip(results, decoded, image_ids):
+            out = self._detection_output(self._summarize_detections(result), image_cv, image_id,
+                                         output, image_format, quality, scale=scale)
+            out["model_used"] = model_choice
+            outputs.append(out)
+        return outputs
+
+    def detect_tiled(self, image_file, model_choice: str, image_id: int, output: str = "image",
+                     tile_size: Optional[int] = None, overlap: Optional[int] = None,
+                     batch_size: Optional[int] = None, image_format: Optional[str] = None,
+                     quality: Optional[int] = None, params: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        Sliced detection for high-resolution orthomosaics: the image is cut into overlapping
+        `tile_size` tiles that YOLO sees at full resolution, `batch_size` tiles are inferred
+        at a time, and boxes are shifted to global coordinates and merged across tiles
+        (see merge_tile_detections), so objects cut by a tile border are counted once.
+        Returns the same dict as run_detection, with counts for the whole mosaic.
+        """
+        if model_choice not in self.DETECTION_MODELS and model_choice != self.AUTO_DETECTOR:
+            return None
+
+        tile_size = tile_size or getattr(settings, "TILE_SIZE", 640)
+        overlap = getattr(settings, "TILE_OVERLAP", 128) if overlap is None else overlap
+        batch_size = batch_size or getattr(settings, "TILE_BATCH_SIZE", 8)
+
+        # Tiles are inferred at full resolution, so the mosaic is decoded in full
+        image_cv, _ = image_pixels(image_file)
+        height, width = image_cv.shape[:2]
+        windows = tile_windows(width, height, tile_size, overlap)
+        if model_choice == self.AUTO_DETECTOR:
+            # Every tile is a forward pass, so a mosaic counts as len(windows) images
+            model_choice = self.router.choose(len(windows), width * height / 1e6)
+        yolo_kwargs = self._yolo_kwargs(model_choice, params)
+
+        xyxy, conf, cls, tile_of = [], [], [], []
+        names = {}
+        for chunk, tiles in iter_tile_batches(image_cv, windows, batch_size):
+            results = self._submit_detection(model_choice, tiles, yolo_kwargs)
+            for window, result in zip(chunk, results):
+                tile = self._summarize_detections(result)
+                names = result[0].names
+                if not len(tile["cls"]):
+                    continue
+                x0, y0 = window[:2]
+                xyxy.append(tile["xyxy"] + np.array([x0, y0, x0, y0], dtype=tile["xyxy"].dtype))
+                conf.append(tile["conf"])
+                cls.append(tile["cls"])
+                tile_of.append(np.repeat(np.array([window]), len(tile["cls"]), axis=0))
+
+        merged = merge_tile_detections(
+            np.concatenate(xyxy) if xyxy else np.zeros((0, 4), dtype=np.float32),
+            np.concatenate(conf) if conf else np.zeros(0, dtype=np.float32),
+            np.concatenate(cls) if cls else np.zeros(0, dtype=np.int64),
+            np.concatenate(tile_of) if tile_of else np.zeros((0, 4), dtype=np.int64),
+            getattr(settings, "TILE_MERGE_THRESHOLD", 0.5)
+        )
+        detections = self._build_detections(*merged, names)
+
+        out = self._detection_output(detections, image_cv, image_id, output, image_format, quality)
+        out["tiles"] = len(windows)
+        out["model_used"] = model_choice
+        return out
+
+    def detect_stream(self, frames: Iterable[Tuple[int, Optional[float], np.ndarray]], model_choice: str,
+                      batch_size: int, output: str = "counts", params: Optional[Dict] = None) -> Iterator[Dict]:
+        """
+        Runs YOLO over a stream of (frame_index, timestamp_ms, rgb_frame) in batches of `batch_size`
+        and yields one result per frame as each batch completes. Only one batch of frames is held
+        at a time. output='boxes' adds the box arrays to every frame; 'counts' sends counts only.
+        With model_choice='auto' the detector is re-chosen for every batch.
+        """
+        batch = []
+        for frame in frames:
+            batch.append(frame)
+            if len(batch) == batch_size:
+                yield from self._detect_frames(batch, model_choice, output, params)
+                batch = []
+        if batch:
+            yield from self._detect_frames(batch, model_choice, output, params)
+
+    def _detect_frames(self, batch: list, model_choice: str, output: str,
+                       params: Optional[Dict] = None) -> Iterator[Dict]:
+        if model_choice == self.AUTO_DETECTOR:
+            model_choice = self.router.choose(len(batch))
+        results = self._submit_detection(
+            model_choice, [frame for _, _, frame in batch], self._yolo_kwargs(model_choice, params)
+        )
+        for (index, timestamp, _), result in zip(batch, results):
+            detections = self._summarize_detections(result)
+            out = {
+                "frame": index,
+                "time_ms": round(timestamp, 1) if timestamp is not None else None,
+                "model_used": model_choice,
+                "weed_count": detections["weed_count"],
+                "crop_count": detections["crop_count"],
+            }
+            if output == "boxes":
+                out["detections"] = self.detections_to_json(detections)
+            yield out
+
+    def _detection_output(self, detections: Dict[str, np.ndarray], image_cv: np.ndarray, image_id: int,
+                          output: str, image_format: Optional[str], quality: Optional[int],
+                          scale: float = 1.0) -> Dict:
+        """
+        Builds the per-image result dict for the requested output mode (see run_detection).
+        `scale` maps boxes from the decoded image back to the original upload's pixels.
+        """
+        if not len(detections["cls"]):
+            print(f"No detections found in image {image_id}")
+
+        # The compact box arrays are always returned so callers can persist them
+        out = {
+            "weed_count": detections["weed_count"],
+            "crop_count": detections["crop_count"],
+            "detections": self.detections_to_json(detections, scale),
+        }
+        if output == "image":
+            out["annotated_file"] = self._render_annotated(
+                image_cv, detections, image_id, image_format, quality
+            )
+        return out
+
+    @staticmethod
+    def detections_to_json(detections: Dict[str, np.ndarray], scale: float = 1.0) -> Dict[str, list]:
+        """
+        Compact JSON form of the boxes: "classes" lists the label of each class id and every
+        entry of "boxes" is [x1, y1, x2, y2, confidence, class_id] in pixel coordinates
+        (multiplied by `scale` when the image was decoded at a reduced size).
+        """
+        boxes = np.column_stack([
+            np.round(detections["xyxy"] * scale, 1),
+            np.round(detections["conf"], 3),
+            detections["cls"],
+        ]).tolist()
+        for box in boxes:
+            box[5] = int(box[5])
+        return {"classes": detections["labels"], "boxes": boxes}
+
+    def _yolo_kwargs(self, model_choice: str, params: Optional[Dict]) -> Dict:
+        """Resolved predict() arguments for `model_choice`, with class names mapped to the model's ids."""
+        yolo_kwargs = resolve_detection_params(model_choice, params or {})
+        if yolo_kwargs["classes"] is not None:
+            names = self.registry.get(model_choice).model.names
+            ids = {label.lower(): idx for idx, label in names.items()}
+            classes = []
+            for item in yolo_kwargs["classes"]:
+                idx = item if isinstance(item, int) else ids.get(item.lower())
+                if idx not in names:
+                    raise ValueError(f"Unknown class '{item}' for model '{model_choice}'")
+                classes.append(idx)
+            yolo_kwargs["classes"] = sorted(set(classes))
+        return yolo_kwargs
+
+    def _submit_detection(self, model_choice: str, images: List[np.ndarray], yolo_kwargs: Dict) -> List[list]:
+        """
+        Queues frames, each tagged with its predict() arguments, on the model's batcher and
+        counts them as in flight for routing.
+        """
+        with self.router.track(model_choice, len(images)):
+            return self.scheduler.submit_many(
+                model_choice, [(image, yolo_kwargs) for image in images], partial(self._detect_batch, model_choice)
+            )
+
+    def _detect_batch(self, model_choice: str, items: List[Tuple[np.ndarray, Dict]]) -> List[list]:
+        """
+        Runs YOLO over a batch of (frame, predict() arguments), one forward pass per distinct
+        set of arguments; each caller gets a one-element results list back.
+        """
+        groups: Dict[tuple, List[int]] = {}
+        for index, (_, yolo_kwargs) in enumerate(items):
+            signature = tuple(
+                (name, tuple(value) if isinstance(value, list) else value) for name, value in sorted(yolo_kwargs.items())
+            )
+            groups.setdefault(signature, []).append(index)
+
+        model = self.registry.get(model_choice).model
+        lock = self._predict_locks.setdefault(model_choice, threading.Lock())
+        outputs: List[Optional[list]] = [None] * len(items)
+        for indices in groups.values():
+            start = time.perf_counter()
+            with lock:
+                results = model([items[i][0] for i in indices], verbose=False, **items[indices[0]][1])
+            self.router.observe(model_choice, len(indices), (time.perf_counter() - start) * 1000)
+            for i, result in zip(indices, results):
+                outputs[i] = [result]
+        return outputs
+
+    def _label_table(self, names: Dict[int, str]) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """
+        Returns (labels, is_weed, colors) indexed by class id, built once per model label map:
+        is_weed is a bool array and colors an (n_classes, 3) array of MODEL_COLORS.
+        """
+        key = tuple(sorted(names.items()))
+        table = self._label_tables.get(key)
+        if table is None:
+            size = max(names) + 1 if names else 0
+            labels = [names.get(i, str(i)) for i in range(size)]
+            is_weed = np.array(["weed" in label.lower() for label in labels], dtype=bool)
+            colors = np.where(
+                is_weed[:, None],
+                np.array(self.MODEL_COLORS["weed"]),
+                np.array(self.MODEL_COLORS["crop"])
+            ).reshape(-1, 3)
+            table = (labels, is_weed, colors)
+            self._label_tables[key] = table
+        return table
+
+    def _summarize_detections(self, results) -> Dict[str, np.ndarray]:
+        """
+        Pulls boxes out of the YOLO results in one pass over the xyxy/conf/cls arrays
+        (no per-box tensor reads) and classifies every box as weed or crop via the label table.
+        """
+        xyxy, conf, cls = [], [], []
+        names = {}
+        for result in results:
+            boxes = result.boxes
+            names = result.names
+            if boxes is None or len(boxes) == 0:
+                continue
+            xyxy.append(boxes.xyxy.cpu().numpy())
+            conf.append(boxes.conf.cpu().numpy())
+            cls.append(boxes.cls.cpu().numpy().astype(np.int64))
+
+        return self._build_detections(
+            np.concatenate(xyxy) if xyxy else np.zeros((0, 4), dtype=np.float32),
+            np.concatenate(conf) if conf else np.zeros(0, dtype=np.float32),
+            np.concatenate(cls) if cls else np.zeros(0, dtype=np.int64),
+            names
+        )
+
+    def _build_detections(self, xyxy: np.ndarray, conf: np.ndarray, cls: np.ndarray,
+                          names: Dict[int, str]) -> Dict[str, np.ndarray]:
+        """Attaches labels, weed/crop flags, colours and counts to raw box arrays."""
+        labels, is_weed_table, colors = self._label_table(names)
+        is_weed = is_weed_table[cls]
+        weed_count = int(is_weed.sum())
 
         return {
-            "class_name": predicted_class,
-            "confidence": f"{confidence.item() * 100:.2f}%"
+            "xyxy": xyxy,
+            "conf": conf,
+            "cls": cls,
+            "is_weed": is_weed,
+            "colors": colors[cls],
+            "labels": labels,
+            "weed_count": weed_count,
+            "crop_count": len(cls) - weed_count,
         }
 
-    def detect(self, image_file, model_choice: str, image_id: int) -> Tuple[Optional[ContentFile], int, int]:
+    def _draw_detections(self, image_cv: np.ndarray, detections: Dict[str, np.ndarray]) -> None:
+        """Draws every box and its label onto image_cv in place."""
+        boxes = detections["xyxy"].astype(np.int32).tolist()
+        captions = [
+            f"{detections['labels'][c]}: {p:.2f}%"
+            for c, p in zip(detections["cls"].tolist(), (detections["conf"] * 100).tolist())
+        ]
+        for (x1, y1, x2, y2), color, caption in zip(boxes, detections["colors"].tolist(), captions):
+            color = tuple(color)
+            cv2.rectangle(image_cv, (x1, y1), (x2, y2), color, 3)
+            cv2.putText(image_cv, caption, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+
+    def _render_annotated(self, image_cv: np.ndarray, detections: Dict[str, np.ndarray], image_id: int,
+                          image_format: Optional[str] = None, quality: Optional[int] = None) -> ContentFile:
         """
-        Performs object detection on an image.
-        Returns (annotated_content_file, weed_count, crop_count).
+        Draws the detections and encodes the annotated image as a ContentFile, in
+        ANNOTATED_IMAGE_FORMAT / ANNOTATED_IMAGE_QUALITY unless overridden.
         """
-        image = Image.open(image_file).convert("RGB")
-        image_cv = np.array(image)
+        image_format, quality = resolve_format(image_format, quality)
+        self._draw_detections(image_cv, detections)
 
-        model = self.detection_models.get(model_choice)
-        if not model:
-            return None, 0, 0
+        # Encode straight from the numpy array into the ContentFile
+        return ContentFile(
+            encode_image(image_cv, image_format, quality),
+            name=f"annotated_{image_id}{extension_for(image_format)}"
+        )
 
-        # Run detection
-        results = model(image_cv)
+    def _fetch_wikipedia(self, class_name: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        """Fetches a page from Wikipedia; raises on network errors so they are not cached."""
+        page = self.wiki_api.page(class_name)
+        if not page.exists():
+            return None, None, None
+        # Return the entire summary to avoid indexing issues
+        return page.title, page.summary, page.fullurl
 
-        # Process the detections and return annotated image + counts
-        return self._process_detection_results(results, image_cv, image_id)
+    def class_names(self) -> List[str]:
+        """Every class name listed in the classification index files."""
+        names = set()
+        for model_info in self.CLASSIFICATION_MODELS.values():
+            class_idx_path = os.path.join(self.CLASSIFICATION_PATH, model_info["json"])
+            if os.path.exists(class_idx_path):
+                with open(class_idx_path, "r") as f:
+                    names.update(json.load(f))
+        return sorted(names)
 
-    def _process_detection_results(self, results, image_cv, image_id: int) -> Tuple[ContentFile, int, int]:
-        """Processes detection results, draws bounding boxes, and returns annotated image + counts."""
-        weed_count = 0
-        crop_count = 0
 
-        if not results or not results[0].boxes:
-            print(f"No detections found in image {image_id}")
+_shared_ai = None
+_shared_ai_lock = threading.Lock()
 
-        for result in results:
-            for box in result.boxes:
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                conf = float(box.conf[0]) * 100
-                label = result.names[int(box.cls[0])]
-
-                if "weed" in label.lower():
-                    color = self.MODEL_COLORS["weed"]
-                    weed_count += 1
-                else:
-                    color = self.MODEL_COLORS["crop"]
-                    crop_count += 1
-
-                cv2.rectangle(image_cv, (x1, y1), (x2, y2), color, 3)
-                cv2.putText(
-                    image_cv,
-                    f"{label}: {conf:.2f}%",
-                    (x1, y1 - 10),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    0.5,
-                    color,
-                    2
-                )
-
-        # Convert annotated image to a ContentFile
-        img_io = BytesIO()
-        Image.fromarray(image_cv).save(img_io, format="PNG")
-        img_io.seek(0)
-        annotated_file = ContentFile(img_io.read(), name=f"annotated_{image_id}.png")
-
-        return annotated_file, weed_count, crop_count
-
-    def retrieve_data(self, class_name: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
-        """
-        Retrieve data about the given class name using Wikipedia.
-        Returns a tuple (title, summary, url), or (None, None, None) if an error occurs or page not found.
-        """
-        try:
-            page = self.wiki_api.page(class_name)
-            if not page.exists():
-                return None, None, None
-            # Return the entire summary to avoid indexing issues
-            return page.title, page.summary, page.fullurl
-        except Exception:
-            # In a real scenario, you'd log the exception
-            return None, None, None
+
+def get_ai() -> AIClass:
+    """Returns the process-wide AIClass, creating it on first use. Models inside it load lazily."""
+    global _shared_ai
+    if _shared_ai is None:
+        with _shared_ai_lock:
+            if _shared_ai is None:
+                _shared_ai = AIClass()
+    return _shared_ai
@@ -0,0 +1,77 @@
+import os
+from typing import Optional
+
+import torch
+
+try:
+    import onnxruntime
+except ImportError:  # Optional: only needed for the ONNX backend
+    onnxruntime = None
+
+INPUT_SHAPE = (1, 3, 224, 224)
+
+
+def artifact_path(model_path: str, backend: str) -> str:
+    """Path of the exported artifact next to a fine-tuned .pth (ResNet50_finetuned.onnx / .ts)."""
+    extension = {"onnx": ".onnx", "torchscript": ".ts"}[backend]
+    return os.path.splitext(model_path)[0] + extension
+
+
+class OnnxClassifier:
+    """Wraps an ONNX Runtime session so it can be called like the eager torch module."""
+
+    def __init__(self, path: str):
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.memory_bytes = os.path.getsize(path)
+
+    def __call__(self, input_batch: torch.Tensor) -> torch.Tensor:
+        outputs = self.session.run(None, {self.input_name: input_batch.detach().cpu().numpy()})
+        return torch.from_numpy(outputs[0])
+
+
+def load_exported(model_path: str, backend: str, device: torch.device) -> Optional[object]:
+    """
+    Loads the exported artifact for `backend` ('auto', 'onnx', 'torchscript' or 'eager').
+    'auto' prefers ONNX (on CPU, when onnxruntime is installed), then TorchScript.
+    Returns None when no usable artifact exists, so the caller falls back to eager PyTorch.
+    """
+    candidates = {
+        "auto": ["onnx", "torchscript"] if device.type == "cpu" else ["torchscript"],
+        "onnx": ["onnx"],
+        "torchscript": ["torchscript"],
+        "eager": [],
+    }[backend]
+
+    for candidate in candidates:
+        path = artifact_path(model_path, candidate)
+        if not os.path.exists(path):
+            continue
+        if candidate == "onnx" and onnxruntime is not None:
+            return OnnxClassifier(path)
+        if candidate == "torchscript":
+            module = torch.jit.load(path, map_location=device).eval()
+            # Freezing turns the weights into graph constants, which parameters() no longer sees
+            module.memory_bytes = os.path.getsize(path)
+            return module
+    return None
+
+
+def export_onnx(model: torch.nn.Module, path: str) -> None:
+    """Exports a classifier to ONNX with a dynamic batch axis (so micro-batching still applies)."""
+    dummy = torch.randn(*INPUT_SHAPE)
+    torch.onnx.export(
+        model.cpu().eval(), dummy, path,
+        input_names=["input"], output_names=["logits"],
+        dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
+        opset_version=17
+    )
+
+
+def export_torchscript(model: torch.nn.Module, path: str) -> None:
+    """Traces a classifier to TorchScript and freezes it for inference."""
+    with torch.no_grad():
+        traced = torch.jit.trace(model.cpu().eval(), torch.randn(*INPUT_SHAPE))
+    torch.jit.save(torch.jit.freeze(traced), path)
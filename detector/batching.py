@@ -0,0 +1,148 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Hashable
+
+
+class MicroBatcher:
+    """
+    Background queue for one model key.
+
+    Callers `submit()` a single item and get a Future back. A worker thread gathers
+    up to `max_batch` items, or whatever arrived within `max_wait_ms` of the first one,
+    runs `run_batch(items)` once and scatters the returned list back to the callers.
+    """
+
+    def __init__(self, name: str, run_batch: Callable[[List[Any]], List[Any]],
+                 max_batch: int, max_wait_ms: float):
+        self.name = name
+        self.run_batch = run_batch
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._last_batch_size = 0
+
+        self._worker = threading.Thread(target=self._run, name=f"batcher-{name}", daemon=True)
+        self._worker.start()
+
+    def submit(self, item) -> Future:
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _collect(self) -> List[tuple]:
+        """Blocks for the first item, then fills the batch until it is full or the wait expires."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            items = [item for item, _ in batch]
+            futures = [future for _, future in batch]
+
+            try:
+                results = self.run_batch(items)
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+            else:
+                for future, result in zip(futures, results):
+                    future.set_result(result)
+
+            with self._lock:
+                self._batches += 1
+                self._items += len(batch)
+                self._last_batch_size = len(batch)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            batches, items, last = self._batches, self._items, self._last_batch_size
+        return {
+            "queue_depth": self._queue.qsize(),
+            "batches": batches,
+            "items": items,
+            "last_batch_size": last,
+            "mean_batch_size": round(items / batches, 2) if batches else 0.0,
+            "mean_batch_fill": round(items / (batches * self.max_batch), 3) if batches else 0.0,
+        }
+
+
+class BatchScheduler:
+    """One MicroBatcher per model key, created on first use and shared by the whole process."""
+
+    def __init__(self, max_batch: int, max_wait_ms: float):
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+        self._batchers: Dict[Hashable, MicroBatcher] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_batch > 1
+
+    def submit(self, key: Hashable, item, run_batch: Callable[[List[Any]], List[Any]]) -> Any:
+        """
+        Queues `item` on the batcher for `key` and waits for its result.
+        With batching disabled (max_batch <= 1) the item is run inline as a batch of one.
+        """
+        return self.submit_many(key, [item], run_batch)[0]
+
+    def submit_many(self, key: Hashable, items: List[Any],
+                    run_batch: Callable[[List[Any]], List[Any]]) -> List[Any]:
+        """Queues several items at once so they can share forward passes, and returns results in order."""
+        return [future.result() for future in self.submit_futures(key, items, run_batch)]
+
+    def submit_futures(self, key: Hashable, items: List[Any],
+                       run_batch: Callable[[List[Any]], List[Any]]) -> List[Future]:
+        """
+        Like submit_many but returns the Futures without waiting, so a caller can queue work
+        on several models before blocking. With batching disabled the items run inline.
+        """
+        if not items:
+            return []
+        if not self.enabled:
+            futures = []
+            for item in items:
+                future = Future()
+                try:
+                    future.set_result(run_batch([item])[0])
+                except Exception as e:
+                    future.set_exception(e)
+                futures.append(future)
+            return futures
+
+        with self._lock:
+            batcher = self._batchers.get(key)
+            if batcher is None:
+                batcher = MicroBatcher(str(key), run_batch, self.max_batch, self.max_wait_ms)
+                self._batchers[key] = batcher
+        return [batcher.submit(item) for item in items]
+
+    def queue_depth(self, key: Hashable) -> int:
+        with self._lock:
+            batcher = self._batchers.get(key)
+        return batcher.metrics()["queue_depth"] if batcher else 0
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            batchers = dict(self._batchers)
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait_ms,
+            "queues": {str(key): batcher.metrics() for key, batcher in batchers.items()},
+        }
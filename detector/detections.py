@@ -0,0 +1,67 @@
+from typing import Dict, List
+
+import numpy as np
+from django.db import transaction
+
+from . import rollups
+from .models import Detection, DetectionBox, ImageRecord
+
+
+def pack_boxes(boxes: List[list]) -> bytes:
+    """Packs [x1, y1, x2, y2, confidence, class_id] rows as a float32 blob."""
+    return np.asarray(boxes, dtype=np.float32).reshape(-1, 6).tobytes()
+
+
+def persist_detections(user, model_choice: str, entries: List[Dict]) -> List[ImageRecord]:
+    """
+    Stores detect-mode results with one bulk insert per table.
+    Each entry is {"image": uploaded file or storage name, "result": run_detection() output
+    with "detections" and, if an annotated image was saved, its storage name as "processed_image"}.
+    Records store the model that actually served each result ("model_used", e.g. for 'auto').
+    Returns the created ImageRecords in order.
+    """
+    if not entries:
+        return []
+
+    with transaction.atomic():
+        records = ImageRecord.objects.bulk_create([
+            ImageRecord(
+                user=user,
+                mode=ImageRecord.MODE_DETECT,
+                image_data=entry["image"],
+                processed_image=entry["result"].get("processed_image"),
+                model_chosen=entry["result"].get("model_used", model_choice),
+                crop_name="Detection",
+                summary=f"{entry['result']['weed_count']} weeds, {entry['result']['crop_count']} crops"
+            )
+            for entry in entries
+        ])
+
+        detections = []
+        for record, entry in zip(records, entries):
+            result = entry["result"]
+            boxes = result["detections"]["boxes"]
+            detections.append(Detection(
+                record=record,
+                user=user,
+                model_chosen=record.model_chosen,
+                weed_count=result["weed_count"],
+                crop_count=result["crop_count"],
+                mean_confidence=float(np.mean([box[4] for box in boxes])) if boxes else None,
+                classes=result["detections"]["classes"],
+                boxes=pack_boxes(boxes)
+            ))
+        detections = Detection.objects.bulk_create(detections)
+
+        box_rows = []
+        for detection in detections:
+            for x1, y1, x2, y2, confidence, class_id in detection.box_array().tolist():
+                label = detection.classes[int(class_id)]
+                box_rows.append(DetectionBox(
+                    detection=detection, label=label, is_weed="weed" in label.lower(),
+                    confidence=confidence, x1=x1, y1=y1, x2=x2, y2=y2
+                ))
+        DetectionBox.objects.bulk_create(box_rows, batch_size=500)
+        rollups.apply(records, detections)
+
+    return records
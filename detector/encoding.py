@@ -0,0 +1,46 @@
+from typing import Optional
+
+import cv2
+import numpy as np
+from django.conf import settings
+
+# format -> (file extension, OpenCV quality flag); PNG takes a fast compression level instead of a quality
+IMAGE_FORMATS = {
+    "jpeg": (".jpg", cv2.IMWRITE_JPEG_QUALITY),
+    "webp": (".webp", cv2.IMWRITE_WEBP_QUALITY),
+    "png": (".png", cv2.IMWRITE_PNG_COMPRESSION),
+}
+PNG_COMPRESSION = 1
+
+
+def resolve_format(image_format: Optional[str] = None, quality: Optional[int] = None):
+    """Fills in ANNOTATED_IMAGE_FORMAT / ANNOTATED_IMAGE_QUALITY defaults; raises ValueError if invalid."""
+    image_format = (image_format or getattr(settings, "ANNOTATED_IMAGE_FORMAT", "jpeg")).lower()
+    if image_format == "jpg":
+        image_format = "jpeg"
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"Invalid image format (must be one of {', '.join(IMAGE_FORMATS)})")
+
+    quality = int(quality if quality is not None else getattr(settings, "ANNOTATED_IMAGE_QUALITY", 90))
+    if not 1 <= quality <= 100:
+        raise ValueError("Invalid image quality (must be between 1 and 100)")
+    return image_format, quality
+
+
+def encode_image(image_rgb: np.ndarray, image_format: str, quality: int) -> bytes:
+    """
+    Encodes an RGB array straight from numpy with cv2.imencode.
+    The array is converted to BGR in place (no extra frame-sized copy), so callers must not reuse it.
+    """
+    extension, flag = IMAGE_FORMATS[image_format]
+    value = PNG_COMPRESSION if image_format == "png" else quality
+
+    cv2.cvtColor(image_rgb, cv2.COLOR_RGB2BGR, dst=image_rgb)
+    ok, buffer = cv2.imencode(extension, image_rgb, [flag, value])
+    if not ok:
+        raise ValueError(f"Could not encode image as {image_format}")
+    return buffer.tobytes()
+
+
+def extension_for(image_format: str) -> str:
+    return IMAGE_FORMATS[image_format][0]
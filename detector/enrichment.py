@@ -0,0 +1,108 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .ai_class import get_ai
+from .models import ImageRecord
+
+NO_DATA_TITLE = "No data found"
+NO_DATA_SUMMARY = "No summary available"
+
+
+def wiki_fields(value):
+    """Maps a (title, summary, url) lookup to the values stored on ImageRecord, with fallbacks if no page is found."""
+    title, summary, url = value
+    if not title:
+        return NO_DATA_TITLE, NO_DATA_SUMMARY, None
+    return title, summary, url
+
+
+class EnrichmentWorker:
+    """
+    Fills in ImageRecord.summary from Wikipedia after the classify response has been sent.
+
+    Each lookup gets `retries` extra attempts with exponential backoff; the per-attempt
+    timeout is enforced by the Wikipedia client (WIKI_TIMEOUT_SECONDS).
+    """
+
+    def __init__(self, workers: int, retries: int, backoff_seconds: float):
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="wiki-enrich")
+
+    def enqueue(self, record_ids: Iterable[int], class_name: str) -> None:
+        self._executor.submit(self._run, list(record_ids), class_name)
+
+    def _run(self, record_ids, class_name: str) -> None:
+        close_old_connections()
+        try:
+            records = ImageRecord.objects.filter(id__in=record_ids)
+            for attempt in range(self.retries + 1):
+                try:
+                    value = get_ai().wiki_cache.get(class_name)
+                except Exception as e:
+                    print(f"Wikipedia lookup for {class_name} failed (attempt {attempt + 1}): {e}")
+                    if attempt < self.retries:
+                        time.sleep(self.backoff_seconds * (2 ** attempt))
+                    continue
+
+                title, summary, url = wiki_fields(value)
+                records.update(
+                    summary=summary, wiki_title=title, wiki_url=url,
+                    summary_status=ImageRecord.SUMMARY_READY
+                )
+                return
+
+            records.update(summary=NO_DATA_SUMMARY, summary_status=ImageRecord.SUMMARY_FAILED)
+        finally:
+            close_old_connections()
+
+
+def enrich(records, class_name: str):
+    """
+    Attaches the Wikipedia summary to freshly classified records.
+
+    If the summary is already cached (memory or DB) it is applied right away and returned;
+    otherwise the records are left pending for the background worker and None is returned.
+    """
+    cached = get_ai().wiki_cache.peek(class_name)
+    if cached is not None:
+        title, summary, url = wiki_fields(cached)
+        for record in records:
+            record.wiki_title, record.summary, record.wiki_url = title, summary, url
+            record.summary_status = ImageRecord.SUMMARY_READY
+        return title, summary, url
+
+    for record in records:
+        record.summary = "Processing..."
+        record.summary_status = ImageRecord.SUMMARY_PENDING
+    return None
+
+
+def schedule(records, class_name: str) -> None:
+    """Queues background enrichment for any of `records` still pending."""
+    pending = [record.id for record in records if record.summary_status == ImageRecord.SUMMARY_PENDING]
+    if pending:
+        get_enrichment_worker().enqueue(pending, class_name)
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_enrichment_worker() -> EnrichmentWorker:
+    """Returns the process-wide EnrichmentWorker, starting it on first use."""
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                _worker = EnrichmentWorker(
+                    workers=getattr(settings, "WIKI_ENRICH_WORKERS", 2),
+                    retries=getattr(settings, "WIKI_ENRICH_RETRIES", 2),
+                    backoff_seconds=getattr(settings, "WIKI_ENRICH_BACKOFF_SECONDS", 1.0)
+                )
+    return _worker
@@ -0,0 +1,89 @@
+import csv
+import json
+from typing import Dict, Iterable, Iterator
+
+EXPORT_FORMATS = ("csv", "ndjson", "parquet")
+EXPORT_CONTENT_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# (output column, ImageRecord lookup)
+EXPORT_COLUMNS = (
+    ("image_id", "id"),
+    ("username", "user__username"),
+    ("created_at", "created_at"),
+    ("model_chosen", "model_chosen"),
+    ("crop_name", "crop_name"),
+    ("summary_status", "summary_status"),
+    ("summary", "summary"),
+    ("image_path", "image_data"),
+)
+
+
+def iter_rows(records, chunk_size: int) -> Iterator[Dict]:
+    """Streams records as plain dicts, fetching `chunk_size` rows at a time from a server-side cursor."""
+    lookups = [lookup for _, lookup in EXPORT_COLUMNS]
+    names = [name for name, _ in EXPORT_COLUMNS]
+    rows = records.order_by("created_at", "id").values_list(*lookups).iterator(chunk_size=chunk_size)
+    for row in rows:
+        yield dict(zip(names, row))
+
+
+class _Echo:
+    """File-like object whose write() hands the line back, so csv.writer can feed a generator."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows: Iterable[Dict]) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _ in EXPORT_COLUMNS])
+    for row in rows:
+        yield writer.writerow([row[name] for name, _ in EXPORT_COLUMNS])
+
+
+def iter_ndjson(rows: Iterable[Dict]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(row, default=str) + "\n"
+
+
+def write_parquet(rows: Iterable[Dict], sink, chunk_size: int) -> int:
+    """
+    Writes rows to a Parquet file (a path, or a binary file object that is left open) one
+    row group per `chunk_size` rows through pandas, so memory holds a single chunk however
+    large the table is. Returns the row count.
+    """
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    total = 0
+    chunk = []
+
+    def flush():
+        nonlocal writer
+        frame = pd.DataFrame(chunk, columns=[name for name, _ in EXPORT_COLUMNS])
+        frame["created_at"] = pd.to_datetime(frame["created_at"], utc=True)
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(sink, table.schema)
+        writer.write_table(table)
+
+    try:
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                flush()
+                total += len(chunk)
+                chunk = []
+        if chunk or writer is None:
+            flush()
+            total += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return total
@@ -0,0 +1,85 @@
+import base64
+from datetime import datetime, time as dt_time
+from typing import Optional, Tuple
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import ImageRecord
+
+# Columns returned by the history API (projected with .values(), no model instances)
+HISTORY_FIELDS = (
+    "id", "user__username", "summary", "summary_status",
+    "model_chosen", "crop_name", "image_data", "created_at",
+)
+
+
+def _parse_bound(value: str, end_of_day: bool) -> datetime:
+    """Parses an ISO date or datetime filter value; a bare date covers the whole day."""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date '{value}' (use YYYY-MM-DD or an ISO datetime)")
+        parsed = datetime.combine(day, dt_time.max if end_of_day else dt_time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def history_queryset(user, params):
+    """
+    ImageRecords visible to `user` (admins, or None for management commands, see everyone),
+    narrowed by the optional filters in `params`: user, model_chosen, crop_name, date_from
+    and date_to. Raises ValueError for malformed filter values.
+    """
+    records = ImageRecord.objects.all()
+
+    if user is not None and not user.is_admin:
+        records = records.filter(user=user)
+    elif params.get("user"):
+        records = records.filter(user__username=params["user"])
+
+    if params.get("model_chosen"):
+        records = records.filter(model_chosen=params["model_chosen"])
+    if params.get("crop_name"):
+        records = records.filter(crop_name=params["crop_name"])
+    if params.get("date_from"):
+        records = records.filter(created_at__gte=_parse_bound(params["date_from"], end_of_day=False))
+    if params.get("date_to"):
+        records = records.filter(created_at__lte=_parse_bound(params["date_to"], end_of_day=True))
+    return records
+
+
+def encode_cursor(created_at: datetime, record_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{record_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        created_at, record_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        parsed = parse_datetime(created_at)
+        if parsed is None:
+            raise ValueError
+        return parsed, int(record_id)
+    except ValueError:
+        raise ValueError("Invalid cursor")
+
+
+def keyset_page(records, cursor: Optional[str], limit: int):
+    """
+    Returns (rows, next_cursor) for one page ordered newest first on (created_at, id).
+    The cursor seeks past the last row seen, so every page costs the same regardless of depth.
+    """
+    records = records.order_by("-created_at", "-id")
+    if cursor:
+        created_at, record_id = decode_cursor(cursor)
+        records = records.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=record_id))
+
+    rows = list(records.values(*HISTORY_FIELDS)[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    return rows, next_cursor
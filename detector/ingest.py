@@ -0,0 +1,119 @@
+import hashlib
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from PIL import Image, UnidentifiedImageError
+
+from .preprocessing import decode_image
+
+# Container formats accepted for inference (MPO is the multi-picture JPEG some phones write)
+ALLOWED_FORMATS = ("JPEG", "MPO", "PNG", "WEBP", "BMP", "TIFF")
+
+
+class UploadRejected(ValueError):
+    """An upload refused during ingest; `status` is the HTTP status to answer with."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+class IngestedImage:
+    """
+    A validated upload: the original file (stored as-is), its sha256 and header facts.
+    Pixels are decoded at most once per target size and shared by every consumer.
+    """
+
+    def __init__(self, file, digest: str, width: int, height: int, image_format: str):
+        self.file = file
+        self.digest = digest
+        self.width = width
+        self.height = height
+        self.format = image_format
+        self._decoded: Dict[Optional[int], Tuple[np.ndarray, float]] = {}
+
+    @property
+    def name(self) -> str:
+        return self.file.name
+
+    @property
+    def megapixels(self) -> float:
+        return self.width * self.height / 1e6
+
+    def decode(self, target_size: Optional[int] = None) -> Tuple[np.ndarray, float]:
+        """
+        Returns (rgb, scale) as decode_image does, decoding only on the first call per size.
+        The array is shared: annotated rendering draws on it, so it must be the last consumer.
+        """
+        if target_size not in self._decoded:
+            self._decoded[target_size] = decode_image(_source(self.file), target_size)
+        return self._decoded[target_size]
+
+
+def _source(uploaded):
+    """Large uploads were spooled to disk by Django: decode from that path instead of a buffer copy."""
+    if hasattr(uploaded, "temporary_file_path"):
+        return uploaded.temporary_file_path()
+    uploaded.seek(0)
+    return uploaded
+
+
+def _digest(uploaded) -> str:
+    getbuffer = getattr(getattr(uploaded, "file", None), "getbuffer", None)
+    if getbuffer is not None:
+        # In-memory upload: hash the existing buffer without copying it
+        return hashlib.sha256(getbuffer()).hexdigest()
+    digest = hashlib.sha256()
+    for chunk in uploaded.chunks():  # chunks() rewinds the file first
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def check_size(size: int) -> None:
+    """Raises UploadRejected (413) when `size` bytes exceeds UPLOAD_MAX_BYTES."""
+    max_bytes = getattr(settings, "UPLOAD_MAX_BYTES", 50 * 1024 * 1024)
+    if size > max_bytes:
+        raise UploadRejected(
+            f"Image too large ({size / (1024 * 1024):.1f} MB, max {max_bytes / (1024 * 1024):.0f} MB)",
+            status=413
+        )
+
+
+def ingest(uploaded) -> IngestedImage:
+    """
+    Validates an uploaded image without decoding it: byte size first, then the format and
+    dimensions from the header alone, so decompression bombs are refused before any pixel
+    buffer is allocated. Raises UploadRejected.
+    """
+    check_size(uploaded.size)
+
+    try:
+        with Image.open(_source(uploaded)) as image:  # Parses the header only
+            width, height = image.size
+            image_format = image.format
+    except Image.DecompressionBombError:
+        # Pillow's own limit (twice MAX_IMAGE_PIXELS) can trip before ours below
+        raise UploadRejected("Image dimensions too large", status=413)
+    except (UnidentifiedImageError, OSError):
+        raise UploadRejected("Unsupported or corrupt image file")
+
+    if image_format not in ALLOWED_FORMATS:
+        raise UploadRejected(f"Unsupported image format '{image_format}'", status=415)
+
+    max_pixels = getattr(settings, "UPLOAD_MAX_PIXELS", 150_000_000)
+    if width * height > max_pixels:
+        raise UploadRejected(
+            f"Image dimensions too large ({width}x{height}, max {max_pixels / 1e6:.0f} MP)", status=413
+        )
+
+    digest = _digest(uploaded)
+    uploaded.seek(0)
+    return IngestedImage(uploaded, digest, width, height, image_format)
+
+
+def image_pixels(image, target_size: Optional[int] = None) -> Tuple[np.ndarray, float]:
+    """(rgb, scale) for an IngestedImage (decoded once, then reused) or any other image file."""
+    if isinstance(image, IngestedImage):
+        return image.decode(target_size)
+    return decode_image(image, target_size)
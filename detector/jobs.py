@@ -0,0 +1,170 @@
+import logging
+import os
+import random
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import DatabaseError, close_old_connections
+from django.utils import timezone
+
+from .ai_class import get_ai
+from .detections import persist_detections
+from .models import InferenceJob
+from .storage import store_detected_image
+
+logger = logging.getLogger(__name__)
+
+
+class JobRunner:
+    """
+    In-process background executor for detection jobs.
+
+    Job state lives in the InferenceJob table (SQLite by default), so no external broker
+    is needed. `workers` threads pick jobs up; at most `max_concurrency` of them run a
+    forward pass at the same time, so a pile of heavy jobs cannot starve the web workers.
+
+    Several processes (WSGI workers) may share the table: a job runs only in the runner
+    that atomically claims it (queued -> running), and the owner refreshes a heartbeat
+    while it runs. Every `heartbeat` seconds each runner re-queues running jobs whose
+    heartbeat is older than `stale_after` (their process died) and picks up queued jobs
+    it has not seen yet, so no job is lost across restarts or run twice.
+    """
+
+    def __init__(self, workers: int, max_concurrency: int, heartbeat: float = 30, stale_after: float = 120):
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="inference-job")
+        self._inference_slots = threading.BoundedSemaphore(max(1, max_concurrency))
+        self._heartbeat = heartbeat
+        self._stale_after = timedelta(seconds=stale_after)
+        self._seen = set()  # Job ids handed to the executor by this runner
+        self._seen_lock = threading.Lock()
+        self._recover()
+        threading.Thread(target=self._maintain, name="inference-job-heartbeat", daemon=True).start()
+
+    def _recover(self) -> None:
+        """Re-queues jobs whose owner stopped heartbeating, then queues every unclaimed job not seen yet."""
+        InferenceJob.objects.filter(
+            status=InferenceJob.STATUS_RUNNING, heartbeat_at__lt=timezone.now() - self._stale_after
+        ).update(status=InferenceJob.STATUS_QUEUED, owner=None)
+        for job_id in InferenceJob.objects.filter(status=InferenceJob.STATUS_QUEUED).values_list("id", flat=True):
+            self._enqueue(job_id)
+
+    def _maintain(self) -> None:
+        stop = threading.Event()
+        while not stop.wait(self._heartbeat):
+            close_old_connections()
+            try:
+                InferenceJob.objects.filter(
+                    owner=self.owner, status=InferenceJob.STATUS_RUNNING
+                ).update(heartbeat_at=timezone.now())
+                self._recover()
+            except DatabaseError:
+                logger.exception("Job heartbeat failed")
+            finally:
+                close_old_connections()
+
+    def _enqueue(self, job_id) -> None:
+        with self._seen_lock:
+            if job_id in self._seen:
+                return
+            self._seen.add(job_id)
+        self._executor.submit(self._run, job_id)
+
+    def submit(self, job: InferenceJob) -> None:
+        self._enqueue(job.id)
+
+    def _claim(self, job_id) -> bool:
+        """Atomically moves a queued job to running under this runner; False if someone else has it."""
+        now = timezone.now()
+        return InferenceJob.objects.filter(id=job_id, status=InferenceJob.STATUS_QUEUED).update(
+            status=InferenceJob.STATUS_RUNNING, owner=self.owner, started_at=now, heartbeat_at=now
+        ) == 1
+
+    def _finish(self, job: InferenceJob) -> bool:
+        """
+        Stores the outcome only while this runner still owns the job; False if it was re-queued
+        as stale in the meantime (the runner that reclaimed it reports the result instead).
+        """
+        job.finished_at = timezone.now()
+        updated = InferenceJob.objects.filter(
+            id=job.id, owner=self.owner, status=InferenceJob.STATUS_RUNNING
+        ).update(status=job.status, result=job.result, error=job.error, finished_at=job.finished_at)
+        if not updated:
+            logger.warning("Job %s was reclaimed by another runner; result discarded", job.id)
+        return updated == 1
+
+    def _run(self, job_id) -> None:
+        close_old_connections()
+        try:
+            if not self._claim(job_id):
+                return
+            job = InferenceJob.objects.get(id=job_id)
+
+            try:
+                with self._inference_slots:
+                    with job.image_data.open("rb") as image_file:
+                        detection = get_ai().run_detection(
+                            [image_file], job.model_chosen, [random.randint(1000, 9999)]
+                        )[0]
+
+                if detection is None:
+                    raise ValueError(f"Detection model '{job.model_chosen}' not found.")
+
+                detection["processed_image"] = store_detected_image(detection["annotated_file"])
+                record = persist_detections(
+                    job.user, job.model_chosen, [{"image": job.image_data.name, "result": detection}]
+                )[0]
+
+                job.result = {
+                    "image_id": record.id,
+                    "model_used": detection["model_used"],
+                    "weed_count": detection["weed_count"],
+                    "crop_count": detection["crop_count"],
+                    "processed_image_url": default_storage.url(detection["processed_image"]),
+                }
+                job.status = InferenceJob.STATUS_SUCCEEDED
+            except Exception as e:
+                job.error = str(e)
+                job.status = InferenceJob.STATUS_FAILED
+
+            self._finish(job)
+        finally:
+            with self._seen_lock:
+                self._seen.discard(job_id)
+            close_old_connections()
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner() -> JobRunner:
+    """Returns the process-wide JobRunner, starting it on first use."""
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                _runner = JobRunner(
+                    workers=getattr(settings, "JOB_WORKERS", 2),
+                    max_concurrency=getattr(settings, "JOB_MAX_CONCURRENT_INFERENCE", 1),
+                    heartbeat=getattr(settings, "JOB_HEARTBEAT_SECONDS", 30),
+                    stale_after=getattr(settings, "JOB_STALE_SECONDS", 120)
+                )
+    return _runner
+
+
+def start_job_runner() -> None:
+    """
+    Starts the runner when the web process boots (called from wsgi.py / asgi.py), so jobs
+    queued before a restart resume without waiting for the next submission.
+    """
+    try:
+        get_job_runner()
+    except DatabaseError:
+        # Tables not migrated yet; the runner starts on the first submitted job instead
+        logger.warning("Job runner not started: job table unavailable")
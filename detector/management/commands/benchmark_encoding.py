@@ -0,0 +1,51 @@
+import time
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+from django.core.management.base import BaseCommand, CommandError
+
+from detector.encoding import IMAGE_FORMATS, encode_image
+
+
+class Command(BaseCommand):
+    help = "Compares encode time and output size of the annotated-image codecs on a sample image."
+
+    def add_arguments(self, parser):
+        parser.add_argument("image", help="Sample image (e.g. a full-resolution drone frame).")
+        parser.add_argument("--quality", type=int, nargs="+", default=[75, 90], help="Qualities to try for jpeg/webp.")
+        parser.add_argument("--repeat", type=int, default=5, help="Encodes per configuration.")
+
+    def handle(self, *args, **options):
+        try:
+            image_rgb = np.array(Image.open(options["image"]).convert("RGB"))
+        except OSError as e:
+            raise CommandError(f"Could not read {options['image']}: {e}")
+
+        height, width = image_rgb.shape[:2]
+        self.stdout.write(f"{width}x{height} ({width * height / 1e6:.1f} MP), {options['repeat']} runs each\n")
+        self.stdout.write(f"{'codec':<24}{'ms/encode':>12}{'KiB':>12}")
+
+        # Previous behaviour, for reference: PIL lossless PNG through a BytesIO
+        self._report("PIL png (previous)", options["repeat"], lambda: self._pil_png(image_rgb))
+
+        for image_format in IMAGE_FORMATS:
+            qualities = [None] if image_format == "png" else options["quality"]
+            for quality in qualities:
+                label = f"cv2 {image_format}" + (f" q={quality}" if quality else "")
+                # encode_image converts in place, so each run gets a fresh copy
+                self._report(label, options["repeat"], lambda q=quality, f=image_format: encode_image(image_rgb.copy(), f, q or 90))
+
+    def _report(self, label, repeat, encode):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            data = encode()
+            timings.append(time.perf_counter() - start)
+        self.stdout.write(f"{label:<24}{np.median(timings) * 1000:>12.1f}{len(data) / 1024:>12.1f}")
+
+    @staticmethod
+    def _pil_png(image_rgb):
+        img_io = BytesIO()
+        Image.fromarray(image_rgb).save(img_io, format="PNG")
+        return img_io.getvalue()
@@ -0,0 +1,56 @@
+import time
+
+import numpy as np
+from PIL import Image
+from django.core.management.base import BaseCommand, CommandError
+from torchvision import transforms
+
+from detector.preprocessing import IMAGENET_MEAN, IMAGENET_STD, ClassifierPreprocessor, decode_image
+
+
+class Command(BaseCommand):
+    help = "Reports decode + preprocess time per megapixel for the classifier and detector input paths."
+
+    def add_arguments(self, parser):
+        parser.add_argument("images", nargs="+", help="Sample uploads (e.g. full-resolution phone photos).")
+        parser.add_argument("--classifier-size", type=int, default=224)
+        parser.add_argument("--detector-size", type=int, default=640)
+        parser.add_argument("--repeat", type=int, default=5, help="Runs per image and pipeline.")
+
+    def handle(self, *args, **options):
+        size = options["classifier_size"]
+        preprocess = ClassifierPreprocessor(size, pool_size=1)
+        # Previous behaviour, for reference: full decode, then torchvision transforms on the PIL image
+        transform = transforms.Compose([
+            transforms.Resize((size, size)),
+            transforms.ToTensor(),
+            transforms.Normalize(IMAGENET_MEAN, IMAGENET_STD),
+        ])
+
+        pipelines = [
+            ("classify: PIL + transforms (previous)", lambda path: transform(Image.open(path).convert("RGB"))),
+            ("classify: draft decode + preprocess", lambda path: preprocess.pool.release(
+                [preprocess(decode_image(path, size)[0])]
+            )),
+            ("detect: full decode (previous)", lambda path: np.array(Image.open(path).convert("RGB"))),
+            ("detect: draft decode", lambda path: decode_image(path, options["detector_size"])),
+        ]
+
+        for path in options["images"]:
+            try:
+                with Image.open(path) as image:
+                    width, height = image.size
+            except OSError as e:
+                raise CommandError(f"Could not read {path}: {e}")
+            megapixels = width * height / 1e6
+
+            self.stdout.write(f"\n{path}: {width}x{height} ({megapixels:.1f} MP), {options['repeat']} runs each")
+            self.stdout.write(f"{'pipeline':<40}{'ms/image':>12}{'ms/MP':>12}")
+            for label, run in pipelines:
+                timings = []
+                for _ in range(options["repeat"]):
+                    start = time.perf_counter()
+                    run(path)
+                    timings.append(time.perf_counter() - start)
+                ms = np.median(timings) * 1000
+                self.stdout.write(f"{label:<40}{ms:>12.1f}{ms / megapixels:>12.2f}")
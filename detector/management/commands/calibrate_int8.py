@@ -0,0 +1,88 @@
+import os
+import time
+
+import torch
+from django.core.management.base import BaseCommand, CommandError
+
+from detector.ai_class import AIClass
+from detector.preprocessing import decode_image
+from detector.quantization import (
+    quantize_dynamic_int8, quantize_static_int8, save_static_int8, static_artifact_path
+)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+class Command(BaseCommand):
+    help = ("Builds INT8 variants of the classifiers from a local image folder and reports "
+            "top-1 agreement and ms/image against the fp32 model. Saves the static artifact "
+            "served under the '<model>_int8' key.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("images", help="Folder of representative field images.")
+        parser.add_argument("models", nargs="*", help="Model keys to quantize (default: all classifiers).")
+        parser.add_argument("--calibration", type=int, default=64, help="Images used to calibrate static quantization.")
+        parser.add_argument("--batch-size", type=int, default=8, help="Batch size used for timing.")
+        parser.add_argument("--no-save", action="store_true", help="Report only; do not write the static INT8 artifact.")
+
+    def handle(self, *args, **options):
+        torch.set_grad_enabled(False)
+        ai = AIClass()
+        ai.device = torch.device("cpu")  # INT8 kernels are CPU-only; compare like with like
+
+        keys = options["models"] or list(AIClass.CLASSIFICATION_MODELS)
+        unknown = [key for key in keys if key not in AIClass.CLASSIFICATION_MODELS]
+        if unknown:
+            raise CommandError(f"Unknown classification models: {', '.join(unknown)}")
+
+        inputs = self._load_images(ai, options["images"])
+        batch_size = max(1, options["batch_size"])
+        calibration = [inputs[i:i + batch_size] for i in range(0, min(len(inputs), options["calibration"]), batch_size)]
+
+        for key in keys:
+            fp32 = ai._load_classification_model(key, backend="eager").model
+            fp32_pred, fp32_ms = self._evaluate(fp32, inputs, batch_size)
+            self.stdout.write(f"{key} [fp32]: {fp32_ms:.2f} ms/image")
+
+            variants = {"dynamic": quantize_dynamic_int8(fp32)}
+            try:
+                variants["static"] = quantize_static_int8(fp32, calibration)
+            except Exception as e:
+                self.stdout.write(self.style.WARNING(f"{key}: static quantization failed ({e}); dynamic only."))
+
+            for scheme, model in variants.items():
+                pred, ms = self._evaluate(model, inputs, batch_size)
+                agreement = (pred == fp32_pred).float().mean().item() * 100
+                self.stdout.write(
+                    f"{key} [int8-{scheme}]: {ms:.2f} ms/image ({fp32_ms / ms:.2f}x), "
+                    f"top-1 agreement {agreement:.2f}%"
+                )
+
+            if "static" in variants and not options["no_save"]:
+                model_path = os.path.join(AIClass.CLASSIFICATION_PATH, AIClass.CLASSIFICATION_MODELS[key]["filename"])
+                save_static_int8(variants["static"], static_artifact_path(model_path))
+                self.stdout.write(self.style.SUCCESS(f"{key}: saved {static_artifact_path(model_path)}"))
+
+    def _load_images(self, ai, folder):
+        if not os.path.isdir(folder):
+            raise CommandError(f"{folder} is not a directory")
+        paths = sorted(
+            os.path.join(folder, name) for name in os.listdir(folder)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        if not paths:
+            raise CommandError(f"No images found in {folder}")
+        # Same decode and preprocessing as live requests, so calibration sees real input statistics
+        return torch.stack([
+            ai.preprocess(decode_image(path, ai.CLASSIFIER_INPUT_SIZE)[0]) for path in paths
+        ])
+
+    def _evaluate(self, model, inputs, batch_size):
+        """Returns (top-1 predictions, ms per image) over all inputs."""
+        model(inputs[:1])  # warm-up
+        predictions = []
+        start = time.perf_counter()
+        for i in range(0, len(inputs), batch_size):
+            predictions.append(model(inputs[i:i + batch_size]).argmax(dim=1))
+        elapsed = time.perf_counter() - start
+        return torch.cat(predictions), elapsed * 1000 / len(inputs)
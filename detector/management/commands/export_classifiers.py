@@ -0,0 +1,75 @@
+import os
+
+import torch
+from django.core.management.base import BaseCommand, CommandError
+
+from detector.ai_class import AIClass
+from detector.backends import artifact_path, export_onnx, export_torchscript, load_exported, onnxruntime
+
+
+class Command(BaseCommand):
+    help = ("Exports each fine-tuned classifier to ONNX and TorchScript next to its .pth "
+            "and checks the exported outputs against eager PyTorch.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("models", nargs="*", help="Model keys to export (default: all classifiers).")
+        parser.add_argument("--check-only", action="store_true", help="Only run the parity check on existing artifacts.")
+        parser.add_argument("--samples", type=int, default=8, help="Random inputs used for the parity check.")
+        parser.add_argument("--atol", type=float, default=1e-3, help="Max allowed absolute difference in logits.")
+
+    def handle(self, *args, **options):
+        ai = AIClass()
+        ai.device = torch.device("cpu")  # Export and compare on CPU, where these backends are used
+        keys = options["models"] or list(AIClass.CLASSIFICATION_MODELS)
+
+        unknown = [key for key in keys if key not in AIClass.CLASSIFICATION_MODELS]
+        if unknown:
+            raise CommandError(f"Unknown classification models: {', '.join(unknown)}")
+
+        failures = []
+        for key in keys:
+            model_path = os.path.join(AIClass.CLASSIFICATION_PATH, AIClass.CLASSIFICATION_MODELS[key]["filename"])
+            if not os.path.exists(model_path):
+                self.stdout.write(self.style.WARNING(f"{key}: {model_path} missing, skipped."))
+                continue
+
+            eager = ai._load_classification_model(key, backend="eager").model
+
+            if not options["check_only"]:
+                export_torchscript(eager, artifact_path(model_path, "torchscript"))
+                export_onnx(eager, artifact_path(model_path, "onnx"))
+                self.stdout.write(f"{key}: exported {artifact_path(model_path, 'onnx')} and .ts")
+
+            failures += self._check_parity(key, eager, model_path, options["samples"], options["atol"])
+
+        if failures:
+            raise CommandError(f"Parity check failed for: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS("Export complete; all artifacts match eager outputs."))
+
+    def _check_parity(self, key, eager, model_path, samples, atol):
+        inputs = torch.randn(samples, 3, 224, 224)
+        with torch.no_grad():
+            expected = eager(inputs)
+
+        failures = []
+        for backend in ("torchscript", "onnx"):
+            if backend == "onnx" and onnxruntime is None:
+                self.stdout.write(self.style.WARNING(f"{key}: onnxruntime not installed, ONNX parity skipped."))
+                continue
+            exported = load_exported(model_path, backend, torch.device("cpu"))
+            if exported is None:
+                self.stdout.write(self.style.WARNING(f"{key}: no {backend} artifact found."))
+                continue
+
+            with torch.no_grad():
+                actual = exported(inputs)
+            max_diff = (actual - expected).abs().max().item()
+            top1 = (actual.argmax(dim=1) == expected.argmax(dim=1)).float().mean().item()
+            line = f"{key} [{backend}]: max |diff| = {max_diff:.2e}, top-1 agreement = {top1 * 100:.1f}%"
+
+            if max_diff > atol:
+                failures.append(f"{key}/{backend}")
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+        return failures
@@ -0,0 +1,50 @@
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from detector.export import EXPORT_FORMATS, iter_csv, iter_ndjson, iter_rows, write_parquet
+from detector.history import history_queryset
+
+
+class Command(BaseCommand):
+    help = "Exports ImageRecord history as CSV, NDJSON or Parquet with constant memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+        parser.add_argument("--output", help="Output file (default: stdout; required for parquet).")
+        parser.add_argument("--user", help="Only this username's records.")
+        parser.add_argument("--model-chosen", dest="model_chosen")
+        parser.add_argument("--crop-name", dest="crop_name")
+        parser.add_argument("--date-from", dest="date_from", help="YYYY-MM-DD or ISO datetime.")
+        parser.add_argument("--date-to", dest="date_to", help="YYYY-MM-DD or ISO datetime.")
+        parser.add_argument("--chunk-size", type=int, default=getattr(settings, "EXPORT_CHUNK_SIZE", 2000))
+
+    def handle(self, *args, **options):
+        filters = {
+            key: options[key]
+            for key in ("user", "model_chosen", "crop_name", "date_from", "date_to")
+            if options[key]
+        }
+        try:
+            records = history_queryset(None, filters)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        rows = iter_rows(records, options["chunk_size"])
+
+        if options["format"] == "parquet":
+            if not options["output"]:
+                raise CommandError("--output is required for parquet")
+            total = write_parquet(rows, options["output"], options["chunk_size"])
+            self.stderr.write(self.style.SUCCESS(f"Wrote {total} records to {options['output']}"))
+            return
+
+        lines = iter_csv(rows) if options["format"] == "csv" else iter_ndjson(rows)
+        out = open(options["output"], "w", newline="", encoding="utf-8") if options["output"] else sys.stdout
+        try:
+            for line in lines:
+                out.write(line)
+        finally:
+            if out is not sys.stdout:
+                out.close()
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from detector.result_cache import get_result_cache
+
+
+class Command(BaseCommand):
+    help = "Deletes result cache rows older than RESULT_CACHE_TTL_SECONDS."
+
+    def handle(self, *args, **options):
+        deleted = get_result_cache().prune()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired cached results."))
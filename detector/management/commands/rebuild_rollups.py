@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from detector import rollups
+
+
+class Command(BaseCommand):
+    help = "Recomputes the daily analytics rollups behind /api/stats from ImageRecord and Detection."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date-from", dest="date_from", help="First day to rebuild (YYYY-MM-DD).")
+        parser.add_argument("--date-to", dest="date_to", help="Last day to rebuild (YYYY-MM-DD).")
+        parser.add_argument("--days", type=int, help="Rebuild only the last N days (e.g. from cron).")
+
+    def handle(self, *args, **options):
+        try:
+            day_from = rollups.parse_day(options["date_from"]) if options["date_from"] else None
+            day_to = rollups.parse_day(options["date_to"]) if options["date_to"] else None
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options["days"]:
+            day_from = timezone.localdate() - timedelta(days=options["days"] - 1)
+
+        count = rollups.rebuild(day_from, day_to)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} rollup rows."))
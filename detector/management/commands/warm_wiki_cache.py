@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from detector.ai_class import AIClass
+
+
+class Command(BaseCommand):
+    help = "Pre-fetches the Wikipedia summary of every class in the classification index into the cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Re-fetch entries that are still fresh.")
+
+    def handle(self, *args, **options):
+        ai = AIClass()
+        class_names = ai.class_names()
+        if not class_names:
+            self.stdout.write(self.style.WARNING("No class index found; nothing to warm."))
+            return
+
+        fetched = ai.wiki_cache.warm(class_names, force=options["force"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Wikipedia cache warm: {len(class_names)} classes, {fetched} fetched from the network."
+        ))
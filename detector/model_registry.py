@@ -0,0 +1,138 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import torch
+
+
+def module_nbytes(obj) -> int:
+    """Returns the bytes held by the parameters and buffers of a model (0 if unknown)."""
+    module = obj if isinstance(obj, torch.nn.Module) else getattr(obj, "model", None)
+    if not isinstance(module, torch.nn.Module):
+        return 0
+    tensors = list(module.parameters()) + list(module.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+class LoadedModel:
+    """A model resident in the registry, plus bookkeeping used by the status endpoint."""
+
+    def __init__(self, key: str, model, meta: Optional[Dict[str, Any]] = None):
+        self.key = key
+        self.model = model
+        self.meta = meta or {}
+        # Non-torch backends (e.g. ONNX Runtime) report their own footprint
+        self.memory_bytes = getattr(model, "memory_bytes", None) or module_nbytes(model)
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+        self.hits = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "key": self.key,
+            "backend": self.meta.get("backend", "eager"),
+            "memory_mb": round(self.memory_bytes / (1024 * 1024), 2),
+            "loaded_at": self.loaded_at,
+            "last_used": self.last_used,
+            "hits": self.hits,
+        }
+
+
+class ModelRegistry:
+    """
+    Process-wide, thread-safe store of loaded models.
+
+    Models are loaded lazily through `loader(key)` the first time a key is requested
+    and stay resident across requests. When `memory_budget_mb` is set, the registry
+    behaves as an LRU cache: after a load pushes the resident total over the budget,
+    the least recently used models are evicted until it fits again.
+    """
+
+    def __init__(self, loader: Callable[[str], LoadedModel], known_keys: Iterable[str],
+                 memory_budget_mb: Optional[float] = None):
+        self._loader = loader
+        self._known_keys = list(known_keys)
+        self._budget_bytes = int(memory_budget_mb * 1024 * 1024) if memory_budget_mb else None
+        self._models: "OrderedDict[str, LoadedModel]" = OrderedDict()
+        self._evictions = 0
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def is_known(self, key: str) -> bool:
+        return key in self._known_keys
+
+    def get(self, key: str) -> Optional[LoadedModel]:
+        """Returns the loaded entry for `key`, loading it on first use. None for unknown keys."""
+        if not self.is_known(key):
+            return None
+
+        with self._lock:
+            entry = self._models.get(key)
+        if entry is None:
+            # Only callers of the same key wait on each other while the weights load
+            with self._key_lock(key):
+                with self._lock:
+                    entry = self._models.get(key)
+                if entry is None:
+                    entry = self._loader(key)
+                    with self._lock:
+                        self._models[key] = entry
+                        self._evict_over_budget(keep=key)
+
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+        entry.hits += 1
+        entry.last_used = time.time()
+        return entry
+
+    def _evict_over_budget(self, keep: str) -> None:
+        """Drops least recently used models until the budget is met. Caller holds `self._lock`."""
+        if self._budget_bytes is None:
+            return
+        total = sum(entry.memory_bytes for entry in self._models.values())
+        for key in list(self._models):
+            if total <= self._budget_bytes:
+                break
+            if key == keep:
+                continue
+            # In-flight callers keep their own reference, so eviction never breaks a running request
+            total -= self._models.pop(key).memory_bytes
+            self._evictions += 1
+
+    def warm_up(self, keys: Optional[Iterable[str]] = None) -> List[str]:
+        """Loads the given keys (all known keys by default) and returns the ones now resident."""
+        keys = self._known_keys if keys is None else keys
+        return [key for key in keys if self.get(key) is not None]
+
+    def unload(self, keys: Optional[Iterable[str]] = None) -> List[str]:
+        """Drops the given keys (everything by default) and returns the ones that were resident."""
+        with self._lock:
+            keys = list(self._models) if keys is None else list(keys)
+            removed = [key for key in keys if self._models.pop(key, None) is not None]
+        if removed and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        return removed
+
+    def reload(self, keys: Optional[Iterable[str]] = None) -> List[str]:
+        """Unloads and immediately re-loads the given keys, e.g. after new weights are deployed."""
+        with self._lock:
+            keys = list(self._models) if keys is None else list(keys)
+        self.unload(keys)
+        return self.warm_up(keys)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            loaded = [entry.as_dict() for entry in self._models.values()]
+        return {
+            "loaded": loaded,
+            "available": self._known_keys,
+            "total_memory_mb": round(sum(e["memory_mb"] for e in loaded), 2),
+            "memory_budget_mb": round(self._budget_bytes / (1024 * 1024), 2) if self._budget_bytes else None,
+            "evictions": self._evictions,
+        }
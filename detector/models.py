@@ -1,14 +1,183 @@
+import uuid
+
+import numpy as np
 from django.db import models
 from authentication.models import CustomUser  # Import your CustomUser model
 
 class ImageRecord(models.Model):
+    SUMMARY_PENDING = "pending"
+    SUMMARY_READY = "ready"
+    SUMMARY_FAILED = "failed"
+    SUMMARY_STATUS_CHOICES = [
+        (SUMMARY_PENDING, "Pending"),
+        (SUMMARY_READY, "Ready"),
+        (SUMMARY_FAILED, "Failed"),
+    ]
+
+    MODE_CLASSIFY = "classify"
+    MODE_DETECT = "detect"
+    MODE_CHOICES = [
+        (MODE_CLASSIFY, "Classify"),
+        (MODE_DETECT, "Detect"),
+    ]
+
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, null=True, blank=True)  # Tracks which user uploaded the image
+    mode = models.CharField(max_length=20, choices=MODE_CHOICES, default=MODE_CLASSIFY)
     image_data = models.ImageField(upload_to='uploaded_images/', null=True, blank=True)
     processed_image = models.ImageField(upload_to='processed_images/', null=True, blank=True)
     model_chosen = models.CharField(max_length=100, default="default_model")
     summary = models.TextField(null=True, blank=True, default="Detected species placeholder")
+    summary_status = models.CharField(max_length=20, choices=SUMMARY_STATUS_CHOICES, default=SUMMARY_READY)
+    wiki_title = models.CharField(max_length=255, null=True, blank=True)
+    wiki_url = models.URLField(max_length=500, null=True, blank=True)
     crop_name = models.CharField(max_length=100, default="Unknown Crop")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of /api/history: per user, and across all users for admins
+            models.Index(fields=["user", "-created_at", "-id"], name="imagerecord_user_created_idx"),
+            models.Index(fields=["-created_at", "-id"], name="imagerecord_created_idx"),
+        ]
+
     def __str__(self):
         return f"ImageRecord (ID={self.id}, User={self.user.username}, Model={self.model_chosen})"
+
+
+class Detection(models.Model):
+    """
+    Detection result for an ImageRecord: counts for aggregate queries plus every box packed
+    as float32 rows [x1, y1, x2, y2, confidence, class_id] (labels in `classes`).
+    """
+    record = models.OneToOneField(ImageRecord, on_delete=models.CASCADE, related_name="detection")
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, null=True, blank=True)  # Denormalised for per-user rollups
+    model_chosen = models.CharField(max_length=100)
+    weed_count = models.PositiveIntegerField(default=0)
+    crop_count = models.PositiveIntegerField(default=0)
+    mean_confidence = models.FloatField(null=True, blank=True)
+    classes = models.JSONField(default=list)
+    boxes = models.BinaryField(default=bytes)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # e.g. weed count per day per user without touching images or boxes
+            models.Index(fields=["user", "created_at"], name="detection_user_created_idx"),
+            models.Index(fields=["created_at"], name="detection_created_idx"),
+        ]
+
+    def box_array(self) -> np.ndarray:
+        return np.frombuffer(bytes(self.boxes), dtype=np.float32).reshape(-1, 6)
+
+    def __str__(self):
+        return f"Detection (Record={self.record_id}, Weeds={self.weed_count}, Crops={self.crop_count})"
+
+
+class DetectionBox(models.Model):
+    """One detected object, for per-label / per-box queries."""
+    detection = models.ForeignKey(Detection, on_delete=models.CASCADE, related_name="box_rows")
+    label = models.CharField(max_length=100)
+    is_weed = models.BooleanField()
+    confidence = models.FloatField()
+    x1 = models.FloatField()
+    y1 = models.FloatField()
+    x2 = models.FloatField()
+    y2 = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["label"], name="detectionbox_label_idx"),
+        ]
+
+    def __str__(self):
+        return f"DetectionBox ({self.label}, {self.confidence:.2f})"
+
+
+class InferenceJob(models.Model):
+    """A detection request queued for background processing; polled via /api/jobs/<id>."""
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_SUCCEEDED, "Succeeded"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, null=True, blank=True)
+    image_data = models.ImageField(upload_to='jobs/', null=True, blank=True)
+    model_chosen = models.CharField(max_length=100)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED, db_index=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Runner (host:pid:id) that claimed the job, and when it last reported it as alive
+    owner = models.CharField(max_length=100, null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"InferenceJob (ID={self.id}, Model={self.model_chosen}, Status={self.status})"
+
+
+class WikiSummary(models.Model):
+    """Persistent tier of the Wikipedia lookup cache (AIClass.wiki_cache, see wiki_cache.py)."""
+    class_name = models.CharField(max_length=255, unique=True)
+    found = models.BooleanField(default=True)  # False caches "no page exists"
+    title = models.CharField(max_length=255, null=True, blank=True)
+    summary = models.TextField(null=True, blank=True)
+    url = models.URLField(max_length=500, null=True, blank=True)
+    fetched_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"WikiSummary ({self.class_name})"
+
+
+class CachedResult(models.Model):
+    """Persistent tier of the content-hash result cache: one inference result per (image bytes, model, options)."""
+    key = models.CharField(max_length=64, unique=True)  # sha256 hex
+    mode = models.CharField(max_length=20)
+    model_chosen = models.CharField(max_length=100)
+    result = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)  # Expiry and pruning
+
+    def __str__(self):
+        return f"CachedResult ({self.mode}/{self.model_chosen}, {self.key[:12]})"
+
+
+class DailyRollup(models.Model):
+    """
+    Pre-aggregated upload statistics per day, user, mode, crop and model, maintained
+    incrementally on write (see detector/rollups.py) and read by /api/stats.
+    """
+    day = models.DateField()
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, null=True, blank=True)
+    mode = models.CharField(max_length=20)
+    crop_name = models.CharField(max_length=100)
+    model_chosen = models.CharField(max_length=100)
+    image_count = models.PositiveIntegerField(default=0)
+    weed_count = models.PositiveIntegerField(default=0)
+    crop_count = models.PositiveIntegerField(default=0)
+    confidence_sum = models.FloatField(default=0.0)  # Sum of per-image mean detection confidence
+    confidence_samples = models.PositiveIntegerField(default=0)  # Images that contributed to confidence_sum
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "user", "mode", "crop_name", "model_chosen"], name="dailyrollup_unique_key"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["user", "day"], name="dailyrollup_user_day_idx"),
+        ]
+
+    @property
+    def mean_confidence(self):
+        return self.confidence_sum / self.confidence_samples if self.confidence_samples else None
+
+    def __str__(self):
+        return f"DailyRollup ({self.day}, User={self.user_id}, {self.mode}/{self.crop_name}/{self.model_chosen})"
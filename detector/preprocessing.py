@@ -0,0 +1,79 @@
+import threading
+from typing import List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+import torch
+from PIL import Image
+from PIL.JpegImagePlugin import JpegImageFile
+
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+
+def decode_image(image_file, target_size: Optional[int] = None) -> Tuple[np.ndarray, float]:
+    """
+    Decodes an upload to an RGB uint8 array. With `target_size`, JPEGs (including the MPO files
+    many phones write) are decoded in draft mode at the smallest DCT scale (1/2, 1/4 or 1/8)
+    that keeps both sides >= target_size, so a 48 MP photo never materialises at full
+    resolution. Other formats decode in full. Returns (rgb, scale) where scale maps decoded
+    pixel coordinates back to the original.
+    """
+    image = Image.open(image_file)
+    original_width = image.size[0]
+    if target_size and isinstance(image, JpegImageFile):
+        image.draft("RGB", (target_size, target_size))
+    rgb = np.array(image.convert("RGB"))
+    return rgb, original_width / rgb.shape[1]
+
+
+class TensorPool:
+    """
+    Free list of preallocated float32 input tensors of one shape. acquire() never blocks:
+    when the pool is empty a new tensor is allocated, and release() keeps at most `max_size`.
+    """
+
+    def __init__(self, shape: Tuple[int, ...], max_size: int):
+        self.shape = shape
+        self.max_size = max_size
+        self._free: List[torch.Tensor] = [torch.empty(shape) for _ in range(max_size)]
+        self._lock = threading.Lock()
+
+    def acquire(self) -> torch.Tensor:
+        with self._lock:
+            if self._free:
+                return self._free.pop()
+        return torch.empty(self.shape)
+
+    def release(self, tensors: List[torch.Tensor]) -> None:
+        with self._lock:
+            for tensor in tensors:
+                if len(self._free) >= self.max_size:
+                    break
+                self._free.append(tensor)
+
+
+class ClassifierPreprocessor:
+    """
+    Replaces Resize -> ToTensor -> Normalize: one area resize with OpenCV, then the
+    /255 and mean/std normalisation fused into a single multiply-add that writes
+    in place on a pooled input tensor.
+    """
+
+    def __init__(self, size: int = 224, pool_size: int = 32):
+        self.size = size
+        self.pool = TensorPool((3, size, size), pool_size)
+        # (x / 255 - mean) / std == x * scale + bias
+        self._scale = torch.tensor([1.0 / (255.0 * s) for s in IMAGENET_STD]).view(3, 1, 1)
+        self._bias = torch.tensor([-m / s for m, s in zip(IMAGENET_MEAN, IMAGENET_STD)]).view(3, 1, 1)
+
+    def __call__(self, image: Union[np.ndarray, Image.Image]) -> torch.Tensor:
+        """Turns an RGB array (or PIL image) into a normalised (3, size, size) tensor from the pool."""
+        rgb = np.array(image.convert("RGB")) if isinstance(image, Image.Image) else image
+        if rgb.shape[:2] != (self.size, self.size):
+            rgb = cv2.resize(rgb, (self.size, self.size), interpolation=cv2.INTER_AREA)
+
+        # HWC uint8 -> CHW float32 happens in the copy into the pooled tensor
+        tensor = self.pool.acquire()
+        tensor.copy_(torch.from_numpy(np.ascontiguousarray(rgb)).permute(2, 0, 1))
+        return torch.addcmul(self._bias, tensor, self._scale, out=tensor)
@@ -0,0 +1,66 @@
+import copy
+import os
+from typing import Iterable, Optional
+
+import torch
+from torch.ao.quantization import get_default_qconfig_mapping, quantize_dynamic
+from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+# Model keys such as "mobilenet_int8" select the INT8 variant of the "mobilenet" classifier
+INT8_SUFFIX = "_int8"
+
+
+def static_artifact_path(model_path: str) -> str:
+    """Where `manage.py calibrate_int8` stores the statically quantized TorchScript (<name>_int8.ts)."""
+    return os.path.splitext(model_path)[0] + INT8_SUFFIX + ".ts"
+
+
+def state_nbytes(module: torch.nn.Module) -> int:
+    """
+    Bytes held by a module's state dict. Unlike parameters(), this includes the packed
+    INT8 weights of quantized Linear layers (stored as (weight, bias) tuples).
+    """
+    total = 0
+    for value in module.state_dict().values():
+        for tensor in value if isinstance(value, (tuple, list)) else (value,):
+            if isinstance(tensor, torch.Tensor):
+                total += tensor.numel() * tensor.element_size()
+    return total
+
+
+def quantize_dynamic_int8(model: torch.nn.Module) -> torch.nn.Module:
+    """Dynamic post-training quantization: INT8 weights for Linear layers, activations quantized on the fly."""
+    quantized = quantize_dynamic(copy.deepcopy(model).cpu().eval(), {torch.nn.Linear}, dtype=torch.qint8)
+    quantized.memory_bytes = state_nbytes(quantized)
+    return quantized
+
+
+def quantize_static_int8(model: torch.nn.Module, calibration_batches: Iterable[torch.Tensor]) -> torch.nn.Module:
+    """
+    Static post-training quantization (FX graph mode): observers are inserted, calibrated on
+    representative batches, then weights and activations of the whole network are converted to INT8.
+    """
+    model = copy.deepcopy(model).cpu().eval()
+    batches = list(calibration_batches)
+    prepared = prepare_fx(model, get_default_qconfig_mapping("x86"), example_inputs=(batches[0],))
+    with torch.no_grad():
+        for batch in batches:
+            prepared(batch)
+    return convert_fx(prepared)
+
+
+def save_static_int8(model: torch.nn.Module, path: str) -> None:
+    with torch.no_grad():
+        traced = torch.jit.trace(model, torch.randn(1, 3, 224, 224))
+    torch.jit.save(torch.jit.freeze(traced), path)
+
+
+def load_static_int8(model_path: str) -> Optional[torch.nn.Module]:
+    """Loads the calibrated static INT8 artifact for a classifier, or None if it has not been produced."""
+    path = static_artifact_path(model_path)
+    if not os.path.exists(path):
+        return None
+    module = torch.jit.load(path, map_location="cpu").eval()
+    # Frozen: the weights are graph constants, so the artifact size is the footprint
+    module.memory_bytes = os.path.getsize(path)
+    return module
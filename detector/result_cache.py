@@ -0,0 +1,125 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.utils import timezone
+
+from .models import CachedResult
+
+
+class ResultCache:
+    """
+    Content-hash cache of inference results: an in-memory LRU in front of the CachedResult table.
+
+    The key is a sha256 over the uploaded bytes plus everything that changes the result
+    (model and its fingerprint, mode, output options), so re-uploads of an identical image
+    skip the network. Entries expire after `ttl_seconds` in both tiers; expired rows are
+    deleted every `prune_every` writes (and by `manage.py prune_result_cache`).
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, prune_every: int = 500):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.prune_every = prune_every
+        self._memory: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "db_hits": 0, "misses": 0}
+        self._puts = 0
+
+    @staticmethod
+    def key(image_digest: str, *parts) -> str:
+        """Cache key from the upload's sha256 (computed once at ingest) and the result options."""
+        digest = hashlib.sha256(image_digest.encode("utf-8"))
+        digest.update(json.dumps(parts, sort_keys=True, default=str).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _cutoff(self):
+        return timezone.now() - timedelta(seconds=self.ttl_seconds)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and time.time() - entry[0] < self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return entry[1]
+            self._memory.pop(key, None)
+
+        row = CachedResult.objects.filter(
+            key=key, created_at__gte=self._cutoff()
+        ).values_list("result", "created_at").first()
+        with self._lock:
+            self._counters["db_hits" if row is not None else "misses"] += 1
+        if row is None:
+            return None
+        self._remember(key, row[0], row[1].timestamp())
+        return row[0]
+
+    def put(self, key: str, mode: str, model_chosen: str, result: Dict[str, Any]) -> None:
+        try:
+            # Replaces an expired row with the same key
+            CachedResult.objects.update_or_create(
+                key=key,
+                defaults={"mode": mode, "model_chosen": model_chosen, "result": result, "created_at": timezone.now()}
+            )
+        except IntegrityError:
+            pass  # A concurrent request stored the same result first
+        self._remember(key, result, time.time())
+
+        with self._lock:
+            self._puts += 1
+            prune = self.prune_every and self._puts % self.prune_every == 0
+        if prune:
+            self.prune()
+
+    def prune(self) -> int:
+        """Deletes expired rows from the DB tier; returns how many were removed."""
+        deleted, _ = CachedResult.objects.filter(created_at__lt=self._cutoff()).delete()
+        return deleted
+
+    def clear_memory(self) -> None:
+        """Drops the in-memory tier, e.g. after models are reloaded."""
+        with self._lock:
+            self._memory.clear()
+
+    def _remember(self, key: str, result: Dict[str, Any], stored_at: float) -> None:
+        with self._lock:
+            self._memory[key] = (stored_at, result)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            size = len(self._memory)
+        lookups = sum(counters.values())
+        hits = counters["memory_hits"] + counters["db_hits"]
+        return {
+            **counters,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": size,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    """Returns the process-wide ResultCache."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache(
+                    max_entries=getattr(settings, "RESULT_CACHE_MAX_ENTRIES", 1024),
+                    ttl_seconds=getattr(settings, "RESULT_CACHE_TTL_SECONDS", 30 * 24 * 3600)
+                )
+    return _cache
@@ -0,0 +1,150 @@
+from datetime import date
+from typing import Dict, Iterable, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import DailyRollup, Detection, ImageRecord
+
+# Additive columns of DailyRollup
+ROLLUP_COUNTERS = ("image_count", "weed_count", "crop_count", "confidence_sum", "confidence_samples")
+
+# /api/stats?group_by= values and the rollup column each one groups on
+STATS_GROUPS = {
+    "day": "day",
+    "user": "user__username",
+    "mode": "mode",
+    "crop_name": "crop_name",
+    "model_chosen": "model_chosen",
+}
+
+
+def _key(record: ImageRecord):
+    return (
+        timezone.localdate(record.created_at), record.user_id,
+        record.mode, record.crop_name, record.model_chosen,
+    )
+
+
+def apply(records: Iterable[ImageRecord], detections: Iterable[Detection] = (), sign: int = 1) -> None:
+    """
+    Adds (sign=1) or removes (sign=-1) saved records from the daily rollups. Records are
+    grouped by rollup key first, so a batch costs one upsert per distinct key.
+    Does nothing when STATS_ROLLUP_ON_WRITE is off (rollups are then rebuilt periodically).
+    """
+    if not getattr(settings, "STATS_ROLLUP_ON_WRITE", True):
+        return
+
+    by_record = {detection.record_id: detection for detection in detections}
+    deltas: Dict[tuple, Dict[str, float]] = {}
+    for record in records:
+        delta = deltas.setdefault(_key(record), dict.fromkeys(ROLLUP_COUNTERS, 0))
+        delta["image_count"] += sign
+        detection = by_record.get(record.id)
+        if detection is not None:
+            delta["weed_count"] += sign * detection.weed_count
+            delta["crop_count"] += sign * detection.crop_count
+            if detection.mean_confidence is not None:
+                delta["confidence_sum"] += sign * detection.mean_confidence
+                delta["confidence_samples"] += sign
+
+    with transaction.atomic():
+        for (day, user_id, mode, crop_name, model_chosen), delta in deltas.items():
+            row, _ = DailyRollup.objects.get_or_create(
+                day=day, user_id=user_id, mode=mode, crop_name=crop_name, model_chosen=model_chosen
+            )
+            # F() keeps concurrent writers from losing each other's increments
+            DailyRollup.objects.filter(pk=row.pk).update(
+                **{column: F(column) + value for column, value in delta.items()}
+            )
+
+
+def rebuild(day_from: Optional[date] = None, day_to: Optional[date] = None) -> int:
+    """
+    Recomputes the rollups for [day_from, day_to] (everything by default) from ImageRecord
+    and Detection with a single group-by, replacing the existing rows. Returns the row count.
+    """
+    records = ImageRecord.objects.annotate(day=TruncDate("created_at"))
+    rollups = DailyRollup.objects.all()
+    if day_from:
+        records = records.filter(day__gte=day_from)
+        rollups = rollups.filter(day__gte=day_from)
+    if day_to:
+        records = records.filter(day__lte=day_to)
+        rollups = rollups.filter(day__lte=day_to)
+
+    groups = (
+        records.values("day", "user_id", "mode", "crop_name", "model_chosen")
+        .annotate(
+            image_count=Count("id"),
+            weed_count=Coalesce(Sum("detection__weed_count"), 0),
+            crop_count=Coalesce(Sum("detection__crop_count"), 0),
+            confidence_sum=Coalesce(Sum("detection__mean_confidence"), Value(0.0), output_field=FloatField()),
+            confidence_samples=Count("detection__mean_confidence"),
+        )
+        .order_by()
+    )
+
+    with transaction.atomic():
+        rollups.delete()
+        created = DailyRollup.objects.bulk_create(
+            [DailyRollup(**group) for group in groups.iterator()], batch_size=500
+        )
+    return len(created)
+
+
+def parse_day(value: str) -> date:
+    day = parse_date(value)
+    if day is None:
+        raise ValueError(f"Invalid date '{value}' (use YYYY-MM-DD)")
+    return day
+
+
+def stats(user, params, group_by: str = "day"):
+    """
+    Aggregates the rollup table (never ImageRecord) for `user` (admins see everyone and may
+    filter by user) narrowed by date_from/date_to/mode/model_chosen/crop_name in `params`.
+    Returns (totals, rows) where rows are grouped by `group_by` (see STATS_GROUPS).
+    Raises ValueError for unknown groups or malformed dates.
+    """
+    if group_by not in STATS_GROUPS:
+        raise ValueError(f"Invalid group_by (must be one of: {', '.join(STATS_GROUPS)})")
+
+    rollups = DailyRollup.objects.all()
+    if user is not None and not user.is_admin:
+        rollups = rollups.filter(user=user)
+    elif params.get("user"):
+        rollups = rollups.filter(user__username=params["user"])
+
+    for field in ("mode", "model_chosen", "crop_name"):
+        if params.get(field):
+            rollups = rollups.filter(**{field: params[field]})
+    if params.get("date_from"):
+        rollups = rollups.filter(day__gte=parse_day(params["date_from"]))
+    if params.get("date_to"):
+        rollups = rollups.filter(day__lte=parse_day(params["date_to"]))
+
+    sums = {column: Sum(column) for column in ROLLUP_COUNTERS}
+    column = STATS_GROUPS[group_by]
+    rows = [
+        _stats_row(row, group_by, row.pop(column))
+        for row in rollups.values(column).annotate(**sums).order_by(column)
+    ]
+    totals = _stats_row(rollups.aggregate(**sums))
+    return totals, rows
+
+
+def _stats_row(sums: Dict, group_by: Optional[str] = None, group=None) -> Dict:
+    samples = sums["confidence_samples"] or 0
+    row = {group_by: group} if group_by else {}
+    row.update({
+        "images": sums["image_count"] or 0,
+        "weed_count": sums["weed_count"] or 0,
+        "crop_count": sums["crop_count"] or 0,
+        "mean_confidence": round(sums["confidence_sum"] / samples, 4) if samples else None,
+    })
+    return row
@@ -0,0 +1,81 @@
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+
+class DetectorRouter:
+    """
+    Chooses the detector for model='auto'.
+
+    `models` is ordered from most to least accurate. The router serves with the first model
+    whose estimated latency fits `slo_ms`, and with the last (cheapest) one when none does:
+
+        estimate = per-image ms x (images in flight on that model + images in this request)
+                   + decode ms per megapixel x megapixels of this request
+
+    Per-image ms starts from `prior_ms` and follows the measured forward passes (EWMA), so
+    the choice degrades from the large to the small model as queues grow.
+    """
+
+    def __init__(self, models: List[str], slo_ms: float, prior_ms: Dict[str, float],
+                 decode_ms_per_mp: float = 0.0, alpha: float = 0.2):
+        self.models = list(models)
+        self.slo_ms = slo_ms
+        self.decode_ms_per_mp = decode_ms_per_mp
+        self.alpha = alpha
+        self._per_image_ms = {model: float(prior_ms.get(model, 0.0)) for model in self.models}
+        self._in_flight = {model: 0 for model in self.models}
+        self._routed = Counter()
+        self._lock = threading.Lock()
+
+    def observe(self, model: str, images: int, elapsed_ms: float) -> None:
+        """Folds one measured forward pass over `images` images into the model's per-image estimate."""
+        if model not in self._per_image_ms or images < 1:
+            return
+        with self._lock:
+            previous = self._per_image_ms[model]
+            sample = elapsed_ms / images
+            self._per_image_ms[model] = sample if previous <= 0 else previous + self.alpha * (sample - previous)
+
+    @contextmanager
+    def track(self, model: str, images: int):
+        """Counts `images` as in flight on `model` for the duration of the block."""
+        with self._lock:
+            self._in_flight[model] = self._in_flight.get(model, 0) + images
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight[model] -= images
+
+    def estimate_ms(self, model: str, images: int = 1, megapixels: float = 0.0) -> float:
+        with self._lock:
+            per_image, in_flight = self._per_image_ms.get(model, 0.0), self._in_flight.get(model, 0)
+        return per_image * (in_flight + images) + self.decode_ms_per_mp * megapixels
+
+    def choose(self, images: int = 1, megapixels: float = 0.0) -> str:
+        chosen: Optional[str] = None
+        for model in self.models:
+            if self.estimate_ms(model, images, megapixels) <= self.slo_ms:
+                chosen = model
+                break
+        chosen = chosen or self.models[-1]
+        with self._lock:
+            self._routed[chosen] += 1
+        return chosen
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "slo_ms": self.slo_ms,
+                "models": [
+                    {
+                        "key": model,
+                        "per_image_ms": round(self._per_image_ms[model], 1),
+                        "in_flight": self._in_flight[model],
+                        "routed": self._routed[model],
+                    }
+                    for model in self.models
+                ],
+            }
@@ -0,0 +1,16 @@
+import os
+import uuid
+
+from django.core.files.storage import default_storage
+
+
+def store_detected_image(annotated_file) -> str:
+    """
+    Stores an annotated image under detected/images/ with a single write through
+    default_storage and returns its storage name.
+    """
+    extension = os.path.splitext(annotated_file.name or "")[1] or ".png"
+    return default_storage.save(
+        os.path.join('detected', 'images', f"annotated_{uuid.uuid4().hex}{extension}"),
+        annotated_file
+    )
@@ -1,3 +1,1101 @@
-from django.test import TestCase
+import csv
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from io import BytesIO, StringIO
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import cv2
+import numpy as np
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from authentication.models import CustomUser
+
+from . import enrichment, rollups
+from .batching import BatchScheduler, MicroBatcher
+from .detections import pack_boxes, persist_detections
+from .export import EXPORT_COLUMNS, iter_csv, iter_ndjson, iter_rows
+from .history import history_queryset, keyset_page
+from .ingest import IngestedImage, UploadRejected, check_size, ingest
+from .jobs import JobRunner
+from .model_registry import LoadedModel, ModelRegistry
+from .models import CachedResult, DailyRollup, Detection, DetectionBox, ImageRecord, InferenceJob, WikiSummary
+from .result_cache import ResultCache
+from .routing import DetectorRouter
+from .tiling import merge_tile_detections, tile_windows
+from .video import iter_image_frames, iter_video_frames
+from .views import _without_timings
+from .wiki_cache import WikiCache
+from .yolo_params import YOLO_DEFAULTS, _validated, parse_detection_params, resolve_detection_params
+
+MB = 1024 * 1024
+
+
+class ModelRegistryTests(SimpleTestCase):
+    """ModelRegistry with a fake loader: models are plain objects reporting their own footprint."""
+
+    def make_registry(self, sizes_mb, budget_mb=None, delay=0.0):
+        self.loads = []
+
+        def loader(key):
+            time.sleep(delay)
+            self.loads.append(key)
+            return LoadedModel(key, SimpleNamespace(memory_bytes=sizes_mb[key] * MB))
+
+        return ModelRegistry(loader, list(sizes_mb), memory_budget_mb=budget_mb)
+
+    def resident(self, registry):
+        return [entry["key"] for entry in registry.status()["loaded"]]
+
+    def test_loads_lazily_once_and_reuses(self):
+        registry = self.make_registry({"a": 10, "b": 10})
+        self.assertEqual(self.resident(registry), [])
+
+        first = registry.get("a")
+        second = registry.get("a")
+
+        self.assertIs(first, second)
+        self.assertEqual(self.loads, ["a"])
+        self.assertEqual(first.hits, 2)
+
+    def test_unknown_key_is_not_loaded(self):
+        registry = self.make_registry({"a": 10})
+        self.assertIsNone(registry.get("missing"))
+        self.assertEqual(self.loads, [])
+
+    def test_evicts_least_recently_used_over_budget(self):
+        registry = self.make_registry({"a": 100, "b": 100, "c": 100}, budget_mb=250)
+        registry.get("a")
+        registry.get("b")
+        registry.get("a")  # b is now the least recently used
+        registry.get("c")
+
+        self.assertEqual(self.resident(registry), ["a", "c"])
+        self.assertEqual(registry.status()["evictions"], 1)
+        self.assertEqual(registry.status()["total_memory_mb"], 200)
+
+        # An evicted model is loaded again on its next use
+        registry.get("b")
+        self.assertEqual(self.loads, ["a", "b", "c", "b"])
+
+    def test_model_over_budget_on_its_own_stays_resident(self):
+        registry = self.make_registry({"a": 10, "big": 100}, budget_mb=50)
+        registry.get("a")
+        entry = registry.get("big")
+
+        self.assertEqual(self.resident(registry), ["big"])
+        self.assertIs(registry.get("big"), entry)
+
+    def test_concurrent_first_use_loads_once(self):
+        registry = self.make_registry({"a": 10}, delay=0.05)
+        entries = []
+        threads = [threading.Thread(target=lambda: entries.append(registry.get("a"))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.loads, ["a"])
+        self.assertEqual(len({id(entry) for entry in entries}), 1)
+
+    def test_unload_and_reload(self):
+        registry = self.make_registry({"a": 10, "b": 10})
+        registry.warm_up()
+
+        self.assertEqual(registry.unload(["a"]), ["a"])
+        self.assertEqual(self.resident(registry), ["b"])
+        self.assertEqual(registry.reload(["b"]), ["b"])
+        self.assertEqual(self.loads, ["a", "b", "b"])
+
+
+class MicroBatcherTests(SimpleTestCase):
+    """MicroBatcher / BatchScheduler with a recording run_batch in place of a model."""
+
+    def setUp(self):
+        self.batches = []
+
+    def double(self, items):
+        self.batches.append(list(items))
+        return [item * 2 for item in items]
+
+    def test_scatters_results_back_to_callers_in_order(self):
+        batcher = MicroBatcher("test", self.double, max_batch=4, max_wait_ms=500)
+        futures = [batcher.submit(item) for item in (1, 2, 3, 4)]
+
+        self.assertEqual([future.result(timeout=5) for future in futures], [2, 4, 6, 8])
+        # Full before the wait expired: one forward pass for all four callers
+        self.assertEqual(self.batches, [[1, 2, 3, 4]])
+
+    def test_splits_at_max_batch(self):
+        batcher = MicroBatcher("test", self.double, max_batch=2, max_wait_ms=200)
+        futures = [batcher.submit(item) for item in range(5)]
+
+        self.assertEqual([future.result(timeout=5) for future in futures], [0, 2, 4, 6, 8])
+        self.assertTrue(all(len(batch) <= 2 for batch in self.batches))
+        self.assertEqual(sorted(item for batch in self.batches for item in batch), list(range(5)))
+
+    def test_runs_a_partial_batch_when_the_wait_expires(self):
+        batcher = MicroBatcher("test", self.double, max_batch=8, max_wait_ms=20)
+        self.assertEqual(batcher.submit(3).result(timeout=5), 6)
+        self.assertEqual(self.batches, [[3]])
+
+    def test_error_reaches_every_caller_and_the_worker_survives(self):
+        def failing(items):
+            if "bad" in items:
+                raise ValueError("broken batch")
+            return self.double(items)
+
+        batcher = MicroBatcher("test", failing, max_batch=3, max_wait_ms=500)
+        futures = [batcher.submit(item) for item in ("ok", "bad", "ok")]
+        for future in futures:
+            with self.assertRaisesMessage(ValueError, "broken batch"):
+                future.result(timeout=5)
+
+        self.assertEqual(batcher.submit("x").result(timeout=5), "xx")
+
+    def test_scheduler_keeps_one_batcher_per_key(self):
+        scheduler = BatchScheduler(max_batch=4, max_wait_ms=10)
+        self.assertEqual(scheduler.submit_many("a", [1, 2], self.double), [2, 4])
+        self.assertEqual(scheduler.submit("a", 5, self.double), 10)
+        self.assertEqual(scheduler.submit("b", 1, self.double), 2)
+        self.assertEqual(set(scheduler.metrics()["queues"]), {"a", "b"})
+
+    def test_scheduler_runs_inline_when_disabled(self):
+        def failing(items):
+            if items == [2]:
+                raise ValueError("item 2")
+            return self.double(items)
+
+        scheduler = BatchScheduler(max_batch=1, max_wait_ms=10)
+        futures = scheduler.submit_futures("a", [1, 2, 3], failing)
+
+        self.assertEqual(futures[0].result(), 2)
+        with self.assertRaisesMessage(ValueError, "item 2"):
+            futures[1].result()
+        self.assertEqual(futures[2].result(), 6)
+        self.assertEqual(self.batches, [[1], [3]])
+        self.assertEqual(scheduler.metrics()["queues"], {})
+
+
+class StubWikipedia:
+    """Network stub standing in for Wikipedia: returns `result` or raises `error`, counting calls."""
+
+    def __init__(self, result=("Maize", "Maize is a cereal grain.", "https://en.wikipedia.org/wiki/Maize")):
+        self.result = result
+        self.error = None
+        self.calls = []
+
+    def __call__(self, class_name):
+        self.calls.append(class_name)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class WikiCacheTests(TransactionTestCase):
+    """
+    WikiCache against the real WikiSummary table with a stubbed fetcher. Transactional so the
+    background refresh thread sees (and can write) the same rows as the test.
+    """
+
+    def make_cache(self, fetcher, ttl_seconds=3600):
+        cache = WikiCache(fetcher, ttl_seconds=ttl_seconds)
+        self.addCleanup(cache._refresher.shutdown, wait=True)
+        return cache
+
+    def test_cold_miss_fetches_once_and_fills_both_tiers(self):
+        stub = StubWikipedia()
+        cache = self.make_cache(stub)
+
+        self.assertIsNone(cache.peek("maize"))
+        self.assertEqual(cache.get("maize"), stub.result)
+        self.assertEqual(cache.get("maize"), stub.result)
+
+        self.assertEqual(stub.calls, ["maize"])
+        row = WikiSummary.objects.get(class_name="maize")
+        self.assertTrue(row.found)
+        self.assertEqual(row.title, "Maize")
+
+    def test_db_tier_serves_a_new_process_without_the_network(self):
+        self.make_cache(StubWikipedia()).get("maize")
+
+        offline = StubWikipedia()
+        offline.error = ConnectionError("offline")
+        cache = self.make_cache(offline)  # Empty memory tier, as after a restart
+
+        self.assertEqual(cache.get("maize")[0], "Maize")
+        self.assertEqual(offline.calls, [])
+
+    def test_missing_page_is_cached(self):
+        stub = StubWikipedia(result=(None, None, None))
+        self.make_cache(stub).get("unknown weed")
+
+        cache = self.make_cache(stub)
+        self.assertEqual(cache.get("unknown weed"), (None, None, None))
+        self.assertFalse(WikiSummary.objects.get(class_name="unknown weed").found)
+        self.assertEqual(stub.calls, ["unknown weed"])
+
+    def test_stale_entry_is_served_while_refreshing(self):
+        stub = StubWikipedia()
+        cache = self.make_cache(stub, ttl_seconds=60)
+        stale = ("Maize", "Old summary.", "https://en.wikipedia.org/wiki/Maize")
+        cache._remember("maize", stale, time.time() - 120)
+
+        # Served immediately from the stale copy; the refresh happens in the background
+        self.assertEqual(cache.get("maize"), stale)
+
+        deadline = time.time() + 5
+        while cache.peek("maize") != stub.result and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(cache.peek("maize"), stub.result)
+        self.assertEqual(stub.calls, ["maize"])
+        self.assertEqual(WikiSummary.objects.get(class_name="maize").summary, stub.result[1])
+
+    def test_failed_refresh_keeps_serving_the_stale_copy(self):
+        stub = StubWikipedia()
+        stub.error = ConnectionError("offline")
+        cache = self.make_cache(stub, ttl_seconds=60)
+        stale = ("Maize", "Old summary.", "https://en.wikipedia.org/wiki/Maize")
+        cache._remember("maize", stale, time.time() - 120)
+
+        self.assertEqual(cache.get("maize"), stale)
+        cache._refresher.shutdown(wait=True)  # Let the background refresh fail
+
+        self.assertEqual(stub.calls, ["maize"])
+        self.assertEqual(cache._memory["maize"][0], stale)
+        self.assertFalse(WikiSummary.objects.filter(class_name="maize").exists())
+
+    def test_errors_are_not_cached(self):
+        stub = StubWikipedia()
+        stub.error = ConnectionError("offline")
+        cache = self.make_cache(stub)
+
+        with self.assertRaises(ConnectionError):
+            cache.get("maize")
+        self.assertIsNone(cache.peek("maize"))
+        self.assertFalse(WikiSummary.objects.exists())
+
+        stub.error = None
+        self.assertEqual(cache.get("maize"), stub.result)
+        self.assertEqual(stub.calls, ["maize", "maize"])
+
+    def test_warm_fetches_only_missing_or_expired_classes(self):
+        stub = StubWikipedia()
+        cache = self.make_cache(stub)
+        cache.get("maize")
+
+        self.assertEqual(cache.warm(["maize", "wheat"]), 1)
+        self.assertEqual(cache.warm(["maize", "wheat"], force=True), 2)
+        self.assertEqual(stub.calls, ["maize", "wheat", "maize", "wheat"])
+
+
+class KeysetPageTests(TestCase):
+    """History pagination on (created_at, id), including rows that share a timestamp."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username="farmer", password="secret")
+        cls.other = CustomUser.objects.create_user(username="neighbour", password="secret")
+        cls.admin = CustomUser.objects.create_user(username="admin", password="secret", is_admin=True)
+
+        now = timezone.now()
+        # Seven records over five timestamps: two pairs share one, so the id breaks the tie
+        for minutes in (0, 1, 1, 2, 3, 3, 4):
+            record = ImageRecord.objects.create(user=cls.user, model_chosen="resnet", crop_name="maize")
+            ImageRecord.objects.filter(id=record.id).update(created_at=now - timedelta(minutes=minutes))
+        ImageRecord.objects.create(user=cls.other, model_chosen="resnet", crop_name="wheat")
+
+    def collect(self, records, limit):
+        pages, cursor = [], None
+        while True:
+            rows, cursor = keyset_page(records, cursor, limit)
+            pages.append([row["id"] for row in rows])
+            if cursor is None:
+                return pages
+
+    def test_pages_cover_every_row_once_newest_first(self):
+        records = history_queryset(self.user, {})
+        expected = list(records.order_by("-created_at", "-id").values_list("id", flat=True))
+
+        pages = self.collect(records, limit=3)
+
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual([record_id for page in pages for record_id in page], expected)
+
+    def test_exact_multiple_of_the_limit_ends_without_an_empty_page(self):
+        pages = self.collect(history_queryset(self.user, {}), limit=7)
+        self.assertEqual([len(page) for page in pages], [7])
+
+    def test_rows_are_projected(self):
+        rows, _ = keyset_page(history_queryset(self.user, {}), None, 1)
+        self.assertEqual(rows[0]["user__username"], "farmer")
+        self.assertEqual(rows[0]["crop_name"], "maize")
+
+    def test_invalid_cursor_is_rejected(self):
+        with self.assertRaisesMessage(ValueError, "Invalid cursor"):
+            keyset_page(history_queryset(self.user, {}), "not-a-cursor", 3)
+
+    def test_users_see_only_their_records_and_admins_can_filter(self):
+        self.assertEqual(history_queryset(self.user, {}).count(), 7)
+        self.assertEqual(history_queryset(self.other, {"user": "farmer"}).count(), 1)
+        self.assertEqual(history_queryset(self.admin, {}).count(), 8)
+        self.assertEqual(history_queryset(self.admin, {"user": "neighbour"}).count(), 1)
+
+
+def image_upload(width=64, height=48, image_format="JPEG", name="photo.jpg"):
+    buffer = BytesIO()
+    Image.new("RGB", (width, height), (40, 120, 40)).save(buffer, format=image_format)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+@override_settings(UPLOAD_MAX_BYTES=10_000, UPLOAD_MAX_PIXELS=5_000)
+class IngestTests(SimpleTestCase):
+    """Upload validation from the byte size and image header, before any pixels are decoded."""
+
+    def assertRejected(self, status, uploaded):
+        with self.assertRaises(UploadRejected) as raised:
+            ingest(uploaded)
+        self.assertEqual(raised.exception.status, status)
+
+    def test_check_size(self):
+        check_size(10_000)
+        with self.assertRaises(UploadRejected) as raised:
+            check_size(10_001)
+        self.assertEqual(raised.exception.status, 413)
+
+    def test_accepts_a_valid_image_without_decoding_it(self):
+        uploaded = image_upload(64, 48)
+        image = ingest(uploaded)
+
+        self.assertIsInstance(image, IngestedImage)
+        self.assertEqual((image.width, image.height, image.format), (64, 48, "JPEG"))
+        self.assertEqual(image.digest, hashlib.sha256(uploaded.read()).hexdigest())
+        self.assertEqual(image._decoded, {})
+
+    def test_rejects_too_many_pixels_from_the_header(self):
+        self.assertRejected(413, image_upload(100, 100, "PNG", "large.png"))
+
+    def test_decompression_bomb_is_413(self):
+        with mock.patch.object(Image, "MAX_IMAGE_PIXELS", 1_000):
+            self.assertRejected(413, image_upload(60, 60, "PNG", "bomb.png"))
+
+    def test_rejects_oversized_bytes(self):
+        self.assertRejected(413, SimpleUploadedFile("big.jpg", b"\xff" * 10_001))
+
+    def test_rejects_corrupt_and_unsupported_files(self):
+        self.assertRejected(400, SimpleUploadedFile("broken.jpg", b"not an image"))
+        self.assertRejected(415, image_upload(10, 10, "GIF", "anim.gif"))
+
+
+class JobRunnerTests(TestCase):
+    """Claiming and recovery of InferenceJobs; _run is mocked so no model is ever loaded."""
+
+    def setUp(self):
+        patcher = mock.patch.object(JobRunner, "_run")
+        self.run = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_runner(self):
+        runner = JobRunner(workers=1, max_concurrency=1, heartbeat=3600, stale_after=120)
+        self.addCleanup(runner._executor.shutdown, wait=True)
+        return runner
+
+    def make_job(self, **fields):
+        return InferenceJob.objects.create(model_chosen="yolov8_m", **fields)
+
+    def submitted(self, runner):
+        runner._executor.shutdown(wait=True)
+        return sorted(str(call.args[0]) for call in self.run.call_args_list)
+
+    def test_only_one_runner_claims_a_job(self):
+        job = self.make_job()
+        first, second = self.make_runner(), self.make_runner()
+
+        self.assertTrue(first._claim(job.id))
+        self.assertFalse(second._claim(job.id))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.owner), (InferenceJob.STATUS_RUNNING, first.owner))
+        self.assertIsNotNone(job.heartbeat_at)
+
+    def test_startup_queues_unclaimed_jobs_once(self):
+        queued = self.make_job()
+        self.make_job(status=InferenceJob.STATUS_SUCCEEDED)
+        runner = self.make_runner()
+        runner._recover()  # A second sweep must not queue the same job again
+
+        self.assertEqual(self.submitted(runner), [str(queued.id)])
+
+    def test_recovers_only_jobs_with_a_stale_heartbeat(self):
+        now = timezone.now()
+        stale = self.make_job(status=InferenceJob.STATUS_RUNNING, owner="dead:1:x",
+                              heartbeat_at=now - timedelta(minutes=10))
+        live = self.make_job(status=InferenceJob.STATUS_RUNNING, owner="live:2:y", heartbeat_at=now)
+
+        runner = self.make_runner()
+
+        stale.refresh_from_db()
+        live.refresh_from_db()
+        self.assertEqual((stale.status, stale.owner), (InferenceJob.STATUS_QUEUED, None))
+        self.assertEqual((live.status, live.owner), (InferenceJob.STATUS_RUNNING, "live:2:y"))
+        self.assertEqual(self.submitted(runner), [str(stale.id)])
+
+    def test_result_is_dropped_once_the_job_was_reclaimed(self):
+        job = self.make_job()
+        first, second = self.make_runner(), self.make_runner()
+        first._claim(job.id)
+        # first stalls; the job is re-queued and second takes it over
+        InferenceJob.objects.filter(id=job.id).update(status=InferenceJob.STATUS_QUEUED, owner=None)
+        second._claim(job.id)
+
+        stale_copy = InferenceJob.objects.get(id=job.id)
+        stale_copy.status, stale_copy.result = InferenceJob.STATUS_SUCCEEDED, {"weed_count": 1}
+        self.assertFalse(first._finish(stale_copy))
+
+        stale_copy.result = {"weed_count": 2}
+        self.assertTrue(second._finish(stale_copy))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), (InferenceJob.STATUS_SUCCEEDED, {"weed_count": 2}))
+
+
+class FakeWikiCache:
+    """Stands in for AIClass.wiki_cache: `peek` returns `cached`; `get` replays `results` (exceptions are raised)."""
+
+    def __init__(self, cached=None, results=()):
+        self.cached = cached
+        self.results = list(results)
+
+    def peek(self, class_name):
+        return self.cached
+
+    def get(self, class_name):
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+class EnrichmentTests(TestCase):
+    """Wikipedia enrichment of classified records, inline when cached and in the background otherwise."""
+
+    MAIZE = ("Maize", "Maize is a cereal grain.", "https://en.wikipedia.org/wiki/Maize")
+
+    def use_cache(self, wiki_cache):
+        patcher = mock.patch.object(enrichment, "get_ai", return_value=SimpleNamespace(wiki_cache=wiki_cache))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_records(self, count=2):
+        return [ImageRecord(model_chosen="resnet", crop_name="maize") for _ in range(count)]
+
+    def test_cached_summary_is_applied_before_insert(self):
+        self.use_cache(FakeWikiCache(cached=self.MAIZE))
+        records = self.make_records()
+
+        self.assertEqual(enrichment.enrich(records, "maize"), self.MAIZE)
+        for record in records:
+            self.assertEqual((record.wiki_title, record.summary_status), ("Maize", ImageRecord.SUMMARY_READY))
+
+    def test_cached_missing_page_uses_the_fallback_text(self):
+        self.use_cache(FakeWikiCache(cached=(None, None, None)))
+        records = self.make_records(1)
+        enrichment.enrich(records, "unknown weed")
+
+        self.assertEqual(records[0].wiki_title, enrichment.NO_DATA_TITLE)
+        self.assertEqual(records[0].summary, enrichment.NO_DATA_SUMMARY)
+
+    def test_cold_cache_leaves_records_pending_and_schedules_them(self):
+        self.use_cache(FakeWikiCache())
+        records = self.make_records()
+        self.assertIsNone(enrichment.enrich(records, "maize"))
+        ready = ImageRecord(model_chosen="resnet", crop_name="maize", summary_status=ImageRecord.SUMMARY_READY)
+        for record in records + [ready]:
+            record.save()
+
+        worker = mock.Mock()
+        with mock.patch.object(enrichment, "get_enrichment_worker", return_value=worker):
+            enrichment.schedule(records + [ready], "maize")
+        worker.enqueue.assert_called_once_with([record.id for record in records], "maize")
+
+    def test_nothing_is_scheduled_when_all_records_are_ready(self):
+        self.use_cache(FakeWikiCache(cached=self.MAIZE))
+        records = self.make_records()
+        enrichment.enrich(records, "maize")
+        with mock.patch.object(enrichment, "get_enrichment_worker") as get_worker:
+            enrichment.schedule(records, "maize")
+        get_worker.assert_not_called()
+
+    def run_worker(self, results, retries=2):
+        self.use_cache(FakeWikiCache(results=results))
+        record = ImageRecord.objects.create(model_chosen="resnet", crop_name="maize",
+                                            summary_status=ImageRecord.SUMMARY_PENDING)
+        worker = enrichment.EnrichmentWorker(workers=1, retries=retries, backoff_seconds=0.5)
+        self.addCleanup(worker._executor.shutdown)
+        with mock.patch.object(enrichment.time, "sleep") as sleep:
+            worker._run([record.id], "maize")
+        record.refresh_from_db()
+        return record, [call.args[0] for call in sleep.call_args_list]
+
+    def test_worker_retries_with_backoff_then_fills_the_summary(self):
+        record, sleeps = self.run_worker([ConnectionError("timeout"), self.MAIZE])
+
+        self.assertEqual(sleeps, [0.5])
+        self.assertEqual(record.summary_status, ImageRecord.SUMMARY_READY)
+        self.assertEqual(record.summary, self.MAIZE[1])
+
+    def test_worker_marks_failed_without_sleeping_after_the_last_attempt(self):
+        record, sleeps = self.run_worker([ConnectionError("timeout")] * 3, retries=2)
+
+        self.assertEqual(sleeps, [0.5, 1.0])
+        self.assertEqual(record.summary_status, ImageRecord.SUMMARY_FAILED)
+
+
+class TilingTests(SimpleTestCase):
+    """Tile layout and the cross-tile merge, on two 640px tiles overlapping by 128px."""
+
+    LEFT, RIGHT = (0, 0, 640, 640), (512, 0, 1152, 640)
+
+    def merge(self, boxes, windows, conf=None, cls=None, threshold=0.5):
+        conf = np.array(conf or [0.9 - 0.1 * i for i in range(len(boxes))], dtype=np.float32)
+        cls = np.array(cls or [0] * len(boxes))
+        return merge_tile_detections(np.array(boxes, dtype=np.float32), conf, cls, np.array(windows), threshold)
+
+    def test_box_clipped_at_the_tile_edge_merges_with_its_neighbour(self):
+        # One object spanning x 400-800: each tile only sees the part inside its window.
+        xyxy, conf, cls = self.merge([[400, 100, 640, 200], [512, 100, 800, 200]], [self.LEFT, self.RIGHT],
+                                     conf=[0.6, 0.8])
+
+        self.assertEqual(xyxy.tolist(), [[400, 100, 800, 200]])
+        self.assertAlmostEqual(float(conf[0]), 0.8, places=5)
+
+    def test_distinct_objects_in_the_overlap_stay_separate(self):
+        xyxy, _, _ = self.merge([[520, 100, 560, 140], [580, 100, 620, 140]], [self.LEFT, self.RIGHT])
+        self.assertEqual(len(xyxy), 2)
+
+    def test_different_classes_do_not_merge(self):
+        xyxy, _, cls = self.merge([[400, 100, 640, 200], [512, 100, 800, 200]], [self.LEFT, self.RIGHT],
+                                  cls=[0, 1])
+        self.assertEqual(sorted(cls.tolist()), [0, 1])
+
+    def test_boxes_from_the_same_tile_never_merge(self):
+        xyxy, _, _ = self.merge([[100, 100, 300, 300], [120, 120, 320, 320]], [self.LEFT, self.LEFT])
+        self.assertEqual(len(xyxy), 2)
+
+    def test_empty_input_is_returned_unchanged(self):
+        xyxy, conf, cls = self.merge([], [], conf=[], cls=[])
+        self.assertEqual((len(xyxy), len(conf), len(cls)), (0, 0, 0))
+
+    def test_windows_reach_the_right_and_bottom_edges(self):
+        windows = tile_windows(1000, 700, 640, 128)
+
+        self.assertEqual(windows, [(0, 0, 640, 640), (360, 0, 1000, 640), (0, 60, 640, 700), (360, 60, 1000, 700)])
+        self.assertTrue(all(x1 - x0 == 640 and y1 - y0 == 640 for x0, y0, x1, y1 in windows))
+
+    def test_image_smaller_than_a_tile_is_a_single_window(self):
+        self.assertEqual(tile_windows(300, 200, 640, 128), [(0, 0, 300, 200)])
+
+
+class FrameIteratorTests(SimpleTestCase):
+    """stride/skip/max_frames selection for uploaded frame sequences and video files."""
+
+    def write_video(self, count=10):
+        fd, path = tempfile.mkstemp(suffix=".avi")
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (32, 24))
+        for i in range(count):
+            writer.write(np.full((24, 32, 3), i * 20, dtype=np.uint8))
+        writer.release()
+        return path
+
+    def indices(self, frames):
+        return [index for index, _, _ in frames]
+
+    def test_image_frames_apply_skip_then_stride(self):
+        files = [image_upload(name=f"frame{i}.jpg") for i in range(7)]
+        self.assertEqual(self.indices(iter_image_frames(files, stride=2, skip=1)), [1, 3, 5])
+
+    def test_image_frames_stop_at_max_frames(self):
+        files = [image_upload(name=f"frame{i}.jpg") for i in range(7)]
+        frames = list(iter_image_frames(files, stride=3, max_frames=2))
+
+        self.assertEqual(self.indices(frames), [0, 3])
+        self.assertEqual(frames[0][2].shape, (48, 64, 3))
+        self.assertIsNone(frames[0][1])
+
+    def test_video_frames_apply_skip_stride_and_max_frames(self):
+        path = self.write_video(10)
+
+        self.assertEqual(self.indices(iter_video_frames(path)), list(range(10)))
+        self.assertEqual(self.indices(iter_video_frames(path, stride=3, skip=2)), [2, 5, 8])
+        frames = list(iter_video_frames(path, stride=2, max_frames=2))
+        self.assertEqual(self.indices(frames), [0, 2])
+        self.assertEqual(frames[0][2].shape, (24, 32, 3))
+
+    def test_unreadable_video_is_rejected(self):
+        with self.assertRaises(ValueError):
+            list(iter_video_frames(os.path.join(tempfile.gettempdir(), "missing-video.avi")))
+
+
+@override_settings(INFERENCE_MAX_BATCH=4)
+class DetectVideoOptionTests(TestCase):
+    """Option validation on /api/detect/video, which runs before any frame is decoded."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username="farmer", password="secret")
+
+    def post(self, **fields):
+        self.client.force_login(self.user)
+        data = {"model": "yolov8_m", "frames": [image_upload()], **fields}
+        return self.client.post("/api/detect/video", data)
+
+    def test_batch_above_the_inference_limit_is_rejected(self):
+        response = self.post(batch="400")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["error"], "Invalid batch (must be at most 4)")
+
+    def test_stride_below_one_is_rejected(self):
+        response = self.post(stride="0")
+        self.assertEqual(response.json()["error"], "Invalid stride (must be at least 1)")
+
+
+class ResultCacheTests(TestCase):
+    """Both tiers of the result cache, with the DB tier's timestamps moved back to simulate age."""
+
+    RESULT = {"class_name": "maize", "confidence": 0.93}
+
+    def make_cache(self, ttl_seconds=3600):
+        return ResultCache(max_entries=2, ttl_seconds=ttl_seconds, prune_every=0)
+
+    def age(self, key, seconds):
+        CachedResult.objects.filter(key=key).update(created_at=timezone.now() - timedelta(seconds=seconds))
+
+    def test_key_hashes_the_image_digest_and_options(self):
+        image_digest = hashlib.sha256(b"image bytes").hexdigest()
+        key = ResultCache.key(image_digest, "resnet", "fingerprint-1", "classify")
+
+        expected = hashlib.sha256(image_digest.encode("utf-8"))
+        expected.update(b'["resnet", "fingerprint-1", "classify"]')
+        self.assertEqual(key, expected.hexdigest())
+        # Reloaded weights (a new fingerprint) must not be served the old model's results
+        self.assertNotEqual(key, ResultCache.key(image_digest, "resnet", "fingerprint-2", "classify"))
+        self.assertNotEqual(key, ResultCache.key(hashlib.sha256(b"other").hexdigest(), "resnet", "fingerprint-1",
+                                                 "classify"))
+
+    def test_counters_follow_each_tier(self):
+        cache = self.make_cache()
+        self.assertIsNone(cache.get("k"))
+        cache.put("k", "classify", "resnet", self.RESULT)
+        self.assertEqual(cache.get("k"), self.RESULT)
+        cache.clear_memory()
+        self.assertEqual(cache.get("k"), self.RESULT)
+        self.assertEqual(cache.get("k"), self.RESULT)  # Promoted back into memory
+
+        stats = cache.stats()
+        self.assertEqual((stats["memory_hits"], stats["db_hits"], stats["misses"]), (2, 1, 1))
+        self.assertEqual(stats["hit_rate"], 0.75)
+        self.assertEqual(stats["memory_entries"], 1)
+
+    def test_expired_rows_are_misses_and_pruned(self):
+        cache = self.make_cache(ttl_seconds=60)
+        cache.put("old", "classify", "resnet", self.RESULT)
+        cache.put("new", "classify", "resnet", self.RESULT)
+        self.age("old", 120)
+        cache.clear_memory()
+
+        self.assertIsNone(cache.get("old"))
+        self.assertEqual(cache.get("new"), self.RESULT)
+        self.assertEqual(cache.prune(), 1)
+        self.assertEqual(list(CachedResult.objects.values_list("key", flat=True)), ["new"])
+
+    def test_expired_memory_entry_falls_through_to_the_db(self):
+        cache = self.make_cache(ttl_seconds=60)
+        cache.put("k", "classify", "resnet", self.RESULT)
+        with mock.patch("detector.result_cache.time.time", return_value=time.time() + 120):
+            self.assertEqual(cache.get("k"), self.RESULT)
+        self.assertEqual(cache.stats()["db_hits"], 1)
+
+    def test_expired_row_is_replaced_on_put(self):
+        cache = self.make_cache(ttl_seconds=60)
+        cache.put("k", "classify", "resnet", self.RESULT)
+        self.age("k", 120)
+        cache.put("k", "classify", "resnet", {"class_name": "wheat", "confidence": 0.8})
+        cache.clear_memory()
+
+        self.assertEqual(cache.get("k")["class_name"], "wheat")
+        self.assertEqual(CachedResult.objects.count(), 1)
+
+    def test_memory_tier_is_bounded(self):
+        cache = self.make_cache()
+        for key in ("a", "b", "c"):
+            cache.put(key, "classify", "resnet", self.RESULT)
+        self.assertEqual(cache.stats()["memory_entries"], 2)
+
+    def test_cascade_timings_are_not_cached(self):
+        result = {
+            "class_name": "maize", "confidence": 0.9, "model_used": "vit", "escalated": True,
+            "preprocess_ms": 3.2,
+            "stages": [{"model": "resnet", "confidence": 0.4, "ms": 11.0}, {"model": "vit", "confidence": 0.9, "ms": 40.5}],
+        }
+        cacheable = _without_timings(result)
+
+        self.assertNotIn("preprocess_ms", cacheable)
+        self.assertEqual(cacheable["stages"], [{"model": "resnet", "confidence": 0.4}, {"model": "vit", "confidence": 0.9}])
+        self.assertEqual(result["stages"][0]["ms"], 11.0)  # The fresh response keeps them
+
+
+class HistoryFilterTests(TestCase):
+    """history_queryset visibility and filters, shared by the history API and the exports."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username="farmer", password="secret")
+        cls.other = CustomUser.objects.create_user(username="neighbour", password="secret")
+        cls.admin = CustomUser.objects.create_user(username="admin", password="secret", is_admin=True)
+
+        cls.records = {}
+        for name, user, model, crop, created_at in (
+            ("first", cls.user, "resnet", "maize", datetime(2026, 3, 1, 10, 0)),
+            ("late", cls.user, "vit", "wheat", datetime(2026, 3, 2, 23, 30)),
+            ("other", cls.other, "resnet", "maize", datetime(2026, 3, 3, 8, 0)),
+        ):
+            record = ImageRecord.objects.create(user=user, model_chosen=model, crop_name=crop)
+            ImageRecord.objects.filter(id=record.id).update(created_at=timezone.make_aware(created_at))
+            cls.records[name] = record.id
+
+    def ids(self, user, **params):
+        return sorted(history_queryset(user, params).values_list("id", flat=True))
+
+    def expected(self, *names):
+        return sorted(self.records[name] for name in names)
+
+    def test_users_only_see_their_own_records(self):
+        self.assertEqual(self.ids(self.user), self.expected("first", "late"))
+        self.assertEqual(self.ids(self.user, user="neighbour"), self.expected("first", "late"))
+
+    def test_admins_and_commands_see_everyone_and_can_filter_by_user(self):
+        self.assertEqual(self.ids(self.admin), self.expected("first", "late", "other"))
+        self.assertEqual(self.ids(None), self.expected("first", "late", "other"))
+        self.assertEqual(self.ids(self.admin, user="neighbour"), self.expected("other"))
+
+    def test_model_and_crop_filters(self):
+        self.assertEqual(self.ids(self.admin, model_chosen="resnet"), self.expected("first", "other"))
+        self.assertEqual(self.ids(self.admin, crop_name="wheat"), self.expected("late"))
+        self.assertEqual(self.ids(self.admin, model_chosen="resnet", crop_name="wheat"), [])
+
+    def test_bare_dates_cover_the_whole_day(self):
+        self.assertEqual(self.ids(self.admin, date_to="2026-03-02"), self.expected("first", "late"))
+        self.assertEqual(self.ids(self.admin, date_from="2026-03-02"), self.expected("late", "other"))
+        self.assertEqual(self.ids(self.admin, date_from="2026-03-02", date_to="2026-03-02"), self.expected("late"))
+
+    def test_datetime_bounds_are_exact(self):
+        self.assertEqual(self.ids(self.admin, date_to="2026-03-02T12:00:00"), self.expected("first"))
+
+    def test_malformed_dates_are_rejected(self):
+        with self.assertRaises(ValueError):
+            history_queryset(self.admin, {"date_from": "last tuesday"})
+
+
+class ExportTests(TestCase):
+    """Streaming CSV and NDJSON exports of the history rows, oldest first."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username="farmer", password="secret")
+        cls.ids = [
+            ImageRecord.objects.create(user=cls.user, model_chosen="resnet", crop_name=crop, summary=summary).id
+            for crop, summary in (("maize", "A cereal, also called corn.\nGrown worldwide."), ("wheat", ""))
+        ]
+
+    def rows(self):
+        return iter_rows(ImageRecord.objects.all(), chunk_size=1)
+
+    def test_rows_are_ordered_oldest_first_with_export_columns(self):
+        rows = list(self.rows())
+
+        self.assertEqual([row["image_id"] for row in rows], self.ids)
+        self.assertEqual(list(rows[0]), [name for name, _ in EXPORT_COLUMNS])
+        self.assertEqual(rows[0]["username"], "farmer")
+
+    def test_csv_has_a_header_and_quotes_text_fields(self):
+        lines = list(iter_csv(self.rows()))
+        parsed = list(csv.reader(StringIO("".join(lines))))
+
+        self.assertEqual(len(lines), 3)  # One chunk per row, however many lines a field spans
+        self.assertEqual(parsed[0], [name for name, _ in EXPORT_COLUMNS])
+        self.assertEqual(parsed[1][0], str(self.ids[0]))
+        self.assertEqual(parsed[1][6], "A cereal, also called corn.\nGrown worldwide.")
+        self.assertEqual(parsed[2][4], "wheat")
+
+    def test_ndjson_has_one_object_per_line(self):
+        lines = list(iter_ndjson(self.rows()))
+        objects = [json.loads(line) for line in lines]
+
+        self.assertTrue(all(line.endswith("\n") and line.count("\n") == 1 for line in lines))
+        self.assertEqual([obj["image_id"] for obj in objects], self.ids)
+        self.assertIsInstance(objects[0]["created_at"], str)
+
+    def test_empty_export_is_just_the_header(self):
+        self.assertEqual(list(iter_csv(iter([]))), [",".join(name for name, _ in EXPORT_COLUMNS) + "\r\n"])
+        self.assertEqual(list(iter_ndjson(iter([]))), [])
+
+
+class PersistDetectionsTests(TestCase):
+    """Bulk storage of detect results: records, packed boxes, per-box rows and rollup deltas."""
+
+    CLASSES = ["maize", "Weed-broadleaf"]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username="farmer", password="secret")
+
+    def entry(self, boxes, weeds, crops, **extra):
+        result = {"weed_count": weeds, "crop_count": crops, "detections": {"classes": self.CLASSES, "boxes": boxes}}
+        return {"image": "uploads/field.jpg", "result": {**result, **extra}}
+
+    def test_pack_boxes_round_trips_through_the_model(self):
+        boxes = [[1.5, 2, 30, 40, 0.9, 1], [5, 6, 50, 60.25, 0.5, 0]]
+        detection = Detection(boxes=pack_boxes(boxes))
+
+        np.testing.assert_allclose(detection.box_array(), np.array(boxes, dtype=np.float32))
+        self.assertEqual(Detection(boxes=pack_boxes([])).box_array().shape, (0, 6))
+
+    def test_records_detections_and_boxes_are_stored_in_order(self):
+        records = persist_detections(self.user, "yolov8_m", [
+            self.entry([[1, 2, 30, 40, 0.9, 1], [5, 6, 50, 60, 0.5, 0]], weeds=1, crops=1),
+            self.entry([], weeds=0, crops=0, model_used="yolov8_x"),
+        ])
+
+        self.assertEqual([record.model_chosen for record in records], ["yolov8_m", "yolov8_x"])
+        self.assertEqual(records[0].mode, ImageRecord.MODE_DETECT)
+        self.assertEqual(records[0].summary, "1 weeds, 1 crops")
+
+        first, second = (Detection.objects.get(record=record) for record in records)
+        self.assertAlmostEqual(first.mean_confidence, 0.7, places=5)
+        self.assertIsNone(second.mean_confidence)
+        self.assertEqual(second.box_array().shape, (0, 6))
+
+        rows = DetectionBox.objects.filter(detection=first).order_by("confidence")
+        self.assertEqual([(row.label, row.is_weed) for row in rows], [("maize", False), ("Weed-broadleaf", True)])
+        self.assertEqual((rows[1].x1, rows[1].y1, rows[1].x2, rows[1].y2), (1, 2, 30, 40))
+        self.assertFalse(DetectionBox.objects.filter(detection=second).exists())
+
+    def test_rollups_receive_the_deltas(self):
+        persist_detections(self.user, "yolov8_m", [
+            self.entry([[1, 2, 30, 40, 0.9, 1], [5, 6, 50, 60, 0.5, 0]], weeds=1, crops=1),
+            self.entry([[1, 2, 30, 40, 0.6, 1]], weeds=1, crops=0),
+            self.entry([], weeds=0, crops=0, model_used="yolov8_x"),
+        ])
+
+        medium = DailyRollup.objects.get(model_chosen="yolov8_m")
+        self.assertEqual((medium.image_count, medium.weed_count, medium.crop_count), (2, 2, 1))
+        self.assertAlmostEqual(medium.confidence_sum, 1.3, places=5)
+        self.assertEqual(medium.confidence_samples, 2)
+        large = DailyRollup.objects.get(model_chosen="yolov8_x")
+        self.assertEqual((large.image_count, large.confidence_samples), (1, 0))
+
+    def test_no_entries_writes_nothing(self):
+        self.assertEqual(persist_detections(self.user, "yolov8_m", []), [])
+        self.assertFalse(ImageRecord.objects.exists())
+
+
+class RollupTests(TestCase):
+    """Rollups maintained on write must match a rebuild from ImageRecord and Detection."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username="farmer", password="secret")
+        cls.other = CustomUser.objects.create_user(username="neighbour", password="secret")
+
+    def snapshot(self):
+        # Rows emptied by deletions stay behind with zero counters; they add nothing to /api/stats
+        rows = DailyRollup.objects.filter(image_count__gt=0).order_by("day", "user_id", "mode", "crop_name",
+                                                                       "model_chosen")
+        return [
+            (row.day, row.user_id, row.mode, row.crop_name, row.model_chosen, row.image_count, row.weed_count,
+             row.crop_count, round(row.confidence_sum, 4), row.confidence_samples)
+            for row in rows
+        ]
+
+    def classify(self, user, crop, created_at):
+        record = ImageRecord.objects.create(user=user, model_chosen="resnet", crop_name=crop)
+        ImageRecord.objects.filter(id=record.id).update(created_at=timezone.make_aware(created_at))
+        record.refresh_from_db()
+        rollups.apply([record])
+        return record
+
+    def populate(self):
+        self.classify(self.user, "maize", datetime(2026, 3, 1, 9, 0))
+        self.classify(self.user, "maize", datetime(2026, 3, 1, 20, 0))
+        self.classify(self.other, "wheat", datetime(2026, 3, 2, 7, 0))
+        removed = self.classify(self.user, "wheat", datetime(2026, 3, 2, 12, 0))
+        emptied = self.classify(self.other, "rice", datetime(2026, 3, 3, 12, 0))
+        for record in (removed, emptied):
+            rollups.apply([record], sign=-1)
+            record.delete()
+
+        boxes = {"classes": ["maize", "weed"], "boxes": [[0, 0, 10, 10, 0.8, 1], [0, 0, 5, 5, 0.4, 0]]}
+        persist_detections(self.user, "yolov8_m", [
+            {"image": "uploads/a.jpg", "result": {"weed_count": 1, "crop_count": 1, "detections": boxes}},
+            {"image": "uploads/b.jpg", "result": {"weed_count": 0, "crop_count": 0,
+                                                  "detections": {"classes": [], "boxes": []}}},
+        ])
+        # A deleted detect record leaves its counts behind unless it is subtracted as well
+        doomed = persist_detections(self.other, "yolov8_m", [
+            {"image": "uploads/c.jpg", "result": {"weed_count": 1, "crop_count": 0, "detections": boxes}},
+        ])[0]
+        rollups.apply([doomed], [doomed.detection], sign=-1)
+        doomed.delete()
+
+    def test_incremental_rollups_match_a_rebuild(self):
+        self.populate()
+        incremental = self.snapshot()
+
+        rollups.rebuild()
+        self.assertEqual(self.snapshot(), incremental)
+        self.assertEqual(sum(row[5] for row in incremental), 5)
+
+    @override_settings(TIME_ZONE="Asia/Kolkata")
+    def test_days_follow_the_local_time_zone_in_both_paths(self):
+        self.populate()  # 20:00 UTC on March 1st is already March 2nd in Kolkata
+        incremental = self.snapshot()
+
+        rollups.rebuild()
+        self.assertEqual(self.snapshot(), incremental)
+
+    def test_partial_rebuild_leaves_other_days_alone(self):
+        self.populate()
+        before = self.snapshot()
+        DailyRollup.objects.update(image_count=99)
+
+        day = datetime(2026, 3, 1).date()
+        rollups.rebuild(day_from=day, day_to=day)
+        self.assertEqual([row for row in self.snapshot() if row[0] == day], [row for row in before if row[0] == day])
+        self.assertTrue(all(row[5] == 99 for row in self.snapshot() if row[0] != day))
+
+
+class DetectorRouterTests(SimpleTestCase):
+    """model='auto' routing against a 200 ms SLO with fixed per-image priors."""
+
+    def make_router(self, **kwargs):
+        return DetectorRouter(["yolov8_x", "yolov8_l", "yolov8_m"], slo_ms=200,
+                              prior_ms={"yolov8_x": 120, "yolov8_l": 60, "yolov8_m": 30},
+                              decode_ms_per_mp=20, **kwargs)
+
+    def test_idle_router_serves_the_most_accurate_model(self):
+        self.assertEqual(self.make_router().choose(), "yolov8_x")
+
+    def test_in_flight_load_falls_back_to_smaller_models(self):
+        router = self.make_router()
+        with router.track("yolov8_x", 1):
+            self.assertEqual(router.choose(), "yolov8_l")
+            with router.track("yolov8_l", 3):
+                self.assertEqual(router.choose(), "yolov8_m")
+        self.assertEqual(router.choose(), "yolov8_x")  # Load released
+
+    def test_cheapest_model_serves_when_nothing_fits(self):
+        router = self.make_router()
+        with router.track("yolov8_m", 10):
+            self.assertEqual(router.choose(images=4), "yolov8_m")
+
+    def test_large_images_route_to_smaller_models(self):
+        router = self.make_router()
+
+        self.assertEqual(router.choose(megapixels=1), "yolov8_x")  # 120 + 20
+        self.assertEqual(router.choose(megapixels=5), "yolov8_l")  # x: 120 + 100
+        self.assertEqual(router.choose(images=2, megapixels=5), "yolov8_m")  # l: 2 x 60 + 100
+        self.assertEqual(router.estimate_ms("yolov8_l", images=2, megapixels=5), 220)
+
+    def test_measured_latency_updates_the_estimate(self):
+        router = self.make_router(alpha=0.5)
+        router.observe("yolov8_x", images=4, elapsed_ms=800)  # 200 ms per image
+
+        self.assertEqual(router.estimate_ms("yolov8_x"), 160)
+        self.assertEqual(router.choose(megapixels=3), "yolov8_l")
+        router.observe("unknown", images=1, elapsed_ms=10)
+        router.observe("yolov8_m", images=0, elapsed_ms=10)
+        self.assertEqual(router.estimate_ms("yolov8_m"), 30)
+
+    def test_status_counts_routed_requests(self):
+        router = self.make_router()
+        router.choose()
+        with router.track("yolov8_x", 2):
+            router.choose()
+            models = {entry["key"]: entry for entry in router.status()["models"]}
+
+        self.assertEqual((models["yolov8_x"]["routed"], models["yolov8_x"]["in_flight"]), (1, 2))
+        self.assertEqual(models["yolov8_l"]["routed"], 1)
+
+
+class DetectionParamsTests(SimpleTestCase):
+    """Validation and precedence of the YOLO predict() arguments."""
+
+    def test_validated_bounds(self):
+        for key, value, expected in (
+            ("imgsz", 128, 128), ("imgsz", "2048", 2048), ("conf", "1", 1.0), ("iou", 0.05, 0.05),
+            ("max_det", 1, 1), ("max_det", "1000", 1000), ("classes", None, None),
+            ("classes", "0, Weed-broadleaf,", [0, "Weed-broadleaf"]), ("classes", [2, "1"], [2, 1]),
+        ):
+            with self.subTest(key=key, value=value):
+                self.assertEqual(_validated(key, value), expected)
+
+        for key, value in (
+            ("imgsz", 96), ("imgsz", 2080), ("imgsz", 500), ("imgsz", "large"), ("conf", 0), ("conf", 1.01),
+            ("iou", -0.1), ("conf", "high"), ("max_det", 0), ("max_det", 1001), ("max_det", "2.5"),
+            ("classes", ""), ("classes", []),
+        ):
+            with self.subTest(key=key, value=value), self.assertRaisesMessage(ValueError, f"Invalid {key}"):
+                _validated(key, value)
+
+    def test_parse_keeps_only_given_fields(self):
+        self.assertEqual(parse_detection_params({}), {"profile": "default"})
+        self.assertEqual(
+            parse_detection_params({"profile": "fast", "conf": "0.5", "iou": "", "classes": "weed"}),
+            {"profile": "fast", "conf": 0.5, "classes": ["weed"]},
+        )
+
+    def test_parse_rejects_unknown_profiles_and_bad_values(self):
+        with self.assertRaisesMessage(ValueError, "Invalid profile (must be one of: default, fast)"):
+            parse_detection_params({"profile": "turbo"})
+        with self.assertRaisesMessage(ValueError, "Invalid imgsz (must be a multiple of 32 between 128 and 2048)"):
+            parse_detection_params({"imgsz": "100"})
+
+    def test_fast_profile(self):
+        self.assertEqual(
+            resolve_detection_params("yolov8_m", parse_detection_params({"profile": "fast"})),
+            {**YOLO_DEFAULTS, "imgsz": 480, "conf": 0.4, "max_det": 100},
+        )
+
+    @override_settings(
+        DETECTION_DEFAULTS={"conf": 0.3, "iou": 0.5, "imgsz": 800},
+        DETECTION_MODEL_PARAMS={"yolov8_x": {"conf": 0.35, "imgsz": 1024}},
+    )
+    def test_later_sources_win(self):
+        # defaults < deployment < model < profile < request
+        self.assertEqual(resolve_detection_params("yolov8_m", {"profile": "default"}),
+                         {**YOLO_DEFAULTS, "conf": 0.3, "iou": 0.5, "imgsz": 800})
+        self.assertEqual(resolve_detection_params("yolov8_x", {"profile": "default"}),
+                         {**YOLO_DEFAULTS, "conf": 0.35, "iou": 0.5, "imgsz": 1024})
+        self.assertEqual(resolve_detection_params("yolov8_x", {"profile": "fast", "max_det": 50, "iou": 0.6}),
+                         {"imgsz": 480, "conf": 0.4, "iou": 0.6, "max_det": 50, "classes": None})
+
+    @override_settings(DETECTION_PROFILES={"survey": {"imgsz": 1280, "conf": 0.15}, "fast": {"imgsz": 320}})
+    def test_deployment_profiles_add_and_replace(self):
+        self.assertEqual(parse_detection_params({"profile": "survey"})["profile"], "survey")
+        self.assertEqual(resolve_detection_params("yolov8_m", {"profile": "survey"})["imgsz"], 1280)
+        self.assertEqual(resolve_detection_params("yolov8_m", {"profile": "fast"}),
+                         {**YOLO_DEFAULTS, "imgsz": 320})
+
+    @override_settings(DETECTION_DEFAULTS={"imgsz": 650})
+    def test_invalid_deployment_settings_are_reported(self):
+        with self.assertRaisesMessage(ValueError, "Invalid imgsz"):
+            resolve_detection_params("yolov8_m", {"profile": "default"})
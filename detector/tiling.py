@@ -0,0 +1,95 @@
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+Window = Tuple[int, int, int, int]
+
+
+def _positions(length: int, tile_size: int, stride: int) -> List[int]:
+    """Tile start offsets along one axis; the last tile is aligned to the far edge."""
+    if length <= tile_size:
+        return [0]
+    positions = list(range(0, length - tile_size + 1, stride))
+    if positions[-1] + tile_size < length:
+        positions.append(length - tile_size)
+    return positions
+
+
+def tile_windows(width: int, height: int, tile_size: int, overlap: int) -> List[Window]:
+    """(x0, y0, x1, y1) windows of `tile_size` covering the image, with `overlap` pixels between neighbours."""
+    stride = max(1, tile_size - overlap)
+    return [
+        (x0, y0, min(x0 + tile_size, width), min(y0 + tile_size, height))
+        for y0 in _positions(height, tile_size, stride)
+        for x0 in _positions(width, tile_size, stride)
+    ]
+
+
+def iter_tile_batches(image: np.ndarray, windows: List[Window],
+                      batch_size: int) -> Iterator[Tuple[List[Window], List[np.ndarray]]]:
+    """Yields windows with their pixel crops, `batch_size` at a time, so only one batch of tiles is materialised."""
+    for i in range(0, len(windows), batch_size):
+        chunk = windows[i:i + batch_size]
+        yield chunk, [np.ascontiguousarray(image[y0:y1, x0:x1]) for x0, y0, x1, y1 in chunk]
+
+
+def _area(boxes: np.ndarray) -> np.ndarray:
+    return np.clip(boxes[..., 2] - boxes[..., 0], 0, None) * np.clip(boxes[..., 3] - boxes[..., 1], 0, None)
+
+
+def _intersect(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return np.concatenate([np.maximum(a[..., :2], b[..., :2]), np.minimum(a[..., 2:], b[..., 2:])], axis=-1)
+
+
+def merge_tile_detections(xyxy: np.ndarray, conf: np.ndarray, cls: np.ndarray, tile: np.ndarray,
+                          threshold: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Greedy class-aware merge of boxes already shifted into global coordinates, where
+    `tile` holds the (x0, y0, x1, y1) window each box was detected in.
+
+    Two boxes from different tiles are the same object when their intersection covers
+    at least `threshold` of the smaller of the parts each tile could see of the other
+    box (other box ∩ own window). Unlike IoU, this matches a box clipped at a tile edge
+    with the full or clipped box of the neighbouring tile, so an object larger than the
+    overlap is counted once. Matches are merged into their union box, keeping the highest
+    confidence. Boxes from the same tile were already separated by YOLO and never merge.
+    """
+    if not len(cls):
+        return xyxy, conf, cls
+
+    order = np.argsort(-conf, kind="stable")
+    boxes, windows = xyxy[order].astype(np.float64), tile[order].astype(np.float64)
+    conf, cls = conf[order], cls[order]
+    alive = np.ones(len(cls), dtype=bool)
+    merged_boxes, merged_conf, merged_cls = [], [], []
+
+    for i in range(len(cls)):
+        if not alive[i]:
+            continue
+        alive[i] = False
+        box, window = boxes[i], windows[i]
+        same_tile = np.all(windows == windows[i], axis=1)  # Tiles already represented in this group
+        while True:
+            candidates = np.flatnonzero(alive & (cls == cls[i]) & ~same_tile)
+            if not len(candidates):
+                break
+            inter = _area(_intersect(boxes[candidates], box))
+            seen_here = _area(_intersect(boxes[candidates], window))  # Other box, as this tile saw it
+            seen_there = _area(_intersect(box, windows[candidates]))  # This box, as the other tile saw it
+            smaller = np.minimum(seen_here, seen_there)
+            match = candidates[(smaller > 0) & (inter >= threshold * np.where(smaller > 0, smaller, 1))]
+            if not len(match):
+                break
+            alive[match] = False
+            for j in match:
+                same_tile |= np.all(windows == windows[j], axis=1)
+            group = np.vstack([box[None], boxes[match]])
+            box = np.concatenate([group[:, :2].min(axis=0), group[:, 2:].max(axis=0)])
+            spans = np.vstack([window[None], windows[match]])
+            window = np.concatenate([spans[:, :2].min(axis=0), spans[:, 2:].max(axis=0)])
+        merged_boxes.append(box)
+        merged_conf.append(conf[i])
+        merged_cls.append(cls[i])
+
+    return (np.array(merged_boxes, dtype=xyxy.dtype), np.array(merged_conf, dtype=conf.dtype),
+            np.array(merged_cls, dtype=cls.dtype))
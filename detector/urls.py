@@ -3,9 +3,19 @@ from . import views
 
 urlpatterns = [
     path('upload', views.upload_image, name='upload_image'),      # POST
+    path('upload/batch', views.upload_batch, name='upload_batch'),  # POST (NDJSON stream)
+    path('detect/video', views.detect_video, name='detect_video'),  # POST (NDJSON / SSE stream)
     path('delete', views.delete_image, name='delete_image'),      # DELETE
     path('history', views.history_view, name='history_view'),     # GET
+    path('history/export', views.export_history, name='export_history'),  # GET (CSV / NDJSON / Parquet)
+    path('records/<int:image_id>', views.record_view, name='record_view'),  # GET
+    path('stats', views.stats_view, name='stats_view'),          # GET
     path('tips', views.tips_view, name='tips_view'),              # POST
     path('diseases', views.diseases_view, name='diseases_view'),  # POST
     path('news', views.news_view, name='news_view'),              # POST
+    path('jobs', views.submit_job, name='submit_job'),                        # POST
+    path('jobs/<uuid:job_id>', views.job_status, name='job_status'),          # GET
+    path('jobs/<uuid:job_id>/result', views.job_result, name='job_result'),   # GET
+    path('models/status', views.model_status, name='model_status'),          # GET
+    path('models/<str:action>', views.manage_models, name='manage_models'),  # POST
 ]
@@ -0,0 +1,74 @@
+import os
+import shutil
+import tempfile
+from typing import Iterable, Iterator, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .ingest import ingest
+
+Frame = Tuple[int, Optional[float], np.ndarray]
+
+
+def video_path(uploaded_file) -> Tuple[str, bool]:
+    """
+    Returns (path, is_temporary) for an uploaded video so OpenCV can open it.
+    Large uploads are already spooled to disk by Django; small in-memory ones are
+    copied to a temp file in chunks, never read into memory whole.
+    """
+    if hasattr(uploaded_file, "temporary_file_path"):
+        return uploaded_file.temporary_file_path(), False
+
+    suffix = os.path.splitext(uploaded_file.name or "")[1] or ".mp4"
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+        uploaded_file.seek(0)
+        shutil.copyfileobj(uploaded_file, tmp)
+    return tmp.name, True
+
+
+def iter_video_frames(path: str, stride: int = 1, skip: int = 0,
+                      max_frames: Optional[int] = None) -> Iterator[Frame]:
+    """
+    Streams (frame_index, timestamp_ms, rgb_frame) from a video file, one frame at a time.
+    The first `skip` frames are dropped and then every `stride`-th frame is kept; dropped
+    frames are only grabbed, not decoded.
+    """
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError("Could not open video")
+
+    try:
+        index = -1
+        emitted = 0
+        while max_frames is None or emitted < max_frames:
+            if not capture.grab():
+                break
+            index += 1
+            if index < skip or (index - skip) % stride:
+                continue
+
+            ok, frame = capture.retrieve()
+            if not ok:
+                break
+            timestamp = capture.get(cv2.CAP_PROP_POS_MSEC)
+            yield index, timestamp, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            emitted += 1
+    finally:
+        capture.release()
+
+
+def iter_image_frames(files: Iterable, stride: int = 1, skip: int = 0,
+                      max_frames: Optional[int] = None) -> Iterator[Frame]:
+    """
+    Same as iter_video_frames for an uploaded frame sequence; each image is validated like any
+    other upload (ingest, raising UploadRejected) and decoded only when reached.
+    """
+    emitted = 0
+    for index, image_file in enumerate(files):
+        if max_frames is not None and emitted >= max_frames:
+            break
+        if index < skip or (index - skip) % stride:
+            continue
+        yield index, None, ingest(image_file).decode()[0]
+        emitted += 1
@@ -2,24 +2,89 @@ import os
 import json
 import random
 import base64
+import tempfile
+import zipfile
 
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.http import JsonResponse
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings  # <--- to access MEDIA_ROOT, MEDIA_URL
+from django.core.exceptions import TooManyFilesSent
+from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
 
-from PIL import Image
-from io import BytesIO
-
-from .models import ImageRecord
-from .ai_class import AIClass
-from admin_dashboard.models import Tip, Disease, News
+from .models import ImageRecord, InferenceJob
+from .ai_class import AIClass, get_ai
+from .export import EXPORT_CONTENT_TYPES, EXPORT_FORMATS, iter_csv, iter_ndjson, iter_rows, write_parquet
+from .history import history_queryset, keyset_page
+from .jobs import get_job_runner
+from .result_cache import get_result_cache
+from . import enrichment, rollups
+from .encoding import resolve_format
+from .ingest import UploadRejected, check_size, ingest
+from .detections import persist_detections
+from .storage import store_detected_image
+from .video import iter_image_frames, iter_video_frames, video_path
+from .yolo_params import YOLO_PARAMS, parse_detection_params
+from admin_dashboard import content_cache
 
 from authentication.models import CustomUser
 
 
+# History pagination (/api/history?limit=&cursor=)
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 500
+
+# Detect-mode outputs: counts only, counts + box coordinates, or counts + annotated image
+DETECT_OUTPUTS = ("counts", "boxes", "image")
+
+# Extra classify fields returned for model='cascade' / 'ensemble' (per-stage model, confidence, ms)
+CASCADE_FIELDS = ("model_used", "escalated", "preprocess_ms", "stages")
+
+# Per-request timings in those fields; not stored in the result cache, so a cache hit omits them
+TIMING_FIELDS = ("preprocess_ms", "ms")
+
+
+# Sliced-detection request fields (see AIClass.detect_tiled)
+TILE_PARAMS = ("tiled", "tile_size", "tile_overlap", "tile_batch")
+
+# YOLO inference request fields (see yolo_params.parse_detection_params)
+DETECTION_PARAMS = ("profile",) + YOLO_PARAMS
+
+
+def _tile_options(params):
+    """Returns detect_tiled() keyword arguments if tiling was requested, else None; raises ValueError if invalid."""
+    if str(params.get("tiled") or "").lower() not in ("1", "true", "yes"):
+        return None
+
+    options = {}
+    for field, key, minimum in (("tile_size", "tile_size", 64), ("tile_overlap", "overlap", 0), ("tile_batch", "batch_size", 1)):
+        value = params.get(field)
+        if value in (None, ""):
+            continue
+        try:
+            options[key] = int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid {field} (must be an integer)")
+        if options[key] < minimum:
+            raise ValueError(f"Invalid {field} (must be at least {minimum})")
+
+    if options.get("overlap", 0) >= options.get("tile_size", getattr(settings, "TILE_SIZE", 640)):
+        raise ValueError("Invalid tile_overlap (must be smaller than tile_size)")
+    return options
+
+
+def _without_timings(result):
+    """Copy of a classify result without the timings measured for this request (see TIMING_FIELDS)."""
+    cacheable = {key: value for key, value in result.items() if key not in TIMING_FIELDS}
+    if "stages" in cacheable:
+        cacheable["stages"] = [
+            {key: value for key, value in stage.items() if key not in TIMING_FIELDS} for stage in cacheable["stages"]
+        ]
+    return cacheable
+
+
 def is_admin(user):
     return user.is_authenticated and user.is_admin
 
@@ -31,12 +96,27 @@ def upload_image(request):
     POST /api/upload
     Accepts:
       - image (file)
-      - model (str)
+      - model (str): a classifier, 'cascade' (mobilenet, escalating to resnet when unsure),
+        'ensemble' (averaged softmax of several classifiers), a detection model, or 'auto'
+        (detect: the most accurate detector that fits the latency SLO; see "model_used")
       - mode (str): either 'classify' or 'detect'
+      - (optional) output (str, detect only): 'counts', 'boxes' or 'image' (default)
+      - (optional) image_format ('jpeg', 'webp', 'png') and image_quality (1-100) for output='image'
+      - (optional) tiled ('true') with tile_size, tile_overlap, tile_batch: sliced detection for large mosaics
+      - (optional, detect only) profile ('default' or 'fast': smaller input, higher confidence) and
+        imgsz, conf, iou, max_det, classes (ids or names, comma-separated) to override it
       - (optional) image_id
-    Calls AI logic, stores the record in DB (only if classify), and returns relevant info.
+    Calls AI logic, stores the record in DB, and returns relevant info.
+    The upload is validated from its size and image header before anything is decoded
+    (413 when over UPLOAD_MAX_BYTES / UPLOAD_MAX_PIXELS), then decoded once.
     """
     if request.method == 'POST':
+        # Refuse oversized bodies before Django parses (and spools) the multipart upload
+        try:
+            check_size(int(request.META.get("CONTENT_LENGTH") or 0))
+        except UploadRejected as e:
+            return JsonResponse({"error": str(e)}, status=e.status)
+
         image_data = None
         image_id = None
         mode = None
@@ -51,6 +131,11 @@ def upload_image(request):
 
             model_choice = body.get("model")
             mode = body.get("mode")
+            output = body.get("output", "image")
+            image_format = body.get("image_format")
+            image_quality = body.get("image_quality")
+            tiling = {key: body.get(key) for key in TILE_PARAMS}
+            yolo_fields = {key: body.get(key) for key in DETECTION_PARAMS}
             image_id = body.get("image_id", None)
             # Note: If you do pure JSON-based image upload, you'd handle
             # base64-decoding or a similar approach here.
@@ -60,6 +145,11 @@ def upload_image(request):
             image_data = request.FILES.get("image")
             model_choice = request.POST.get("model")
             mode = request.POST.get("mode")
+            output = request.POST.get("output", "image")
+            image_format = request.POST.get("image_format")
+            image_quality = request.POST.get("image_quality")
+            tiling = {key: request.POST.get(key) for key in TILE_PARAMS}
+            yolo_fields = {key: request.POST.get(key) for key in DETECTION_PARAMS}
             image_id = request.POST.get("image_id", None)
 
         # Validate required fields
@@ -72,118 +162,657 @@ def upload_image(request):
         if not mode:
             return JsonResponse({"error": "No mode provided (must be 'classify' or 'detect')"}, status=400)
 
-        # Initialize AIClass for processing
-        ai = AIClass()
+        # Read, hash and validate the upload once; its pixels are decoded lazily and shared
         try:
-            # request.user is guaranteed to be a CustomUser since we used @login_required
-            if mode.lower() == "classify":
-                # Create a DB record to track classification
-                record = ImageRecord.objects.create(
-                    user=request.user,
-                    image_data=image_data,
-                    model_chosen=model_choice,
-                    summary="Processing...",
-                    crop_name="Unknown"
-                )
+            image = ingest(image_data)
+        except UploadRejected as e:
+            return JsonResponse({"error": str(e)}, status=e.status)
+
+        # Shared AIClass: models are loaded once per process and kept resident
+        ai = get_ai()
+        # request.user is guaranteed to be a CustomUser since we used @login_required
+        if mode.lower() == "classify":
+            # Identical bytes classified by the same model are served from the result cache
+            result_cache = get_result_cache()
+            cache_key = result_cache.key(image.digest, model_choice, ai.model_fingerprint(model_choice), "classify")
+            cls_result = result_cache.get(cache_key)
+            cached = cls_result is not None
 
-                # Convert the incoming file to PIL
-                pil_image = Image.open(image_data).convert("RGB")
-                cls_result = ai.classify(pil_image, model_choice)
+            if not cached:
+                # Decode at (roughly) the classifier's input size instead of full resolution
+                image_rgb, _ = image.decode(ai.input_size(model_choice))
+                cls_result = ai.classify(image_rgb, model_choice)
 
                 if "error" in cls_result:
                     return JsonResponse({"error": cls_result["error"]}, status=400)
+                result_cache.put(cache_key, "classify", model_choice, _without_timings(cls_result))
 
-                # Retrieve Wikipedia data for the predicted class
-                title, full_summary, url = ai.retrieve_data(cls_result["class_name"])
-
-                # Fallback if no page found
-                if not title:
-                    wiki_title = "No data found"
-                    wiki_summary = "No summary available"
-                    wiki_url = None
-                else:
-                    wiki_title = title
-                    wiki_summary = full_summary  # store entire summary
-                    wiki_url = url
-
-                # Update the record with classification results
-                record.crop_name = cls_result["class_name"]
-                record.summary = wiki_summary
-                record.save()
-
-                # Truncate summary to first 500 characters for the response
-                truncated_summary = wiki_summary[:500] if wiki_summary else ""
-
-                response_data = {
-                    "message": "Image classified successfully",
-                    "mode": mode,
-                    "model_chosen": model_choice,
-                    "image_id": record.id,
-                    "class_name": cls_result["class_name"],
-                    "confidence": cls_result["confidence"],
-                    "wiki_title": wiki_title,
-                    "wiki_summary": wiki_summary,
-                    "wiki_url": wiki_url
-                }
-                return JsonResponse(response_data, status=200)
-
-            elif mode.lower() == "detect":
-                # Perform detection; no DB record created or updated
-                annotated_file, weed_count, crop_count = ai.detect(
-                    image_data,
-                    model_choice,
-                    random.randint(1000, 9999)
-                )
+            # Store the record once inference is done: a large upload spooled to disk is moved
+            # into storage, so it must not be needed for decoding afterwards. The Wikipedia
+            # summary is attached now if cached, otherwise by the background enrichment worker.
+            record = ImageRecord(
+                user=request.user,
+                image_data=image.file,
+                model_chosen=model_choice,
+                crop_name=cls_result["class_name"]
+            )
+            wiki = enrichment.enrich([record], record.crop_name)
+            record.save()
+            rollups.apply([record])
+            enrichment.schedule([record], record.crop_name)
+            wiki_title, wiki_summary, wiki_url = wiki or (None, None, None)
+
+            # Truncate summary to first 500 characters for the response
+            truncated_summary = wiki_summary[:500] if wiki_summary else ""
+
+            response_data = {
+                "message": "Image classified successfully",
+                "mode": mode,
+                "model_chosen": model_choice,
+                "image_id": record.id,
+                "class_name": cls_result["class_name"],
+                "confidence": cls_result["confidence"],
+                "wiki_title": wiki_title,
+                "wiki_summary": wiki_summary,
+                "wiki_url": wiki_url,
+                "summary_status": record.summary_status,
+                "record_url": request.build_absolute_uri(f"/api/records/{record.id}"),
+                "cached": cached,
+                **{key: cls_result[key] for key in CASCADE_FIELDS if key in cls_result}
+            }
+            return JsonResponse(response_data, status=200)
+
+        elif mode.lower() == "detect":
+            if output not in DETECT_OUTPUTS:
+                return JsonResponse({"error": "Invalid output (must be 'counts', 'boxes' or 'image')"}, status=400)
+
+            try:
+                image_format, image_quality = resolve_format(image_format, image_quality)
+                tile_options = _tile_options(tiling)
+                detection_params = parse_detection_params(yolo_fields)
+            except ValueError as e:
+                return JsonResponse({"error": str(e)}, status=400)
 
-                if annotated_file is None:
+            # Identical bytes with the same model and options reuse the stored result,
+            # including the already-saved annotated image
+            result_cache = get_result_cache()
+            cache_key = result_cache.key(
+                image.digest, model_choice, ai.model_fingerprint(model_choice), "detect", output, tile_options,
+                detection_params,
+                (image_format, image_quality) if output == "image" else None
+            )
+            result = result_cache.get(cache_key)
+            cached = result is not None
+
+            if not cached:
+                # Perform detection. Only output='image' renders, encodes and stores an
+                # annotated image; boxes and counts are always persisted below.
+                try:
+                    if tile_options is not None:
+                        detection = ai.detect_tiled(
+                            image,
+                            model_choice,
+                            random.randint(1000, 9999),
+                            output=output,
+                            image_format=image_format,
+                            quality=image_quality,
+                            params=detection_params,
+                            **tile_options
+                        )
+                    else:
+                        detection = ai.run_detection(
+                            [image],
+                            model_choice,
+                            [random.randint(1000, 9999)],
+                            output=output,
+                            image_format=image_format,
+                            quality=image_quality,
+                            params=detection_params
+                        )[0]
+                except ValueError as e:
+                    # Class names the chosen model does not have
+                    return JsonResponse({"error": str(e)}, status=400)
+
+                if detection is None:
                     return JsonResponse(
                         {"error": f"Detection model '{model_choice}' not found."},
                         status=400
                     )
 
-                # ---
-                # 1) Save annotated_file to a 'detected/images/' folder in MEDIA_ROOT
-                # ---
+                result = {key: value for key, value in detection.items() if key != "annotated_file"}
+                if output == "image":
+                    # Save annotated_file to a 'detected/images/' folder in MEDIA_ROOT
+                    result["processed_image"] = store_detected_image(detection["annotated_file"])
+                    result["processed_image_url"] = default_storage.url(result["processed_image"])
+                result_cache.put(cache_key, "detect", model_choice, result)
+
+            # Every detect upload gets its own record, boxes included, even on a cache hit
+            record = persist_detections(request.user, model_choice, [{"image": image.file, "result": result}])[0]
 
-                # Ensure the folder exists
-                detected_folder = os.path.join(settings.MEDIA_ROOT, 'detected', 'images')
-                os.makedirs(detected_folder, exist_ok=True)
+            response_data = {
+                "message": "Image detected successfully",
+                "image_id": record.id,
+                "mode": mode,
+                "model_chosen": model_choice,
+                "output": output,
+                "cached": cached,
+                **{key: value for key, value in result.items() if key not in ("detections", "processed_image")}
+            }
+            if output == "boxes":
+                response_data["detections"] = result["detections"]
+            if output == "image":
+                # Return the annotated image URL instead of Base64
+                response_data["processed_image_url"] = request.build_absolute_uri(result["processed_image_url"])
+            return JsonResponse(response_data, status=200)
 
-                # Generate a unique file name
-                file_name = f"annotated_{random.randint(1000, 9999)}.png"
-                file_path = os.path.join(detected_folder, file_name)
+        else:
+            return JsonResponse({"error": "Invalid mode (must be 'classify' or 'detect')"}, status=400)
 
-                # Save the content of annotated_file to the disk
-                annotated_file.seek(0)  # ensure pointer is at start
-                with open(file_path, 'wb') as f:
-                    f.write(annotated_file.read())
+    else:
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+
+
+BATCH_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+
+
+def _ingest_named(name, f):
+    try:
+        return name, ingest(f), None
+    except UploadRejected as e:
+        return name, None, str(e)
+
+
+def _too_many_files(request, hint):
+    """
+    Parses the multipart body; returns a 400 response if it holds more files than
+    DATA_UPLOAD_MAX_NUMBER_FILES (Django would otherwise answer with an HTML error page).
+    """
+    try:
+        request.FILES
+    except TooManyFilesSent:
+        limit = getattr(settings, "DATA_UPLOAD_MAX_NUMBER_FILES", 100)
+        return JsonResponse(
+            {"error": f"Too many files in one request (max {limit}); {hint}"},
+            status=400
+        )
+    return None
+
+
+def _iter_batch_files(request):
+    """
+    Yields (name, IngestedImage or None, error) for every image in the multipart 'images' list
+    and/or a zip 'archive'. Archive members are size-checked against the zip directory
+    before they are inflated.
+    """
+    for uploaded in request.FILES.getlist("images"):
+        yield _ingest_named(uploaded.name, uploaded)
 
-                # Build an absolute URL to access this image (if you serve media)
-                processed_image_url = request.build_absolute_uri(
-                    os.path.join(settings.MEDIA_URL, 'detected', 'images', file_name)
+    archive = request.FILES.get("archive")
+    if archive:
+        with zipfile.ZipFile(archive) as zf:
+            for info in zf.infolist():
+                if info.is_dir() or not info.filename.lower().endswith(BATCH_IMAGE_EXTENSIONS):
+                    continue
+                name = os.path.basename(info.filename)
+                try:
+                    check_size(info.file_size)
+                except UploadRejected as e:
+                    yield name, None, str(e)
+                    continue
+                yield _ingest_named(name, ContentFile(zf.read(info), name=name))
+
+
+def _chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _stream_batch(request, ai, files, model_choice, mode, output, detection_params=None):
+    """Runs `files` through AIClass in chunks and yields one NDJSON line per image as each chunk completes."""
+    chunk_size = max(1, getattr(settings, "INFERENCE_MAX_BATCH", 8))
+
+    for chunk in _chunked(files, chunk_size):
+        # Rejected uploads keep their place in the output; the rest go through inference
+        lines = [{"file": name, "error": error} if error else None for name, _, error in chunk]
+        valid = [(index, image) for index, (_, image, _) in enumerate(chunk) if image is not None]
+
+        if mode == "classify":
+            try:
+                cls_results = ai.classify_many(
+                    [image.decode(ai.input_size(model_choice))[0] for _, image in valid], model_choice
                 )
+            except Exception as e:
+                cls_results = [{"error": f"Could not process image: {e}"} for _ in valid]
+
+            records = []
+            for (_, image), cls_result in zip(valid, cls_results):
+                if "error" in cls_result:
+                    continue
+                image.file.seek(0)
+                records.append(ImageRecord(
+                    user=request.user,
+                    image_data=image.file,
+                    model_chosen=model_choice,
+                    crop_name=cls_result["class_name"]
+                ))
+
+            # Cached summaries are attached before the insert; the rest are enriched in the background
+            by_class = {}
+            for record in records:
+                by_class.setdefault(record.crop_name, []).append(record)
+            for class_name, class_records in by_class.items():
+                enrichment.enrich(class_records, class_name)
+
+            created = ImageRecord.objects.bulk_create(records)
+            rollups.apply(created)
+            created = iter(created)
+
+            for class_name, class_records in by_class.items():
+                enrichment.schedule(class_records, class_name)
+
+            for (index, _), cls_result in zip(valid, cls_results):
+                if "error" in cls_result:
+                    lines[index] = {"file": chunk[index][0], "error": cls_result["error"]}
+                    continue
+                record = next(created)
+                lines[index] = {
+                    "file": chunk[index][0],
+                    "image_id": record.id,
+                    "class_name": cls_result["class_name"],
+                    "confidence": cls_result["confidence"],
+                    "wiki_title": record.wiki_title,
+                    "wiki_url": record.wiki_url,
+                    "summary_status": record.summary_status,
+                    **{key: cls_result[key] for key in CASCADE_FIELDS if key in cls_result}
+                }
+
+        else:
+            try:
+                detections = ai.run_detection(
+                    [image for _, image in valid], model_choice,
+                    [random.randint(1000, 9999) for _ in valid],
+                    output=output,
+                    params=detection_params
+                )
+                error = f"Detection model '{model_choice}' not found."
+            except Exception as e:
+                detections = [None for _ in valid]
+                error = f"Could not process image: {e}"
+
+            entries = []
+            for (_, image), detection in zip(valid, detections):
+                if detection is None:
+                    continue
+                if output == "image":
+                    detection["processed_image"] = store_detected_image(detection["annotated_file"])
+                image.file.seek(0)
+                entries.append({"image": image.file, "result": detection})
 
-                response_data = {
-                    "message": "Image detected successfully",
-                    "mode": mode,
-                    "model_chosen": model_choice,
-                    "weed_count": weed_count,
-                    "crop_count": crop_count,
-                    # Return the annotated image URL instead of Base64
-                    "processed_image_url": processed_image_url
+            # One bulk insert per table for the whole chunk
+            created = iter(persist_detections(request.user, model_choice, entries))
+
+            for (index, _), detection in zip(valid, detections):
+                name = chunk[index][0]
+                if detection is None:
+                    lines[index] = {"file": name, "error": error}
+                    continue
+                line = {
+                    "file": name,
+                    "image_id": next(created).id,
+                    "model_used": detection["model_used"],
+                    "weed_count": detection["weed_count"],
+                    "crop_count": detection["crop_count"],
                 }
-                return JsonResponse(response_data, status=200)
+                if output == "boxes":
+                    line["detections"] = detection["detections"]
+                elif output == "image":
+                    line["processed_image_url"] = request.build_absolute_uri(
+                        default_storage.url(detection["processed_image"])
+                    )
+                lines[index] = line
+
+        for line in lines:
+            yield json.dumps(line, default=str) + "\n"
+
+
+@csrf_exempt
+@login_required
+def upload_batch(request):
+    """
+    POST /api/upload/batch
+    Accepts (multipart form-data):
+      - images (file, repeated, at most DATA_UPLOAD_MAX_NUMBER_FILES) and/or archive (zip of
+        images, no count limit: use it for large surveys)
+      - model (str)
+      - mode (str): either 'classify' or 'detect'
+      - (optional) output (str, detect only): 'counts', 'boxes' or 'image' (default)
+      - (optional, detect only) profile, imgsz, conf, iou, max_det, classes (as for /api/upload)
+    Streams one JSON object per image (NDJSON) as each batch completes.
+    Classified images are stored with a single bulk insert per batch.
+    """
+    if request.method != 'POST':
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+
+    rejected = _too_many_files(request, "send larger sets as a zip 'archive'")
+    if rejected:
+        return rejected
+
+    model_choice = request.POST.get("model")
+    mode = (request.POST.get("mode") or "").lower()
+    output = request.POST.get("output", "image")
+
+    if not request.FILES.getlist("images") and not request.FILES.get("archive"):
+        return JsonResponse({"error": "No images provided (send 'images' files or a zip 'archive')"}, status=400)
+
+    if not model_choice:
+        return JsonResponse({"error": "No model provided (e.g., 'resnet' or 'yolov8_m')"}, status=400)
+
+    if mode not in ("classify", "detect"):
+        return JsonResponse({"error": "Invalid mode (must be 'classify' or 'detect')"}, status=400)
+
+    if output not in DETECT_OUTPUTS:
+        return JsonResponse({"error": "Invalid output (must be 'counts', 'boxes' or 'image')"}, status=400)
+
+    try:
+        detection_params = parse_detection_params(request.POST)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    archive = request.FILES.get("archive")
+    if archive and not zipfile.is_zipfile(archive):
+        return JsonResponse({"error": "Archive is not a valid zip file"}, status=400)
+
+    ai = get_ai()
+    response = StreamingHttpResponse(
+        _stream_batch(request, ai, _iter_batch_files(request), model_choice, mode, output, detection_params),
+        content_type="application/x-ndjson"
+    )
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def _stream_video(ai, frames, model_choice, batch_size, output, stream_format, cleanup=None, params=None):
+    """Formats detect_stream() results as NDJSON lines or SSE events, ending with a summary record."""
+    totals = {"frames": 0, "weed_count": 0, "crop_count": 0}
+    try:
+        for result in ai.detect_stream(frames, model_choice, batch_size, output, params):
+            totals["frames"] += 1
+            totals["weed_count"] += result["weed_count"]
+            totals["crop_count"] += result["crop_count"]
+            yield _format_event(result, stream_format)
+        yield _format_event({"done": True, "model_chosen": model_choice, **totals}, stream_format, event="done")
+    except UploadRejected as e:
+        # A frame of an image sequence failed validation; frames before it were already streamed
+        yield _format_event({"error": str(e), "status": e.status}, stream_format, event="error")
+    except Exception as e:
+        yield _format_event({"error": f"Could not process video: {e}"}, stream_format, event="error")
+    finally:
+        if cleanup:
+            cleanup()
+
+
+def _format_event(data, stream_format, event=None):
+    payload = json.dumps(data, default=str)
+    if stream_format == "sse":
+        return (f"event: {event}\n" if event else "") + f"data: {payload}\n\n"
+    return payload + "\n"
 
-            else:
-                return JsonResponse({"error": "Invalid mode (must be 'classify' or 'detect')"}, status=400)
 
-        finally:
-            # Ensure we close the AIClass instance
-            ai.close()
+@csrf_exempt
+@login_required
+def detect_video(request):
+    """
+    POST /api/detect/video
+    Accepts (multipart form-data):
+      - video (file) or frames (image files, repeated, in order; at most DATA_UPLOAD_MAX_NUMBER_FILES,
+        send a video for longer sequences)
+      - model (str): a detection model, e.g. 'yolov8_m', or 'auto' (chosen per batch under load)
+      - (optional) stride (int): process every Nth frame (default 1)
+      - (optional) skip (int): frames to skip at the start (default 0)
+      - (optional) max_frames (int): stop after this many processed frames
+      - (optional) batch (int): frames per forward pass (default and maximum INFERENCE_MAX_BATCH)
+      - (optional) output (str): 'counts' (default) or 'boxes'
+      - (optional) stream (str): 'ndjson' (default) or 'sse'
+      - (optional) profile, imgsz, conf, iou, max_det, classes (as for /api/upload)
+    Decodes frames one at a time and streams per-frame weed/crop counts as they are computed.
+    """
+    if request.method != 'POST':
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+
+    rejected = _too_many_files(request, "send longer sequences as a 'video'")
+    if rejected:
+        return rejected
+
+    video = request.FILES.get("video")
+    frame_files = request.FILES.getlist("frames")
+    model_choice = request.POST.get("model")
+    output = request.POST.get("output", "counts")
+    stream_format = request.POST.get("stream", "ndjson")
+
+    if not video and not frame_files:
+        return JsonResponse({"error": "No video or frames provided"}, status=400)
+
+    if model_choice not in AIClass.DETECTION_MODELS and model_choice != AIClass.AUTO_DETECTOR:
+        return JsonResponse({"error": f"Detection model '{model_choice}' not found."}, status=400)
+
+    if output not in ("counts", "boxes"):
+        return JsonResponse({"error": "Invalid output (must be 'counts' or 'boxes')"}, status=400)
+
+    if stream_format not in ("ndjson", "sse"):
+        return JsonResponse({"error": "Invalid stream (must be 'ndjson' or 'sse')"}, status=400)
+
+    try:
+        detection_params = parse_detection_params(request.POST)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    options = {}
+    max_batch = max(1, getattr(settings, "INFERENCE_MAX_BATCH", 8))
+    for field, default, minimum, maximum in (("stride", 1, 1, None), ("skip", 0, 0, None),
+                                             ("max_frames", None, 1, None), ("batch", max_batch, 1, max_batch)):
+        value = request.POST.get(field)
+        try:
+            options[field] = int(value) if value not in (None, "") else default
+        except ValueError:
+            return JsonResponse({"error": f"Invalid {field} (must be an integer)"}, status=400)
+        if options[field] is not None and options[field] < minimum:
+            return JsonResponse({"error": f"Invalid {field} (must be at least {minimum})"}, status=400)
+        if maximum is not None and options[field] > maximum:
+            return JsonResponse({"error": f"Invalid {field} (must be at most {maximum})"}, status=400)
 
+    cleanup = None
+    if video:
+        path, is_temporary = video_path(video)
+        if is_temporary:
+            cleanup = lambda: os.remove(path)
+        frames = iter_video_frames(path, options["stride"], options["skip"], options["max_frames"])
     else:
+        frames = iter_image_frames(frame_files, options["stride"], options["skip"], options["max_frames"])
+
+    response = StreamingHttpResponse(
+        _stream_video(get_ai(), frames, model_choice, options["batch"], output, stream_format, cleanup,
+                      detection_params),
+        content_type="text/event-stream" if stream_format == "sse" else "application/x-ndjson"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def _job_urls(request, job):
+    return {
+        "status_url": request.build_absolute_uri(f"/api/jobs/{job.id}"),
+        "result_url": request.build_absolute_uri(f"/api/jobs/{job.id}/result"),
+    }
+
+
+def _get_own_job(request, job_id):
+    """Returns the job if it belongs to the requesting user (admins see every job), else None."""
+    jobs = InferenceJob.objects.all() if request.user.is_admin else InferenceJob.objects.filter(user=request.user)
+    return jobs.filter(id=job_id).first()
+
+
+@csrf_exempt
+@login_required
+def submit_job(request):
+    """
+    POST /api/jobs
+    Accepts (multipart form-data):
+      - image (file)
+      - model (str): a detection model, e.g. 'yolov8_m', or 'auto'
+    Queues a detection job and returns its id immediately (202).
+    """
+    if request.method != 'POST':
         return JsonResponse({"error": "Method not allowed"}, status=405)
 
+    image_data = request.FILES.get("image")
+    model_choice = request.POST.get("model")
+
+    if not image_data:
+        return JsonResponse({"error": "No image provided"}, status=400)
+
+    if model_choice not in AIClass.DETECTION_MODELS and model_choice != AIClass.AUTO_DETECTOR:
+        return JsonResponse({"error": f"Detection model '{model_choice}' not found."}, status=400)
+
+    # Rejected here, before it is stored, rather than when the job runs
+    try:
+        image = ingest(image_data)
+    except UploadRejected as e:
+        return JsonResponse({"error": str(e)}, status=e.status)
+
+    job = InferenceJob.objects.create(
+        user=request.user,
+        image_data=image.file,
+        model_chosen=model_choice
+    )
+    get_job_runner().submit(job)
+
+    return JsonResponse({
+        "message": "Detection job queued",
+        "job_id": str(job.id),
+        "status": job.status,
+        **_job_urls(request, job)
+    }, status=202)
+
+
+@login_required
+def job_status(request, job_id):
+    """
+    GET /api/jobs/<id>
+    Returns the current state of a detection job.
+    """
+    if request.method != 'GET':
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+
+    job = _get_own_job(request, job_id)
+    if job is None:
+        return JsonResponse({"error": f"Job {job_id} not found"}, status=404)
+
+    return JsonResponse({
+        "job_id": str(job.id),
+        "status": job.status,
+        "model_chosen": job.model_chosen,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "error": job.error,
+        **_job_urls(request, job)
+    }, status=200)
+
+
+@login_required
+def job_result(request, job_id):
+    """
+    GET /api/jobs/<id>/result
+    Returns the detection result once the job has succeeded (202 while still pending).
+    """
+    if request.method != 'GET':
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+
+    job = _get_own_job(request, job_id)
+    if job is None:
+        return JsonResponse({"error": f"Job {job_id} not found"}, status=404)
+
+    if job.status == InferenceJob.STATUS_FAILED:
+        return JsonResponse({"job_id": str(job.id), "status": job.status, "error": job.error}, status=500)
+
+    if job.status != InferenceJob.STATUS_SUCCEEDED:
+        return JsonResponse({"job_id": str(job.id), "status": job.status}, status=202)
+
+    result = dict(job.result)
+    result["processed_image_url"] = request.build_absolute_uri(result["processed_image_url"])
+    return JsonResponse({
+        "message": "Image detected successfully",
+        "job_id": str(job.id),
+        "status": job.status,
+        "mode": "detect",
+        "model_chosen": job.model_chosen,
+        **result
+    }, status=200)
+
+
+@login_required
+def model_status(request):
+    """
+    GET /api/models/status
+    Reports which models are resident in this process, how much memory each one holds,
+    the micro-batching queue depth / batch fill per model, the model='auto' detector routing
+    estimates, and result cache hit/miss counters.
+    """
+    if request.method == 'GET':
+        ai = get_ai()
+        return JsonResponse({
+            **ai.registry.status(),
+            "batching": ai.scheduler.metrics(),
+            "routing": ai.router.status(),
+            "result_cache": get_result_cache().stats()
+        }, status=200)
+    return JsonResponse({"error": "Method not allowed"}, status=405)
+
+
+@csrf_exempt
+@login_required
+@user_passes_test(is_admin)
+def manage_models(request, action):
+    """
+    POST /api/models/<warmup|unload|reload>
+    Optional JSON body: {"models": ["mobilenet", "yolov8_m"]}; defaults to every model.
+    """
+    if request.method != 'POST':
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+
+    try:
+        body = json.loads(request.body.decode('utf-8')) if request.body else {}
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON format"}, status=400)
+    if not isinstance(body, dict):
+        return JsonResponse({"error": "Body must be a JSON object"}, status=400)
+
+    registry = get_ai().registry
+    keys = body.get("models")
+    if keys is not None and (not isinstance(keys, list) or not all(isinstance(key, str) for key in keys)):
+        return JsonResponse({"error": "'models' must be a list of model keys"}, status=400)
+    if keys is not None:
+        unknown = [key for key in keys if not registry.is_known(key)]
+        if unknown:
+            return JsonResponse({"error": f"Unknown models: {', '.join(unknown)}"}, status=400)
+
+    actions = {"warmup": registry.warm_up, "unload": registry.unload, "reload": registry.reload}
+    if action not in actions:
+        return JsonResponse({"error": "Invalid action (must be 'warmup', 'unload' or 'reload')"}, status=400)
+
+    affected = actions[action](keys)
+    if action == "reload":
+        # Cached results of the old weights are unreachable (see AIClass.model_fingerprint); free them
+        get_result_cache().clear_memory()
+    return JsonResponse({"message": f"{action} complete", "models": affected, **registry.status()}, status=200)
+
 
 @csrf_exempt
 def delete_image(request):
@@ -202,7 +831,9 @@ def delete_image(request):
             return JsonResponse({"error": "No image_id provided"}, status=400)
 
         try:
-            record = ImageRecord.objects.get(id=image_id)
+            record = ImageRecord.objects.select_related('detection').get(id=image_id)
+            detection = getattr(record, 'detection', None)
+            rollups.apply([record], [detection] if detection else [], sign=-1)
             record.delete()
             return JsonResponse({"message": f"Image {image_id} deleted successfully"}, status=200)
         except ImageRecord.DoesNotExist:
@@ -211,55 +842,191 @@ def delete_image(request):
     return JsonResponse({"error": "Method not allowed"}, status=405)
 
 
+@login_required
+def record_view(request, image_id):
+    """
+    GET /api/records/<id>
+    Returns one ImageRecord, including its Wikipedia enrichment once it is ready.
+    """
+    if request.method != 'GET':
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+
+    records = ImageRecord.objects.select_related('user', 'detection')
+    if not request.user.is_admin:
+        records = records.filter(user=request.user)
+    rec = records.filter(id=image_id).first()
+    if rec is None:
+        return JsonResponse({"error": f"Image {image_id} not found"}, status=404)
+
+    data = {
+        "image_id": rec.id,
+        "username": rec.user.username if rec.user else "Unknown",
+        "mode": rec.mode,
+        "model_chosen": rec.model_chosen,
+        "crop_name": rec.crop_name,
+        "summary": rec.summary,
+        "summary_status": rec.summary_status,
+        "wiki_title": rec.wiki_title,
+        "wiki_url": rec.wiki_url,
+        "processed_image_url": request.build_absolute_uri(rec.image_data.url) if rec.image_data else None,
+        "created_at": rec.created_at,
+    }
+    if rec.mode == ImageRecord.MODE_DETECT:
+        detection = getattr(rec, "detection", None)
+        if rec.processed_image:
+            data["processed_image_url"] = request.build_absolute_uri(rec.processed_image.url)
+        if detection is not None:
+            data.update({
+                "weed_count": detection.weed_count,
+                "crop_count": detection.crop_count,
+                "mean_confidence": detection.mean_confidence,
+                "detections": {
+                    "classes": detection.classes,
+                    "boxes": [
+                        [round(v, 1) for v in box[:4]] + [round(box[4], 3), int(box[5])]
+                        for box in detection.box_array().tolist()
+                    ],
+                },
+            })
+    return JsonResponse(data, status=200)
+
+
 @login_required
 def history_view(request):
     """
     GET /api/history
     - Admins see all users' history.
     - Non-admins see only their own history.
+    Query params (all optional):
+      - limit (default 50, max 500) and cursor: keyset pagination, newest first. The body stays a
+        JSON array; the cursor of the next page is returned in the X-Next-Cursor and Link headers.
+      - user (admins only), model_chosen, crop_name, date_from, date_to (YYYY-MM-DD or ISO datetime)
     """
     if request.method == 'GET':
-        if request.user.is_admin:
-            records = ImageRecord.objects.all().order_by('-created_at')
-        else:
-            records = ImageRecord.objects.filter(user=request.user).order_by('-created_at')
+        try:
+            limit = min(int(request.GET.get("limit", HISTORY_PAGE_SIZE)), HISTORY_MAX_PAGE_SIZE)
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            return JsonResponse({"error": "Invalid limit (must be a positive integer)"}, status=400)
 
+        try:
+            rows, next_cursor = keyset_page(history_queryset(request.user, request.GET), request.GET.get("cursor"), limit)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        # Build absolute URLs from one prefix instead of resolving every row against the request
+        site_root = request.build_absolute_uri("/")[:-1]
         data = []
-        for rec in records:
-            # Build absolute URL for the image_data field (instead of processed_image)
-            image_url = request.build_absolute_uri(rec.image_data.url) if rec.image_data else None
+        for row in rows:
+            image_url = default_storage.url(row["image_data"]) if row["image_data"] else None
+            if image_url and image_url.startswith("/"):
+                image_url = site_root + image_url
 
             data.append({
-                "image_id": rec.id,
-                "username": rec.user.username if rec.user else "Unknown",
-                "summary": rec.summary,
-                "model_chosen": rec.model_chosen,
-                "crop_name": rec.crop_name,
+                "image_id": row["id"],
+                "username": row["user__username"] or "Unknown",
+                "summary": row["summary"],
+                "summary_status": row["summary_status"],
+                "model_chosen": row["model_chosen"],
+                "crop_name": row["crop_name"],
                 "processed_image_url": image_url,
-                "created_at": rec.created_at,
+                "created_at": row["created_at"],
             })
 
-        return JsonResponse(data, safe=False, status=200)
+        response = JsonResponse(data, safe=False, status=200)
+        if next_cursor:
+            params = request.GET.copy()
+            params["cursor"] = next_cursor
+            params["limit"] = limit
+            response["X-Next-Cursor"] = next_cursor
+            response["Link"] = f'<{request.build_absolute_uri(request.path)}?{params.urlencode()}>; rel="next"'
+        return response
     else:
         return JsonResponse({"error": "Method not allowed"}, status=405)
 
 
+@login_required
+def export_history(request):
+    """
+    GET /api/history/export?format=csv|ndjson|parquet
+    Streams the caller's history (everyone's for admins) with the same filters as /api/history.
+    Rows are read from the database in chunks, so memory stays flat as the table grows;
+    Parquet is written chunk by chunk to a temporary file and then streamed.
+    """
+    if request.method != 'GET':
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+
+    export_format = request.GET.get("format", "csv")
+    if export_format not in EXPORT_FORMATS:
+        return JsonResponse({"error": f"Invalid format (must be one of {', '.join(EXPORT_FORMATS)})"}, status=400)
+
+    try:
+        records = history_queryset(request.user, request.GET)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    chunk_size = getattr(settings, "EXPORT_CHUNK_SIZE", 2000)
+    rows = iter_rows(records, chunk_size)
+    file_name = f"history.{export_format}"
+
+    if export_format == "parquet":
+        tmp = tempfile.NamedTemporaryFile(suffix=".parquet")
+        try:
+            # Written through the open handle: reopening it by name fails on Windows
+            write_parquet(rows, tmp, chunk_size)
+        except ImportError:
+            tmp.close()
+            return JsonResponse({"error": "Parquet export requires pandas and pyarrow"}, status=501)
+        tmp.seek(0)
+        # FileResponse streams the file in blocks and closes (deletes) it when done
+        return FileResponse(tmp, as_attachment=True, filename=file_name,
+                            content_type=EXPORT_CONTENT_TYPES[export_format])
+
+    stream = iter_csv(rows) if export_format == "csv" else iter_ndjson(rows)
+    response = StreamingHttpResponse(stream, content_type=EXPORT_CONTENT_TYPES[export_format])
+    response["Content-Disposition"] = f'attachment; filename="{file_name}"'
+    return response
+
+
+@login_required
+def stats_view(request):
+    """
+    GET /api/stats
+    Weed/crop statistics read from the precomputed daily rollups only.
+    - Admins see all users (optionally filtered with 'user'); non-admins see only their own uploads.
+    Query params (all optional):
+      - group_by: day (default), user, mode, crop_name or model_chosen
+      - mode, model_chosen, crop_name, date_from, date_to (YYYY-MM-DD)
+    """
+    if request.method != 'GET':
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+
+    group_by = request.GET.get("group_by", "day")
+    try:
+        totals, rows = rollups.stats(request.user, request.GET, group_by)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    return JsonResponse({"group_by": group_by, "totals": totals, "rows": rows}, status=200)
+
+
 def tips_view(request):
+    """GET /api/tips (cached; supports ETag/If-Modified-Since and ?since=, see content_cache.serve)"""
     if request.method == 'GET':
-        tips = list(Tip.objects.values("crop_name", "crop_tips"))
-        return JsonResponse({"tips": tips}, status=200)
+        return content_cache.serve(request, "tips")
     return JsonResponse({"error": "Method not allowed"}, status=405)
 
 
 def diseases_view(request):
+    """GET /api/diseases (cached; supports ETag/If-Modified-Since and ?since=)"""
     if request.method == 'GET':
-        diseases = list(Disease.objects.values("disease_name", "crop_name", "cure", "commonness"))
-        return JsonResponse({"diseases": diseases}, status=200)
+        return content_cache.serve(request, "diseases")
     return JsonResponse({"error": "Method not allowed"}, status=405)
 
 
 def news_view(request):
+    """GET /api/news (cached; supports ETag/If-Modified-Since and ?since=)"""
     if request.method == 'GET':
-        news = list(News.objects.values("title", "subtitle", "content", "author_name", "timestamp"))
-        return JsonResponse({"news": news}, status=200)
+        return content_cache.serve(request, "news")
     return JsonResponse({"error": "Method not allowed"}, status=405)
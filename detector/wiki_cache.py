@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone as dt_timezone
+from typing import Callable, Iterable, Optional, Tuple
+
+from django.db import close_old_connections
+
+from .models import WikiSummary
+
+WikiResult = Tuple[Optional[str], Optional[str], Optional[str]]
+
+
+class WikiCache:
+    """
+    Two-tier cache for Wikipedia lookups: an in-memory LRU in front of the WikiSummary table.
+
+    Entries older than `ttl_seconds` are still served (stale-while-revalidate) while a
+    background refresh fetches a new copy, so only a cold miss waits on the network.
+    `fetcher(class_name)` returns (title, summary, url), (None, None, None) when no page
+    exists, and raises on network errors; errors are never cached.
+    """
+
+    def __init__(self, fetcher: Callable[[str], WikiResult], ttl_seconds: float, max_entries: int = 512):
+        self.fetcher = fetcher
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self._memory: "OrderedDict[str, Tuple[WikiResult, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._refresher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="wiki-refresh")
+
+    def get(self, class_name: str) -> WikiResult:
+        value = self.peek(class_name)
+        if value is None:
+            return self.refresh(class_name)
+        return value
+
+    def peek(self, class_name: str) -> Optional[WikiResult]:
+        """Returns the cached value without touching the network, or None on a cold miss."""
+        with self._lock:
+            cached = self._memory.get(class_name)
+            if cached:
+                self._memory.move_to_end(class_name)
+
+        if cached is None:
+            cached = self._load_from_db(class_name)
+            if cached is None:
+                return None
+            self._remember(class_name, *cached)
+
+        value, fetched_at = cached
+        if time.time() - fetched_at > self.ttl_seconds:
+            self._schedule_refresh(class_name)
+        return value
+
+    def refresh(self, class_name: str) -> WikiResult:
+        """Fetches from Wikipedia now and stores the result in both tiers."""
+        value = self.fetcher(class_name)
+        fetched_at = time.time()
+        title, summary, url = value
+        WikiSummary.objects.update_or_create(
+            class_name=class_name,
+            defaults={
+                "found": title is not None,
+                "title": title,
+                "summary": summary,
+                "url": url,
+                "fetched_at": datetime.fromtimestamp(fetched_at, tz=dt_timezone.utc),
+            }
+        )
+        self._remember(class_name, value, fetched_at)
+        return value
+
+    def warm(self, class_names: Iterable[str], force: bool = False) -> int:
+        """Makes sure every class has a fresh entry; returns how many were fetched from the network."""
+        fetched = 0
+        for class_name in class_names:
+            cached = None if force else self._load_from_db(class_name)
+            if cached is None or time.time() - cached[1] > self.ttl_seconds:
+                self.refresh(class_name)
+                fetched += 1
+            else:
+                self._remember(class_name, *cached)
+        return fetched
+
+    def _schedule_refresh(self, class_name: str) -> None:
+        with self._lock:
+            if class_name in self._refreshing:
+                return
+            self._refreshing.add(class_name)
+        self._refresher.submit(self._background_refresh, class_name)
+
+    def _background_refresh(self, class_name: str) -> None:
+        try:
+            self.refresh(class_name)
+        except Exception as e:
+            # Keep serving the stale copy; the next request past the TTL retries
+            print(f"Wikipedia refresh failed for {class_name}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(class_name)
+            close_old_connections()
+
+    def _load_from_db(self, class_name: str) -> Optional[Tuple[WikiResult, float]]:
+        row = WikiSummary.objects.filter(class_name=class_name).first()
+        if row is None:
+            return None
+        value = (row.title, row.summary, row.url) if row.found else (None, None, None)
+        return value, row.fetched_at.timestamp()
+
+    def _remember(self, class_name: str, value: WikiResult, fetched_at: float) -> None:
+        with self._lock:
+            self._memory[class_name] = (value, fetched_at)
+            self._memory.move_to_end(class_name)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
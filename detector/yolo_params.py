@@ -0,0 +1,90 @@
+from typing import Any, Dict
+
+from django.conf import settings
+
+# ultralytics predict() arguments that can be tuned per deployment, per model and per request
+YOLO_PARAMS = ("imgsz", "conf", "iou", "max_det", "classes")
+
+YOLO_DEFAULTS = {"imgsz": 640, "conf": 0.25, "iou": 0.7, "max_det": 300, "classes": None}
+
+# Built-in profiles (DETECTION_PROFILES in settings can override or add to them):
+#  - fast: 480 px input (~0.56x the pixels of 640) and conf 0.4, so far fewer candidate boxes
+#    reach NMS and post-processing; at most 100 boxes per image. Small or faint weeds are
+#    the first to be missed.
+PROFILES = {
+    "default": {},
+    "fast": {"imgsz": 480, "conf": 0.4, "max_det": 100},
+}
+
+
+def profiles() -> Dict[str, Dict[str, Any]]:
+    return {**PROFILES, **getattr(settings, "DETECTION_PROFILES", {})}
+
+
+# Accepted values, used in validation errors
+RULES = {
+    "imgsz": "a multiple of 32 between 128 and 2048",
+    "conf": "a number in (0, 1]",
+    "iou": "a number in (0, 1]",
+    "max_det": "an integer between 1 and 1000",
+    "classes": "a list of class ids or names",
+}
+
+
+def _validated(key: str, value):
+    """Returns `value` converted for ultralytics, or raises ValueError."""
+    try:
+        if key == "imgsz":
+            value = int(value)
+            valid = 128 <= value <= 2048 and value % 32 == 0
+        elif key in ("conf", "iou"):
+            value = float(value)
+            valid = 0.0 < value <= 1.0
+        elif key == "max_det":
+            value = int(value)
+            valid = 1 <= value <= 1000
+        else:  # classes: ids or names, as a list or a comma-separated string
+            if value is None:
+                return None
+            if isinstance(value, str):
+                value = [part.strip() for part in value.split(",") if part.strip()]
+            value = [int(item) if str(item).isdigit() else str(item) for item in value]
+            valid = bool(value)
+    except (TypeError, ValueError):
+        valid = False
+    if not valid:
+        raise ValueError(f"Invalid {key} (must be {RULES[key]})")
+    return value
+
+
+def parse_detection_params(source) -> Dict[str, Any]:
+    """
+    Request-level detection settings from form fields or a JSON body: 'profile' plus any of
+    imgsz, conf, iou, max_det and classes. Raises ValueError for unknown or out-of-range values.
+    """
+    profile = source.get("profile") or "default"
+    if profile not in profiles():
+        raise ValueError(f"Invalid profile (must be one of: {', '.join(profiles())})")
+
+    params = {"profile": profile}
+    for key in YOLO_PARAMS:
+        value = source.get(key)
+        if value not in (None, ""):
+            params[key] = _validated(key, value)
+    return params
+
+
+def resolve_detection_params(model_choice: str, request_params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Final predict() arguments for one model, later sources winning: YOLO_DEFAULTS,
+    DETECTION_DEFAULTS (deployment), DETECTION_MODEL_PARAMS[model], the profile, the request.
+    """
+    overrides = {key: value for key, value in request_params.items() if key != "profile"}
+    merged = {
+        **YOLO_DEFAULTS,
+        **getattr(settings, "DETECTION_DEFAULTS", {}),
+        **getattr(settings, "DETECTION_MODEL_PARAMS", {}).get(model_choice, {}),
+        **profiles()[request_params.get("profile", "default")],
+        **overrides,
+    }
+    return {key: _validated(key, merged[key]) for key in YOLO_PARAMS}